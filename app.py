@@ -3,23 +3,52 @@ import pandas as pd
 from datetime import datetime, date
 
 from settings import get_time_range, show_help_section
-from log_utils import initialize_log, get_log_records
-from export_utils import convert_df_to_csv, convert_df_to_docx
-from email_utils import send_email_with_attachments, show_email_configuration_form, send_email_with_user_credentials
-from db_utils import init_db, save_log_to_db, get_all_logs
-from timezone_utils import get_current_time_in_timezone, format_time_with_timezone, get_timezone_display_name
+from draft_utils import open_draft, autosave, autosave_timer_running, draft_memory_stats, MAX_DRAFTS_IN_MEMORY
+from worklogger.export import LazyExports, range_export_bytes
+from email_utils import (show_email_configuration_form, build_message, admin_transport, user_transport,
+                         secrets_credential_provider, show_outbox_status)
+from worklogger.outbox import EmailOutbox
+from db_utils import (init_db, save_log_to_db, get_log_history_page, get_log_summary, search_logs,
+                      iter_log_entries, clear_all_logs, get_engine, current_user_id, archived_months,
+                      get_archived_logs)
+from metrics_utils import (get_metrics_log, timings_requested, start_rerun_timer, instrument_engine, timed,
+                           timed_fragment, show_timing_panel)
+from timezone_utils import (get_user_timezone, get_current_time_in_timezone, format_time_with_timezone,
+                            get_timezone_display_name, get_app_timezone_name, list_timezones,
+                            set_user_timezone, utc_to_local)
 
-# Add this import for clearing logs
-from sqlalchemy import text
-from db_utils import engine
-
-def clear_all_logs():
-    with engine.begin() as conn:
-        conn.execute(text("DELETE FROM work_logs"))
+@st.cache_resource(show_spinner=False)
+def get_email_outbox():
+    # One worker pool per process, shared by every session
+    init_db()
+    return EmailOutbox(get_engine(), credential_provider=secrets_credential_provider)
 
 st.set_page_config(page_title="WorkLogger", layout="wide")
 st.title("🗓️ WorkLogger v1.0")
 
+# Phase and query timings are only collected while the debug panel is on or a metrics file is set
+metrics_log = get_metrics_log()
+rerun_timer = start_rerun_timer(timings_requested() or metrics_log is not None)
+if rerun_timer:
+    instrument_engine(get_engine())
+
+# Initialize DB
+rerun_timer.phase("init_db")
+init_db()
+
+rerun_timer.phase("header")
+
+# Per-user timezone override (defaults to the app timezone from secrets)
+timezone_names = list_timezones()
+app_timezone = get_app_timezone_name()
+selected_timezone = st.sidebar.selectbox(
+    "🌐 Timezone",
+    options=timezone_names,
+    index=timezone_names.index(app_timezone) if app_timezone in timezone_names else 0,
+    key="timezone_select",
+)
+set_user_timezone(selected_timezone if selected_timezone != app_timezone else None)
+
 # Store current time in session state for help system (timezone-aware)
 if 'current_time' not in st.session_state:
     st.session_state.current_time = format_time_with_timezone()
@@ -76,14 +105,15 @@ with left_col:
             st.metric("Date Status", date_status)
     
     file_date_str = log_date.strftime('%A_%B_%d_%Y')
-    current_time = get_current_time_in_timezone()
+    user_tz = get_user_timezone()
+    current_time = get_current_time_in_timezone(user_tz)
     
     # Enhanced date display with more information
     col1, col2 = st.columns(2)
     with col1:
         st.info(f"**📅 Logging for:** {log_date.strftime('%A, %B %d, %Y')}")
     with col2:
-        timezone_info = get_timezone_display_name()
+        timezone_info = get_timezone_display_name(user_tz, current_time)
         st.info(f"**⏰ Current Time:** {current_time.strftime('%I:%M %p')} ({timezone_info})")
     
     # Add day of week and week number info
@@ -104,6 +134,7 @@ with right_col:
 
     """)
 
+rerun_timer.phase("slots")
 st.divider()
 # Get time range & hours from settings.py
 start_hour, end_hour, hours = get_time_range()
@@ -117,79 +148,79 @@ with left_col:
     st.header("📝 Fill Your Daily Work Log")
     log_key = f"structured_log_{log_date}_{start_hour}_{end_hour}"
 
-    initialize_log(log_key, hours)
-
-    for hour in hours:
-        with st.expander(f"🕒 {hour}", expanded=False):
-            entry = st.session_state[log_key][hour]
-            entry["meeting"] = st.checkbox("Was there a meeting during this hour?", key=f"{log_key}_{hour}_meeting")
-            if entry["meeting"]:
-                entry["meeting_info"] = st.text_area("📝 Meeting Information", key=f"{log_key}_{hour}_meeting_info")
-            entry["tasks"] = st.text_area("✅ Tasks Worked On", key=f"{log_key}_{hour}_tasks")
-            entry["general"] = st.text_area("🗒️ General Information", key=f"{log_key}_{hour}_general")
-
-log_df = pd.DataFrame(get_log_records(log_key, hours))
-
-def format_log_as_list(df):
-    lines = []
-    for _, row in df.iterrows():
-        lines.append(f"Time: {row['Time']}")
-        lines.append(f"  Meeting: {row['Meeting']}")
-        if row['Meeting'] == "Yes" and row['Meeting Information'].strip():
-            lines.append(f"  Meeting Info: {row['Meeting Information']}")
-        if row['Tasks'].strip():
-            lines.append(f"  Tasks: {row['Tasks']}")
-        if row['General Information'].strip():
-            lines.append(f"  General Info: {row['General Information']}")
-        lines.append("")
-    return "\n".join(lines)
-
-log_list_text = format_log_as_list(log_df)
-list_bytes = log_list_text.encode("utf-8")
-
-csv_bytes = convert_df_to_csv(log_df)
-docx_io = convert_df_to_docx(log_df, log_date)
-docx_bytes = docx_io.getvalue()
+    # Only the most recent drafts stay in session memory; older ones are parked in the DB
+    day_log = open_draft(log_key, log_date, hours)
+    drafts_in_memory, draft_bytes = draft_memory_stats()
+    st.sidebar.caption(
+        f"🧠 Drafts in memory: {drafts_in_memory}/{MAX_DRAFTS_IN_MEMORY} (~{draft_bytes / 1024:.1f} KB)"
+    )
+
+    def _slot_changed(i, field, widget_key):
+        day_log.update(i, field, st.session_state[widget_key])
+        if day_log.dirty and not autosave_timer_running():
+            # The first unsaved edit reruns the page once, to start the autosave timer
+            st.rerun()
+        # An edit can only change its own hour, the preview and the autosave status
+        st.rerun([f"hour_{i}", "preview", "autosave"])
+
+    def slot_widget(widget, label, i, field):
+        widget_key = f"{log_key}_{hours[i]}_{field}"
+        day_log.update(i, field, widget(label, key=widget_key, on_change=_slot_changed, args=(i, field, widget_key)))
+
+    def show_hour_slot(i, hour):
+        @st.fragment(key=f"hour_{i}")
+        @timed_fragment(f"hour_{i}")
+        def _hour_slot():
+            with st.expander(f"🕒 {hour}", expanded=False):
+                slot_widget(st.checkbox, "Was there a meeting during this hour?", i, "meeting")
+                if day_log.meeting[i]:
+                    slot_widget(st.text_area, "📝 Meeting Information", i, "meeting_info")
+                slot_widget(st.text_area, "✅ Tasks Worked On", i, "tasks")
+                slot_widget(st.text_area, "🗒️ General Information", i, "general")
+
+        _hour_slot()
+
+    for i, hour in enumerate(hours):
+        show_hour_slot(i, hour)
 
+    # Only slots edited since the last flush are written, after a short quiet period
+    autosave(day_log)
+
+# Each keystroke reruns only its hour and this preview; the rest of the page
+# reads day_log when it's actually used (save, download, send)
+rerun_timer.phase("preview")
 with right_col:
     
     st.header("📊 Log Preview")
     preview_mode = st.radio("Choose preview format:", options=["Table", "List"])
 
+    @st.fragment(key="preview")
+    @timed_fragment("preview")
+    def show_preview():
+        # Records, table columns, list text and summary all come from one pass over the slots
+        rendered_log = day_log.render()
+        if preview_mode == "Table":
+            st.subheader("Table")
+            st.dataframe(rendered_log.columns)
+        else:
+            st.subheader("List")
+            st.text_area("Detailed Log List Preview", value=rendered_log.list_text, height=400)
 
-    if preview_mode == "Table":
-        st.subheader("Table")
-        st.dataframe(log_df)
-    else:
-        st.subheader("List")
-        st.text_area("Detailed Log List Preview", value=log_list_text, height=400)
-
-# Helper to build a single day summary text from the hourly logs
-def build_summary(records):
-    summary_lines = []
-    for r in records:
-        if r["Meeting"] == "Yes" or r["Tasks"].strip() or r["General Information"].strip():
-            summary_lines.append(f"{r['Time']}: Meeting: {r['Meeting']}")
-            if r['Meeting'] == 'Yes' and r['Meeting Information'].strip():
-                summary_lines.append(f"  Info: {r['Meeting Information']}")
-            if r['Tasks'].strip():
-                summary_lines.append(f"  Tasks: {r['Tasks']}")
-            if r['General Information'].strip():
-                summary_lines.append(f"  General: {r['General Information']}")
-            summary_lines.append("")
-    return "\n".join(summary_lines) if summary_lines else "No details logged."
+    show_preview()
 
-# Initialize DB
+def current_exports():
+    """Exports of the log as it is now; built on demand and cached by content hash"""
+    return LazyExports(day_log.render(), log_date)
+
+rerun_timer.phase("save")
 st.divider()
 left_col, right_col = st.columns([2, 1])
 
-init_db()
-
 with left_col:
     st.header("💾 Save Work Log")
     if st.button("Save to Database"):
-        summary_text = build_summary(get_log_records(log_key, hours))
-        save_log_to_db(log_date, summary_text)
+        save_log_to_db(log_date, day_log.summary(), day_log)
+        day_log.take_dirty()
         st.success("✅ Log saved to database!")
     
     
@@ -199,112 +230,217 @@ with left_col:
         clear_all_logs()
         st.success("✅ All logs cleared from database!")
    
+rerun_timer.phase("downloads")
 with right_col:   
     st.header("📥 Download & Share")
 
     if preview_mode == "Table":
         st.download_button(
             "📤 Download as CSV",
-            data=csv_bytes,
+            data=timed("export.csv", lambda: current_exports().csv(), metrics_log),
             file_name=f"{file_date_str}_daily_work_log.csv",
             mime="text/csv"
         )
         st.download_button(
             "📄 Download as Word Document",
-            data=docx_bytes,
+            data=timed("export.docx", lambda: current_exports().docx(), metrics_log),
             file_name=f"{file_date_str}_daily_work_log.docx",
             mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
         )
     else:
         st.download_button(
             "📄 Download as Text List",
-            data=list_bytes,
+            data=timed("export.txt", lambda: current_exports().text_bytes(), metrics_log),
             file_name=f"{file_date_str}_daily_work_log.txt",
             mime="text/plain"
         )
         
+rerun_timer.phase("email")
 st.divider()
 left_col, right_col = st.columns([2, 1])
         
 with left_col:
     st.subheader("📧 Email This Work Log")
-    
-    # Show email configuration form
-    email_ready, user_email_config = show_email_configuration_form()
-    
-    # Email form - only show if email is configured or user provided credentials
-    if email_ready:
-        default_subject = DEFAULT_SUBJECT_TEMPLATE.format(date_str=file_date_str)
-        
-        # Use different defaults based on configuration source
-        if user_email_config:  # User provided their own config
-            default_to = user_email_config['user']  # Default to their own email
-            default_cc = ""
-            sender_name = user_email_config['sender_name']
-        else:  # Using app secrets
-            default_to = DEFAULT_TO
-            default_cc = DEFAULT_CC
-            sender_name = SENDER_NAME
-            
-        to_input = st.text_input("To", value=default_to, placeholder="recipient@example.com")
-        cc_input = st.text_input("CC", value=default_cc, placeholder="cc1@example.com; cc2@example.com")
-        subject_input = st.text_input("Subject", value=default_subject)
-        from_display = st.text_input("From Name", value=sender_name)
-        default_body = f"Please find attached the work log for {log_date.strftime('%A, %B %d, %Y')}."
-        body_input = st.text_area("Body", value=default_body, height=100)
-
-        if st.button("📧 Send Email with Attachments"):
-            if not to_input.strip():
-                st.error("Please provide at least one recipient email address.")
-            else:
-                if preview_mode == "Table":
-                    attachments = [
-                        (csv_bytes, "text", "csv", f"{file_date_str}_daily_work_log.csv"),
-                        (docx_bytes, "application", "vnd.openxmlformats-officedocument.wordprocessingml.document",
-                         f"{file_date_str}_daily_work_log.docx"),
-                    ]
-                else:
-                    attachments = [
-                        (list_bytes, "text", "plain", f"{file_date_str}_daily_work_log.txt"),
-                    ]
-
-                # Use appropriate sending method based on configuration
-                if user_email_config:
-                    status, message = send_email_with_user_credentials(
-                        user_config=user_email_config,
-                        to=to_input,
-                        cc=cc_input,
-                        subject=subject_input,
-                        body=body_input,
-                        attachments=attachments,
-                    )
-                else:
-                    status, message = send_email_with_attachments(
-                        smtp_server=SMTP_SERVER,
-                        smtp_port=SMTP_PORT,
-                        smtp_user=SMTP_USER,
-                        smtp_password=SMTP_PASSWORD,
-                        from_name=from_display,
-                        to=to_input,
-                        cc=cc_input,
-                        subject=subject_input,
-                        body=body_input,
-                        attachments=attachments,
-                    )
-                
-                if status:
-                    st.success(message)
+
+    # Typing in the form or sending reruns only this section
+    @st.fragment(key="email")
+    @timed_fragment("email")
+    def show_email_section():
+        # Show email configuration form
+        email_ready, user_email_config = show_email_configuration_form()
+
+        # Email form - only show if email is configured or user provided credentials
+        if email_ready:
+            default_subject = DEFAULT_SUBJECT_TEMPLATE.format(date_str=file_date_str)
+
+            # Use different defaults based on configuration source
+            if user_email_config:  # User provided their own config
+                default_to = user_email_config['user']  # Default to their own email
+                default_cc = ""
+                sender_name = user_email_config['sender_name']
+            else:  # Using app secrets
+                default_to = DEFAULT_TO
+                default_cc = DEFAULT_CC
+                sender_name = SENDER_NAME
+
+            to_input = st.text_input("To", value=default_to, placeholder="recipient@example.com")
+            cc_input = st.text_input("CC", value=default_cc, placeholder="cc1@example.com; cc2@example.com")
+            subject_input = st.text_input("Subject", value=default_subject)
+            from_display = st.text_input("From Name", value=sender_name)
+            default_body = f"Please find attached the work log for {log_date.strftime('%A, %B %d, %Y')}."
+            body_input = st.text_area("Body", value=default_body, height=100)
+
+            if st.button("📧 Send Email with Attachments"):
+                if not to_input.strip():
+                    st.error("Please provide at least one recipient email address.")
                 else:
-                    st.error(message)
+                    # Rendered at send time, since slot edits only rerun their own fragments
+                    exports = current_exports()
+                    if preview_mode == "Table":
+                        attachments = [
+                            (exports.csv(), "text", "csv", f"{file_date_str}_daily_work_log.csv"),
+                            (exports.docx(), "application", "vnd.openxmlformats-officedocument.wordprocessingml.document",
+                             f"{file_date_str}_daily_work_log.docx"),
+                        ]
+                    else:
+                        attachments = [
+                            (exports.text_bytes(), "text", "plain", f"{file_date_str}_daily_work_log.txt"),
+                        ]
+
+                    # Queue for background delivery so a slow SMTP server can't freeze the page
+                    if user_email_config:
+                        transport = user_transport(user_email_config)
+                        password = user_email_config['password']
+                        from_addr = user_email_config['user']
+                        from_name = user_email_config['sender_name']
+                    else:
+                        transport = admin_transport(SMTP_SERVER, SMTP_PORT, SMTP_USER)
+                        password = SMTP_PASSWORD
+                        from_addr = SMTP_USER
+                        from_name = from_display
+
+                    if password == "CHANGE_ME":
+                        st.error("SMTP password not configured. Set credentials in st.secrets.")
+                    else:
+                        msg, recipients = build_message(from_name, from_addr, to_input, cc_input,
+                                                        subject_input, body_input, attachments)
+                        job_id = get_email_outbox().enqueue(transport, password, from_addr, recipients, msg)
+                        st.session_state.setdefault("outbox_jobs", []).insert(0, job_id)
+                        st.success("📬 Email queued for delivery.")
+
+        if st.session_state.get("outbox_jobs"):
+            show_outbox_status(get_email_outbox(), st.session_state.outbox_jobs[:5])
+
+    show_email_section()
+
+rerun_timer.phase("history")
 with right_col:
     st.header("📚 View Previous Logs")
-    logs_df = get_all_logs()
-    if not logs_df.empty:
-        st.dataframe(logs_df[['log_date', 'created_at']])
-        for _, row in logs_df.iterrows():
-            with st.expander(f"Logs for {row['log_date']} (saved {row['created_at']}):"):
-                st.text(row['log_summary'])
-    else:
-        st.info("No logs found yet.")        
+
+    def turn_search_page(step):
+        st.session_state.search_offset = max(0, st.session_state.search_offset + step)
+
+    # Searching and paging rerun only this section. Page buttons move their
+    # cursor in a callback, so the fragment rerun they trigger already shows the new page
+    @st.fragment(key="history")
+    @timed_fragment("history")
+    def show_history():
+        search_query = st.text_input("🔍 Search logs", placeholder="e.g. standup deploy", key="history_search")
+        if search_query.strip():
+            # Reset to the first page whenever the query changes
+            if st.session_state.get("search_offset_query") != search_query:
+                st.session_state.search_offset = 0
+                st.session_state.search_offset_query = search_query
+            search_page_size = 10
+            hits_df, has_more = search_logs(search_query, search_page_size, st.session_state.search_offset)
+            if hits_df.empty:
+                st.info("No matching logs.")
+            hits_df["saved_at"] = utc_to_local(hits_df["created_at"], user_tz)
+            for hit in hits_df.itertuples(index=False):
+                st.markdown(f"**{hit.log_date}** (saved {hit.saved_at})  \n{hit.snippet}")
+
+            search_col1, search_col2 = st.columns(2)
+            with search_col1:
+                st.button("⬅️ Previous results", disabled=st.session_state.search_offset == 0,
+                          on_click=turn_search_page, args=(-search_page_size,))
+            with search_col2:
+                st.button("More results ➡️", disabled=not has_more,
+                          on_click=turn_search_page, args=(search_page_size,))
+            st.divider()
+
+        page_size = st.selectbox("Logs per page", options=[10, 25, 50, 100], index=1, key="history_page_size")
+
+        # Stack of keyset cursors for the pages we've walked through; reset when page size changes
+        if st.session_state.get("history_cursor_size") != page_size:
+            st.session_state.history_cursors = [None]
+            st.session_state.history_cursor_size = page_size
+        cursors = st.session_state.history_cursors
+
+        logs_df, next_cursor = get_log_history_page(page_size, cursors[-1])
+        if not logs_df.empty:
+            # created_at stays raw UTC for the keyset cursor; saved_at is for display
+            logs_df["saved_at"] = utc_to_local(logs_df["created_at"], user_tz)
+            st.dataframe(logs_df[['log_date', 'saved_at']])
+            for row in logs_df.itertuples(index=False):
+                # Summaries are only fetched for expanders the user has opened
+                history_expander = st.expander(
+                    f"Logs for {row.log_date} (saved {row.saved_at}):",
+                    key=f"history_log_{row.id}",
+                    on_change="rerun",
+                )
+                if history_expander.open:
+                    history_expander.text(get_log_summary(row.id))
+
+            page_col1, page_col2, page_col3 = st.columns([1, 1, 1])
+            with page_col1:
+                st.button("⬅️ Newer", disabled=len(cursors) == 1, on_click=cursors.pop)
+            with page_col2:
+                st.caption(f"Page {len(cursors)}")
+            with page_col3:
+                st.button("Older ➡️", disabled=next_cursor is None, on_click=cursors.append, args=(next_cursor,))
+        elif len(cursors) > 1:
+            # Rows behind the current cursor were removed (e.g. cleared); start over
+            st.session_state.history_cursors = [None]
+            st.rerun()
+        else:
+            st.info("No logs found yet.")
+
+        with st.expander("📦 Bulk Export Saved Logs"):
+            export_range = st.date_input("Date range", value=(today - pd.Timedelta(days=30), today), key="bulk_export_range")
+            export_format = st.selectbox("Format", options=["csv", "ndjson"], key="bulk_export_format")
+            if isinstance(export_range, (tuple, list)) and len(export_range) == 2:
+                range_start, range_end = export_range
+                # Rows are read in chunks and spooled only when the button is clicked; that
+                # happens outside the script run, so the user is bound now
+                st.download_button(
+                    f"📤 Download {export_format.upper()}",
+                    data=lambda start=range_start, end=range_end, fmt=export_format, user_id=current_user_id():
+                        range_export_bytes(iter_log_entries(start, end, user_id=user_id), fmt),
+                    file_name=f"work_logs_{range_start}_{range_end}.{export_format}",
+                    mime="text/csv" if export_format == "csv" else "application/x-ndjson",
+                )
+            else:
+                st.caption("Pick a start and end date.")
+
+        # Months moved out by the retention policy (python -m worklogger archive)
+        months = archived_months()
+        if months:
+            # Loading a month decompresses its whole file, so only while the expander is open
+            archive_expander = st.expander("🗄️ Archived Logs", key="archived_logs", on_change="rerun")
+            if archive_expander.open:
+                with archive_expander:
+                    st.caption("Read-only copies of months moved out of the database.")
+                    month = st.selectbox("Month", options=months[::-1], key="archive_month")
+                    archived_df = get_archived_logs(month)
+                    archived_day = st.selectbox("Day", options=archived_df["log_date"], key="archive_day")
+                    if archived_day is not None:
+                        st.text(archived_df.loc[archived_df["log_date"] == archived_day, "log_summary"].iloc[0])
+
+    show_history()
 st.divider()
 
+# Runs that end early (st.rerun/st.stop) are simply not recorded
+rerun_timer.finish()
+if rerun_timer and metrics_log is not None:
+    metrics_log.write(rerun_timer.as_record())
+show_timing_panel(rerun_timer)
@@ -0,0 +1,130 @@
+"""
+Benchmark: database size and summary read latency with and without
+dictionary-compressed summaries.
+
+    python benchmarks/bench_compression.py [days]
+
+Saves `days` generated logs (default 20,000) as plain text, measures the
+vacuumed file size and keeps a copy, then trains a dictionary with
+`compress_summaries()`, repacks every row and measures the size again.
+get_log_summary() latency is timed on the plain copy and the repacked file
+side by side, bypassing the shared query cache, so it covers the query and
+unpacking.
+"""
+
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklogger import db  # noqa: E402
+from worklogger.querycache import query_cache  # noqa: E402
+from worklogger.logs import DayLog, hour_label  # noqa: E402
+
+DEFAULT_DAYS = 20_000
+READ_SAMPLES = 2000
+READ_PASSES = 5
+
+RECURRING_TASKS = [
+    "Code review for the payments service", "Sprint planning and backlog grooming",
+    "Investigated flaky integration tests", "Customer support escalations",
+    "Updated deployment runbook", "Pairing on the reporting dashboard",
+]
+MEETINGS = ["Daily standup", "1:1 with manager", "Architecture review", "Client sync call"]
+
+def generate_day(rng, d):
+    slots = [hour_label(h) for h in range(9, 18)]
+    entries = {}
+    for slot in slots:
+        meeting = rng.random() < 0.25
+        entries[slot] = {
+            "meeting": meeting,
+            "meeting_info": rng.choice(MEETINGS) if meeting else "",
+            "tasks": rng.choice(RECURRING_TASKS) if rng.random() < 0.7 else f"Worked on ticket WL-{rng.randint(1, 9999)}",
+            "general": f"Blocked on review of PR #{d % 500}" if rng.random() < 0.1 else "",
+        }
+    return DayLog(slots, entries)
+
+def file_size(path):
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+    return os.path.getsize(path)
+
+def read_latency(engines, ids, passes=READ_PASSES):
+    """Median and p90 microseconds per uncached get_log_summary() call on each engine.
+
+    Reads alternate between the engines so machine noise hits them alike.
+    Each id is read `passes` times per engine and its fastest read kept; the
+    first pass also warms the page cache.
+    """
+    best = [dict.fromkeys(ids, float("inf")) for _ in engines]
+    for _ in range(passes):
+        for log_id in ids:
+            for engine, timings in zip(engines, best):
+                db.engine = engine
+                started = time.perf_counter()
+                db.get_log_summary.uncached(log_id)
+                timings[log_id] = min(timings[log_id], (time.perf_counter() - started) * 1e6)
+    return [(statistics.median(timings.values()), statistics.quantiles(timings.values(), n=10)[-1])
+            for timings in best]
+
+def main(days):
+    path = os.path.join(tempfile.mkdtemp(prefix="worklogger-compress-"), "bench.db")
+    db.configure_engine(f"sqlite:///{path}")
+    codec = db.SUMMARY_CODEC
+    db.SUMMARY_CODEC = "off"
+    db.init_db()
+
+    rng = random.Random(42)
+    start = date(1900, 1, 1)
+    batch = []
+    for d in range(days):
+        day_log = generate_day(rng, d)
+        batch.append((start + timedelta(days=d), day_log.summary(), day_log))
+        if len(batch) == 2000:
+            db.save_logs_batch(batch)
+            batch = []
+    if batch:
+        db.save_logs_batch(batch)
+
+    ids = rng.sample(range(1, days + 1), min(READ_SAMPLES, days))
+    originals = {log_id: db.get_log_summary.uncached(log_id) for log_id in ids[:200]}
+    plain_size = file_size(path)
+    # A plain-text copy to read side by side with the repacked file
+    plain_path = path.replace(".db", "-plain.db")
+    shutil.copyfile(path, plain_path)
+
+    db.SUMMARY_CODEC = codec
+    started = time.perf_counter()
+    stats = db.compress_summaries()
+    repack_s = time.perf_counter() - started
+    packed_size = file_size(path)
+    query_cache.clear()
+
+    if any(db.get_log_summary.uncached(log_id) != text for log_id, text in originals.items()):
+        raise SystemExit("round trip changed a summary")
+    if not db.search_log_rows("payments", 1)[0]:
+        raise SystemExit("search found nothing after repacking")
+
+    packed_engine = db.engine
+    plain_engine = db.create_db_engine(f"sqlite:///{plain_path}")
+    (plain_median, plain_p90), (packed_median, packed_p90) = read_latency([plain_engine, packed_engine], ids)
+    db.engine = packed_engine
+
+    before, after = stats["bytes_before"], stats["bytes_after"]
+    print(f"{days:,} days, codec {codec}, repacked in {repack_s:.1f}s")
+    print(f"summaries: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({1 - after / before:.0%} smaller)")
+    print(f"file:      {plain_size / 1e6:.2f} MB -> {packed_size / 1e6:.2f} MB ({1 - packed_size / plain_size:.0%} smaller)")
+    print(f"read:      median {plain_median:.0f} -> {packed_median:.0f} us, p90 {plain_p90:.0f} -> {packed_p90:.0f} us "
+          f"(+{packed_median - plain_median:.0f} us median)")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DAYS)
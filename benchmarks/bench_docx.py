@@ -0,0 +1,86 @@
+"""
+Benchmark: one-pass DOCX table writer vs. per-cell python-docx assignment.
+
+    python benchmarks/bench_docx.py [rows ...]
+
+Verifies both writers produce identical document XML, then times each at
+10, 100 and 10,000 rows (or the row counts given on the command line).
+"""
+
+import os
+import sys
+import time
+import zipfile
+from datetime import date
+from io import BytesIO
+
+import pandas as pd
+from docx import Document
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklogger.export import convert_df_to_docx  # noqa: E402
+
+DEFAULT_ROWS = [10, 100, 10_000]
+LOG_DATE = date(2024, 3, 15)
+
+def convert_df_to_docx_per_cell(df, log_date):
+    """The original writer: one python-docx cell proxy per value"""
+    doc = Document()
+    doc.add_heading("Daily Work Log", level=1)
+    doc.add_paragraph(f"Date: {log_date.strftime('%A, %B %d, %Y')}")
+
+    table = doc.add_table(rows=1, cols=len(df.columns))
+    table.style = "Table Grid"
+    hdr_cells = table.rows[0].cells
+    for i, col in enumerate(df.columns):
+        hdr_cells[i].text = col
+
+    for _, row in df.iterrows():
+        row_cells = table.add_row().cells
+        for i, col in enumerate(df.columns):
+            row_cells[i].text = str(row[col])
+
+    doc_io = BytesIO()
+    doc.save(doc_io)
+    doc_io.seek(0)
+    return doc_io
+
+def sample_log(rows):
+    records = []
+    for i in range(rows):
+        meeting = i % 3 == 0
+        records.append({
+            "Time": f"{i % 24}:{(i * 15) % 60:02d}",
+            "Meeting": "Yes" if meeting else "No",
+            "Meeting Information": f"Sync #{i} with <team> & partners" if meeting else "",
+            "Tasks": f"Task {i}\n\tfollow-up item " if i % 2 else "",
+            "General Information": "  padded note  " if i % 5 == 0 else f"note {i}",
+        })
+    return pd.DataFrame(records)
+
+def document_xml(doc_io):
+    with zipfile.ZipFile(doc_io) as archive:
+        return archive.read("word/document.xml")
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(row_counts):
+    print(f"{'rows':>8}  {'per-cell (s)':>13}  {'one-pass (s)':>13}  {'speedup':>8}")
+    for rows in row_counts:
+        df = sample_log(rows)
+        if document_xml(convert_df_to_docx(df, LOG_DATE)) != document_xml(convert_df_to_docx_per_cell(df, LOG_DATE)):
+            raise SystemExit(f"document.xml differs at {rows} rows")
+        repeat = 5 if rows <= 1000 else 1
+        slow = best_of(lambda: convert_df_to_docx_per_cell(df, LOG_DATE), repeat)
+        fast = best_of(lambda: convert_df_to_docx(df, LOG_DATE), repeat)
+        print(f"{rows:>8}  {slow:>13.4f}  {fast:>13.4f}  {slow / fast:>7.1f}x")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_ROWS)
@@ -0,0 +1,67 @@
+"""
+Benchmark: bulk import of a generated range-export CSV into a fresh database.
+
+    python benchmarks/bench_import.py [days] [slots-per-day]
+
+Writes `days` consecutive days (default 100,000 days of 8 slots) as CSV,
+imports them into a temporary SQLite file, and reports throughput and
+that the row counts and rollups add up.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklogger import db  # noqa: E402
+from worklogger.export import RANGE_COLUMNS  # noqa: E402
+from worklogger.importer import import_logs  # noqa: E402
+from worklogger.logs import hour_label  # noqa: E402
+
+DEFAULT_DAYS = 100_000
+DEFAULT_SLOTS = 8
+
+def write_history(path, days, slots):
+    start = date(1800, 1, 1)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(RANGE_COLUMNS)
+        for d in range(days):
+            log_date = (start + timedelta(days=d)).isoformat()
+            for h in range(9, 9 + slots):
+                meeting = (d + h) % 3 == 0
+                writer.writerow([
+                    log_date, hour_label(h % 24), "Yes" if meeting else "No",
+                    "Standup with the team" if meeting else "",
+                    f"Worked on ticket {d * 7 + h}", "notes, with a comma" if h % 2 else "",
+                ])
+
+def main(days, slots):
+    workdir = tempfile.mkdtemp(prefix="worklogger-import-")
+    source = os.path.join(workdir, "history.csv")
+    write_history(source, days, slots)
+    db.configure_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    db.init_db()
+
+    start = time.perf_counter()
+    stats = import_logs(source)
+    elapsed = time.perf_counter() - start
+
+    with db.engine.connect() as conn:
+        saved_days = conn.exec_driver_sql("SELECT COUNT(*) FROM work_logs").scalar()
+        saved_slots = conn.exec_driver_sql("SELECT COUNT(*) FROM work_log_entries").scalar()
+        rolled_up = conn.exec_driver_sql("SELECT SUM(logged_slots) FROM rollup_monthly").scalar()
+    if not saved_days == stats.days == days or not saved_slots == rolled_up == days * slots:
+        raise SystemExit(f"counts disagree: {saved_days} days, {saved_slots} slots, {rolled_up} rolled up")
+
+    size_mb = os.path.getsize(source) / 1e6
+    print(f"{days:,} days / {days * slots:,} slots ({size_mb:.0f} MB CSV) in {elapsed:.1f}s: "
+          f"{days / elapsed:,.0f} days/s, {days * slots / elapsed:,.0f} slots/s")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [DEFAULT_DAYS, DEFAULT_SLOTS][len(args):]))
@@ -0,0 +1,228 @@
+"""
+Benchmark: per-keystroke rerun latency and peak memory of app.py, driven
+through Streamlit's AppTest.
+
+    python benchmarks/bench_rerun.py                     # compare with the baseline
+    python benchmarks/bench_rerun.py --update-baseline   # record a new baseline
+    python benchmarks/bench_rerun.py --only 24-slots     # scenarios containing a substring
+
+Scenario matrix: hour slots x saved history x preview mode. The app needs
+Start Hour < End Hour, so the smallest range is 2 slots rather than 1.
+Each scenario types into one slot's Tasks box `--reruns` times and records
+the best, median and 90th percentile rerun wall time, then measures one
+more rerun under tracemalloc for peak Python memory. A keystroke reruns
+only that slot's fragment, the preview and the autosave status, so this is
+the latency of a fragment rerun; AppTest's own overhead is included.
+
+Results are compared with benchmarks/baselines/rerun.json. A scenario
+fails when its best rerun is more than `--tolerance` slower than the
+baseline (plus a few ms of slack) or its peak memory grows by more than
+`--memory-tolerance`; any failure exits non-zero. The best rerun is
+compared because medians wander by 30% or more between runs on shared
+machines while the best is far steadier, and a scenario that looks
+regressed is measured a second time before it counts. --update-baseline
+stores the middle of three attempts per scenario. Baselines are
+machine-specific, so re-record them when moving to different hardware.
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from worklogger import db  # noqa: E402
+from worklogger.logs import DayLog, hour_label  # noqa: E402
+
+APP_PATH = os.path.join(REPO, "app.py")
+BASELINE_PATH = os.path.join(REPO, "benchmarks", "baselines", "rerun.json")
+
+# (label, start hour, end hour)
+SLOT_RANGES = [("2-slots", 9, 10), ("10-slots", 8, 17), ("24-slots", 0, 23)]
+HISTORY_SIZES = [("empty", 0), ("10k-history", 10_000)]
+PREVIEW_MODES = ["Table", "List"]
+
+DEFAULT_RERUNS = 20
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.10
+# Absolute slack so fast scenarios don't fail on scheduler noise
+SLACK_MS = 5.0
+BASELINE_ATTEMPTS = 3
+
+def scenarios():
+    for slot_label, start_hour, end_hour in SLOT_RANGES:
+        for history_label, history_days in HISTORY_SIZES:
+            for preview in PREVIEW_MODES:
+                name = f"{slot_label}/{history_label}/{preview.lower()}"
+                yield name, start_hour, end_hour, history_days, preview
+
+def build_history(path, days):
+    """A database with `days` saved logs of 8 filled slots each"""
+    db.configure_engine(f"sqlite:///{path}")
+    db.init_db()
+    if not days:
+        return
+    slots = [hour_label(h) for h in range(9, 17)]
+    start = date.today() - timedelta(days=days)
+    batch = []
+    for d in range(days):
+        day_log = DayLog(slots, {
+            slot: {"meeting": i == 0, "meeting_info": "Standup", "tasks": f"Ticket {d}-{i}", "general": ""}
+            for i, slot in enumerate(slots)
+        })
+        batch.append((start + timedelta(days=d), day_log.summary(), day_log))
+        if len(batch) == 2000:
+            db.save_logs_batch(batch)
+            batch = []
+    if batch:
+        db.save_logs_batch(batch)
+
+def use_database(path):
+    db.configure_engine(f"sqlite:///{path}")
+    # init_db and the email outbox are cached per process; drop them so the app rebinds
+    st.cache_resource.clear()
+
+def widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"no widget labelled {label!r}")
+
+def run_scenario(start_hour, end_hour, preview, reruns):
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.secrets["email"] = {"password": "CHANGE_ME"}
+    at.run()
+    widget(at.sidebar.number_input, "Start Hour").set_value(start_hour)
+    widget(at.sidebar.number_input, "End Hour").set_value(end_hour)
+    widget(at.radio, "Choose preview format:").set_value(preview)
+    # Two warm-up reruns: settle the new range and fill module/engine caches
+    at.run()
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    tasks_boxes = [box for box in at.text_area if box.label == "✅ Tasks Worked On"]
+    target = tasks_boxes[len(tasks_boxes) // 2]
+    typed = ""
+    timings = []
+    for i in range(reruns):
+        typed += "abcdefghij"[i % 10]
+        target.set_value(typed)
+        # Keep collector pauses from earlier reruns out of this one
+        gc.collect()
+        started = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - started) * 1000)
+        target = [box for box in at.text_area if box.key == target.key][0]
+
+    typed += "!"
+    target.set_value(typed)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    at.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    return {
+        "slots": end_hour - start_hour + 1,
+        "best_ms": round(min(timings), 2),
+        "median_ms": round(statistics.median(timings), 2),
+        "p90_ms": round(statistics.quantiles(timings, n=10)[-1], 2),
+        "peak_kib": round(peak / 1024),
+    }
+
+def regressed(result, base, tolerance, memory_tolerance):
+    slow = result["best_ms"] > base["best_ms"] * (1 + tolerance) + SLACK_MS
+    heavy = result["peak_kib"] > base["peak_kib"] * (1 + memory_tolerance)
+    return slow or heavy
+
+def compare(results, baseline, tolerance, memory_tolerance):
+    """Print a results table against the baseline; return the names that regressed"""
+    failures = []
+    print(f"{'scenario':<32} {'best ms':>8} {'base':>8} {'median':>8} {'p90':>8} {'peak KiB':>9} {'base':>8}  status")
+    for name, result in results.items():
+        base = baseline.get(name)
+        status = "new"
+        if base:
+            status = "ok"
+            if regressed(result, base, tolerance, memory_tolerance):
+                status = "REGRESSED"
+                failures.append(name)
+        print(f"{name:<32} {result['best_ms']:>8.1f} {base['best_ms'] if base else '-':>8} "
+              f"{result['median_ms']:>8.1f} {result['p90_ms']:>8.1f} {result['peak_kib']:>9} {base['peak_kib'] if base else '-':>8}  {status}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=DEFAULT_RERUNS)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed fractional slowdown of the best rerun (default: %(default)s)")
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                        help="allowed fractional growth of peak memory (default: %(default)s)")
+    parser.add_argument("--only", help="run scenarios whose name contains this text")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="worklogger-rerun-")
+    # The app keeps its database relative to the working directory
+    os.chdir(workdir)
+    databases = {}
+    for history_label, history_days in HISTORY_SIZES:
+        databases[history_label] = os.path.join(workdir, f"{history_label}.db")
+        build_history(databases[history_label], history_days)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    for name, start_hour, end_hour, history_days, preview in scenarios():
+        if args.only and args.only not in name:
+            continue
+        use_database(databases[name.split("/")[1]])
+        if args.update_baseline:
+            # Record the middle of a few attempts so one lucky run doesn't set the bar
+            attempts = sorted((run_scenario(start_hour, end_hour, preview, args.reruns)
+                               for _ in range(BASELINE_ATTEMPTS)), key=lambda r: r["best_ms"])
+            results[name] = attempts[len(attempts) // 2]
+            continue
+        result = run_scenario(start_hour, end_hour, preview, args.reruns)
+        base = baseline.get(name)
+        if base and regressed(result, base, args.tolerance, args.memory_tolerance):
+            # A regression has to show up twice; one noisy burst on a shared machine isn't enough
+            retry = run_scenario(start_hour, end_hour, preview, args.reruns)
+            result = min(result, retry, key=lambda r: r["best_ms"])
+        results[name] = result
+
+    failures = compare(results, baseline, args.tolerance, args.memory_tolerance)
+
+    if args.update_baseline:
+        baseline.update(results)
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {os.path.relpath(BASELINE_PATH, REPO)}")
+        return 0
+
+    if failures:
+        print(f"\n{len(failures)} scenario(s) regressed: {', '.join(failures)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
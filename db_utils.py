@@ -1,39 +1,60 @@
-import pandas as pd
-from sqlalchemy import create_engine, text
+"""
+Streamlit-facing database helpers
+The storage logic lives in worklogger.db; this module adds the per-process
+schema cache for the app and re-exports the functions pages use, scoped to
+the signed-in user.
+"""
+
+import functools
+
 import streamlit as st
-import os
 
-# FORCE local SQLite regardless of secrets or env
-DB_TYPE = "sqlite"
-DB_URL = f"sqlite:///work_logs.db"  # relative file db in your app folder
+from worklogger import archive, db
+from worklogger.db import DEFAULT_USER_ID
+from worklogger.querycache import prefetch
+
+def current_user_id():
+    """The signed-in user's email when st.login auth is configured, else the shared default user"""
+    if st.user.get("is_logged_in"):
+        return st.user.get("email") or st.user.get("sub") or DEFAULT_USER_ID
+    return DEFAULT_USER_ID
 
-# Create engine
-engine = create_engine(DB_URL)
+def _for_current_user(fn):
+    # Callers may still pass user_id=... explicitly, e.g. for callbacks that
+    # run outside the script (deferred downloads) and can't read st.user
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        kwargs.setdefault("user_id", current_user_id())
+        return fn(*args, **kwargs)
+    return wrapper
 
+save_log_to_db = _for_current_user(db.save_log_to_db)
+load_log_entries = _for_current_user(db.load_log_entries)
+save_draft_entries = _for_current_user(db.save_draft_entries)
+load_draft_entries = _for_current_user(db.load_draft_entries)
+iter_log_entries = _for_current_user(db.iter_log_entries)
+get_meeting_entries = _for_current_user(db.get_meeting_entries)
+clear_all_logs = _for_current_user(db.clear_all_logs)
+get_rollups = _for_current_user(db.get_rollups)
+get_all_logs = _for_current_user(db.get_all_logs)
+get_log_history_page = _for_current_user(db.get_log_history_page)
+get_log_summary = _for_current_user(db.get_log_summary)
+search_logs = _for_current_user(db.search_logs)
+search_log_rows = _for_current_user(db.search_log_rows)
+get_entries_in_range = _for_current_user(db.get_entries_in_range)
+archived_months = _for_current_user(archive.archived_months)
+get_archived_logs = _for_current_user(archive.get_archived_logs)
+load_archived_entries = _for_current_user(archive.load_archived_entries)
+
+def prefetch_entries_in_range(start_date, end_date):
+    """Warm the shared query cache for get_entries_in_range() in the background"""
+    # The worker thread can't read st.user, so the user is bound here
+    prefetch(db.get_entries_in_range, start_date, end_date, user_id=current_user_id())
+
+@st.cache_resource(show_spinner=False)
 def init_db():
-    with engine.connect() as conn:
-        conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS work_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            log_date TEXT UNIQUE,
-            log_summary TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """))
-
-def save_log_to_db(log_date, log_summary):
-    with engine.begin() as conn:
-        # Upsert behavior: replace existing log for the same date if any
-        conn.execute(text("""
-        INSERT INTO work_logs (log_date, log_summary)
-        VALUES (:log_date, :log_summary)
-        ON CONFLICT(log_date) DO UPDATE SET
-          log_summary=excluded.log_summary,
-          created_at=CURRENT_TIMESTAMP
-        """), {"log_date": str(log_date), "log_summary": log_summary})
-
-def get_all_logs():
-    with engine.connect() as conn:
-        result = conn.execute(text("SELECT * FROM work_logs ORDER BY created_at DESC"))
-        df = pd.DataFrame(result.fetchall(), columns=result.keys())
-    return df
+    """Bring the schema up to date once per process; later reruns hit the cache"""
+    return db.run_migrations()
+
+def get_engine():
+    return db.engine
@@ -0,0 +1,120 @@
+"""
+Draft management for WorkLogger
+Keeps only the most recently used day drafts in st.session_state and
+autosaves edited hour slots to the log_draft_entries table, so evicted
+drafts and browser refreshes pick up where the user left off.
+"""
+
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+from db_utils import load_archived_entries, load_draft_entries, load_log_entries, save_draft_entries
+from log_utils import DayLog, seed_widget_state
+from metrics_utils import timed_fragment
+
+MAX_DRAFTS_IN_MEMORY = 5
+AUTOSAVE_DEBOUNCE_SECONDS = 2.0
+
+_LRU_KEY = "_draft_lru"
+# Whether the last full run started the autosave timer
+_TIMER_KEY = "_autosave_timer"
+
+def _lru():
+    if _LRU_KEY not in st.session_state:
+        st.session_state[_LRU_KEY] = OrderedDict()
+    return st.session_state[_LRU_KEY]
+
+def open_draft(log_key, log_date, hours, max_drafts=MAX_DRAFTS_IN_MEMORY):
+    """Return the DayLog for `log_key`, loading it if needed and evicting old drafts.
+
+    A day not in memory is rebuilt from its saved entries (or its archived
+    ones, once retention has moved it out) with any autosaved draft slots
+    layered on top.
+    """
+    lru = _lru()
+    if log_key not in st.session_state:
+        entries = load_log_entries(log_date) or load_archived_entries(log_date)
+        entries.update(load_draft_entries(log_date))
+        day_log = DayLog(hours, entries)
+        seed_widget_state(log_key, day_log, list(entries))
+        st.session_state[log_key] = day_log
+    lru[log_key] = str(log_date)
+    lru.move_to_end(log_key)
+
+    while len(lru) > max_drafts:
+        evict_draft(*lru.popitem(last=False))
+    return st.session_state[log_key]
+
+def flush_draft(log_date, day_log):
+    """Write the draft's dirty slots in one transaction; returns how many were written"""
+    dirty = day_log.take_dirty()
+    if not dirty:
+        return 0
+    try:
+        return save_draft_entries(log_date, day_log, dirty)
+    except Exception:
+        day_log.dirty |= dirty
+        raise
+
+def evict_draft(log_key, log_date):
+    """Flush one draft and drop it (and its widget keys) from the session"""
+    day_log = st.session_state.get(log_key)
+    if day_log is not None:
+        flush_draft(log_date, day_log)
+    widget_prefix = f"{log_key}_"
+    for key in [k for k in st.session_state.keys() if isinstance(k, str) and k.startswith(widget_prefix)]:
+        del st.session_state[key]
+    st.session_state.pop(log_key, None)
+
+def _flush_quiet_drafts(debounce):
+    """Flush every resident draft whose last edit is at least `debounce` seconds old"""
+    now = time.monotonic()
+    for log_key, log_date in _lru().items():
+        day_log = st.session_state.get(log_key)
+        if day_log is not None and day_log.dirty and now - day_log.last_edit >= debounce:
+            flush_draft(log_date, day_log)
+
+def _has_unsaved_drafts():
+    return any(getattr(st.session_state.get(log_key), "dirty", None) for log_key in _lru())
+
+def autosave_timer_running():
+    """Whether the autosave fragment is re-checking on a timer; a fragment
+    timer can only be started by a full rerun"""
+    return st.session_state.get(_TIMER_KEY, False)
+
+def autosave(day_log, debounce=AUTOSAVE_DEBOUNCE_SECONDS):
+    """Flush dirty slots once edits have been quiet for `debounce` seconds.
+
+    Drafts the user has navigated away from are flushed too. While any draft
+    has unsaved slots, a small fragment (key "autosave") re-checks on a timer
+    so the trailing edit is saved without waiting for the next interaction.
+    Once everything is saved it asks for one full rerun, which turns the
+    timer off, so idle tabs don't keep rerunning.
+    """
+    _flush_quiet_drafts(debounce)
+    timer = st.session_state[_TIMER_KEY] = _has_unsaved_drafts()
+
+    @st.fragment(key="autosave", run_every=debounce if timer else None)
+    @timed_fragment("autosave")
+    def _autosave_status():
+        _flush_quiet_drafts(debounce)
+        if day_log.dirty:
+            st.caption(f"✏️ {len(day_log.dirty)} unsaved hour(s)…")
+        else:
+            st.caption("💾 Draft autosaved")
+        if autosave_timer_running() and not _has_unsaved_drafts():
+            st.rerun()
+
+    _autosave_status()
+
+def draft_memory_stats():
+    """(drafts in memory, approximate bytes held by them)"""
+    lru = _lru()
+    total = 0
+    for log_key in lru:
+        day_log = st.session_state.get(log_key)
+        if day_log is not None:
+            total += day_log.approx_bytes()
+    return len(lru), total
@@ -1,40 +1,21 @@
-import smtplib
-import ssl
 import streamlit as st
-from email.message import EmailMessage
 
-def send_email_with_attachments(smtp_server, smtp_port, smtp_user, smtp_password,
-                                from_name, to, cc, subject, body, attachments):
-    if smtp_password == "CHANGE_ME":
-        return False, "SMTP password not configured. Set credentials in st.secrets."
-    if not to.strip():
-        return False, "Please provide at least one recipient email address."
+from metrics_utils import timed_fragment
+from worklogger.mail import (  # noqa: F401
+    build_message, parse_cc, open_smtp, deliver_message, smtp_pool, SMTPConnectionPool,
+    admin_transport, user_transport, send_email_with_attachments,
+    send_email_with_user_credentials, test_email_connection,
+)
 
-    try:
-        msg = EmailMessage()
-        msg["Subject"] = subject
-        msg["From"] = f"{from_name} <{smtp_user}>"
-        msg["To"] = to
-
-        cc_clean = [e.strip() for e in cc.replace(";", ",").split(",") if e.strip()]
-        if cc_clean:
-            msg["Cc"] = ", ".join(cc_clean)
-
-        msg.set_content(body)
-
-        for attachment in attachments:
-            file_bytes, maintype, subtype, filename = attachment
-            msg.add_attachment(file_bytes, maintype=maintype, subtype=subtype, filename=filename)
-
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(smtp_server, smtp_port, context=context) as server:
-            server.login(smtp_user, smtp_password)
-            all_recipients = [to] + cc_clean
-            server.send_message(msg, from_addr=smtp_user, to_addrs=all_recipients)
-
-        return True, "Email sent successfully! ✅"
-    except Exception as e:
-        return False, f"Failed to send email: {e}"
+def secrets_credential_provider(transport):
+    """Password for outbox jobs recovered after a restart, if they use the admin account"""
+    email_cfg = st.secrets.get("email", {})
+    password = email_cfg.get("password", "CHANGE_ME")
+    admin = admin_transport(email_cfg.get("server", "smtp.gmail.com"), email_cfg.get("port", 465),
+                            email_cfg.get("user", ""))
+    if password == "CHANGE_ME" or transport != admin:
+        raise KeyError("SMTP credentials are no longer available for this message")
+    return password
 
 def show_email_configuration_form():
     """Show form for users to input their own email credentials for testing"""
@@ -128,52 +109,32 @@ def show_email_configuration_form():
                 st.info("👆 Fill in the email credentials above to enable email functionality.")
                 return False, {}
 
-def test_email_connection(smtp_server, smtp_port, smtp_user, smtp_password, use_tls=True):
-    """Test email connection without sending an email"""
-    try:
-        if use_tls:
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-        else:
-            context = ssl.create_default_context()
-            server = smtplib.SMTP_SSL(smtp_server, smtp_port, context=context)
-        
-        server.login(smtp_user, smtp_password)
-        server.quit()
-        return True, "Connection successful!"
-    except Exception as e:
-        return False, f"Connection failed: {str(e)}"
+OUTBOX_STATUS_ICONS = {"queued": "⏳", "sending": "📤", "sent": "✅", "failed": "❌"}
 
-def send_email_with_user_credentials(user_config, to, cc, subject, body, attachments):
-    """Send email using user-provided credentials"""
-    try:
-        msg = EmailMessage()
-        msg["Subject"] = subject
-        msg["From"] = f"{user_config['sender_name']} <{user_config['user']}>"
-        msg["To"] = to
+def show_outbox_status(outbox, job_ids, poll_seconds=2):
+    """Show this session's queued emails, polling in a fragment while any are pending"""
+    if not job_ids:
+        return
 
-        cc_clean = [e.strip() for e in cc.replace(";", ",").split(",") if e.strip()]
-        if cc_clean:
-            msg["Cc"] = ", ".join(cc_clean)
+    def pending(rows):
+        return any(row["status"] in ("queued", "sending") for row in rows)
 
-        msg.set_content(body)
+    initial = outbox.statuses(job_ids)
 
-        for attachment in attachments:
-            file_bytes, maintype, subtype, filename = attachment
-            msg.add_attachment(file_bytes, maintype=maintype, subtype=subtype, filename=filename)
-
-        if user_config.get('use_tls', True):
-            server = smtplib.SMTP(user_config['server'], user_config['port'])
-            server.starttls()
-        else:
-            context = ssl.create_default_context()
-            server = smtplib.SMTP_SSL(user_config['server'], user_config['port'], context=context)
-        
-        server.login(user_config['user'], user_config['password'])
-        all_recipients = [to] + cc_clean
-        server.send_message(msg, from_addr=user_config['user'], to_addrs=all_recipients)
-        server.quit()
+    @st.fragment(run_every=poll_seconds if pending(initial) else None)
+    @timed_fragment("outbox")
+    def _status_panel():
+        rows = outbox.statuses(job_ids)
+        st.caption("Outbox")
+        for row in rows:
+            line = f"{OUTBOX_STATUS_ICONS.get(row['status'], '')} {row['subject']} — {row['status']}"
+            if row["status"] == "queued" and row["attempts"]:
+                line += f" (retry {row['attempts']}/{row['max_attempts']})"
+            st.write(line)
+            if row["status"] == "failed" and row["last_error"]:
+                st.error(row["last_error"])
+        if pending(initial) and not pending(rows):
+            # Everything settled: one full rerun turns polling off
+            st.rerun()
 
-        return True, "Email sent successfully! ✅"
-    except Exception as e:
-        return False, f"Failed to send email: {e}"
+    _status_panel()
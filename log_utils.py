@@ -1,21 +1,11 @@
 import streamlit as st
 
-def initialize_log(log_key, hours):
-    if log_key not in st.session_state:
-        st.session_state[log_key] = {
-            hour: {"meeting": False, "meeting_info": "", "tasks": "", "general": ""}
-            for hour in hours
-        }
+from worklogger.logs import ENTRY_FIELDS, DayLog, RenderedLog, empty_entry  # noqa: F401
 
-def get_log_records(log_key, hours):
-    records = []
-    for hour in hours:
-        entry = st.session_state[log_key][hour]
-        records.append({
-            "Time": hour,
-            "Meeting": "Yes" if entry["meeting"] else "No",
-            "Meeting Information": entry["meeting_info"] if entry["meeting"] else "",
-            "Tasks": entry["tasks"],
-            "General Information": entry["general"]
-        })
-    return records
+def seed_widget_state(log_key, day_log, slots=None):
+    """Copy DayLog values into the per-hour widget keys so expanders render them"""
+    for slot in (day_log.slots if slots is None else slots):
+        if slot in day_log:
+            entry = day_log.entry(day_log.position(slot))
+            for field in ENTRY_FIELDS:
+                st.session_state[f"{log_key}_{slot}_{field}"] = entry[field]
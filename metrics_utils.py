@@ -0,0 +1,110 @@
+"""
+Streamlit side of rerun timing: the process-wide metrics log, fragment
+timing and the sidebar debug panel. Timing itself lives in worklogger.metrics.
+"""
+
+import functools
+from collections import deque
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from worklogger.metrics import (  # noqa: F401
+    NULL_TIMER, instrument_engine, metrics_log_from_env, start_rerun_timer, timed,
+)
+from worklogger.querycache import query_cache
+
+DEBUG_TOGGLE_KEY = "debug_timings"
+FRAGMENT_TIMINGS_KEY = "_fragment_timings"
+# Fragment reruns kept for the panel, newest last
+RECENT_FRAGMENT_RUNS = 20
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_log():
+    """Rotating JSON-lines log at $WORKLOGGER_METRICS_FILE, shared by all sessions (or None)"""
+    return metrics_log_from_env()
+
+def timings_requested():
+    """Whether this session turned the debug panel on (read before the toggle is drawn)"""
+    return bool(st.session_state.get(DEBUG_TOGGLE_KEY, False))
+
+def _fragment_rerun():
+    """Whether this script run reruns only fragments, not the whole page"""
+    ctx = get_script_run_ctx()
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+def timed_fragment(name):
+    """Decorator for a fragment body: time its own reruns as a 'fragment.<name>' record.
+
+    During a full run the body is already covered by the page's phases, so
+    it's only timed when the fragment reruns by itself. Like full runs,
+    reruns that end early (st.rerun) are not recorded.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            metrics_log = get_metrics_log()
+            requested = timings_requested()
+            if not _fragment_rerun() or not (requested or metrics_log is not None):
+                return fn(*args, **kwargs)
+            timer = start_rerun_timer(True, f"fragment.{name}")
+            timer.phase(name)
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                timer.finish()
+                raise
+            record = timer.finish().as_record()
+            if metrics_log is not None:
+                metrics_log.write(record)
+            if requested:
+                st.session_state.setdefault(FRAGMENT_TIMINGS_KEY, deque(maxlen=RECENT_FRAGMENT_RUNS)).append(record)
+            return result
+        return wrapper
+    return decorate
+
+def show_timing_panel(timer):
+    """Sidebar toggle plus, when on, this rerun's phase and query timings"""
+    st.sidebar.toggle("🐞 Show rerun timings", key=DEBUG_TOGGLE_KEY)
+    if not timer or not timings_requested():
+        return
+
+    query_counts, query_ms = {}, {}
+    for phase, _, ms in timer.queries:
+        query_counts[phase] = query_counts.get(phase, 0) + 1
+        query_ms[phase] = query_ms.get(phase, 0.0) + ms
+
+    with st.sidebar.expander("⏱️ Rerun timings", expanded=True):
+        st.caption(
+            f"Total {timer.total_ms:.1f} ms • {len(timer.queries)} queries "
+            f"({sum(query_ms.values()):.1f} ms)"
+        )
+        st.dataframe(
+            {
+                "phase": [name for name, _ in timer.spans],
+                "ms": [round(ms, 1) for _, ms in timer.spans],
+                "queries": [query_counts.get(name, 0) for name, _ in timer.spans],
+                "query ms": [round(query_ms.get(name, 0.0), 1) for name, _ in timer.spans],
+            },
+            hide_index=True,
+        )
+        for query in timer.as_record()["slowest_queries"]:
+            st.caption(f"{query['ms']:.1f} ms · {query['phase']} · `{query['sql']}`")
+        # Fragments can't draw in the sidebar, so their reruns show up here on the next full run
+        fragment_runs = st.session_state.get(FRAGMENT_TIMINGS_KEY)
+        if fragment_runs:
+            st.caption(f"Last {len(fragment_runs)} fragment reruns, newest first")
+            st.dataframe(
+                {
+                    "fragment": [record["label"].removeprefix("fragment.") for record in reversed(fragment_runs)],
+                    "ms": [record["total_ms"] for record in reversed(fragment_runs)],
+                    "queries": [record["queries"] for record in reversed(fragment_runs)],
+                    "query ms": [record["query_ms"] for record in reversed(fragment_runs)],
+                },
+                hide_index=True,
+            )
+        cache = query_cache.stats()
+        st.caption(
+            f"Query cache (all sessions): {cache['hits']} hits • {cache['misses']} misses • "
+            f"{cache['entries']} entries (~{cache['bytes'] / 1024:.0f} KB)"
+        )
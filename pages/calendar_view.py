@@ -0,0 +1,123 @@
+import calendar
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit as st
+
+from db_utils import init_db, get_entries_in_range, prefetch_entries_in_range
+from worklogger.logs import slot_sort_key
+
+st.set_page_config(page_title="WorkLogger Calendar", layout="wide")
+st.title("🗓️ WorkLogger Calendar")
+
+init_db()
+
+WEEKDAYS = list(calendar.day_abbr)
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def period_bounds(view, anchor):
+    """First and last day of the week (Monday-Sunday) or month containing `anchor`"""
+    if view == "Week":
+        start = anchor - timedelta(days=anchor.weekday())
+        return start, start + timedelta(days=6)
+    start = anchor.replace(day=1)
+    return start, start.replace(day=calendar.monthrange(start.year, start.month)[1])
+
+def shifted(view, anchor, step):
+    return anchor + timedelta(weeks=step) if view == "Week" else add_months(anchor, step)
+
+def logged_mask(entries):
+    """Slots with anything in them (saved days keep their empty hours too)"""
+    return (entries["meeting"].astype(bool)
+            | entries["tasks"].str.strip().ne("")
+            | entries["general_info"].str.strip().ne(""))
+
+def cell_text(row):
+    parts = []
+    if row.meeting:
+        parts.append(f"🤝 {row.meeting_info.strip() or 'Meeting'}")
+    for text in (row.tasks, row.general_info):
+        if text.strip():
+            parts.append(" ".join(text.split()))
+    return " · ".join(parts)
+
+view = st.radio("View", options=["Week", "Month"], horizontal=True, key="calendar_view")
+if "calendar_anchor" not in st.session_state:
+    st.session_state.calendar_anchor = date.today()
+
+def move(step):
+    if step == 0:
+        st.session_state.calendar_anchor = date.today()
+    else:
+        st.session_state.calendar_anchor = shifted(view, st.session_state.calendar_anchor, step)
+
+anchor = st.session_state.calendar_anchor
+start_date, end_date = period_bounds(view, anchor)
+
+nav_prev, nav_today, nav_next, nav_label = st.columns([1, 1, 1, 4])
+nav_prev.button(f"⬅️ Previous {view.lower()}", on_click=move, args=(-1,))
+nav_today.button("Today", on_click=move, args=(0,))
+nav_next.button(f"Next {view.lower()} ➡️", on_click=move, args=(1,))
+if view == "Week":
+    nav_label.subheader(f"{start_date.strftime('%b %d')} – {end_date.strftime('%b %d, %Y')} (week {start_date.isocalendar()[1]})")
+else:
+    nav_label.subheader(start_date.strftime("%B %Y"))
+
+# The whole period comes from one range query, shared through the query cache
+entries = get_entries_in_range(start_date, end_date)
+entries = entries[logged_mask(entries)]
+
+# Paging is instant when the neighbouring period is already cached
+for step in (-1, 1):
+    prefetch_entries_in_range(*period_bounds(view, shifted(view, anchor, step)))
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Days logged", entries["log_date"].nunique())
+col2.metric("Logged hours", len(entries))
+col3.metric("Hours in meetings", int(entries["meeting"].astype(bool).sum()))
+
+if view == "Week":
+    days = [start_date + timedelta(days=i) for i in range(7)]
+    if entries.empty:
+        st.info("Nothing saved this week.")
+    else:
+        entries = entries.assign(cell=[cell_text(row) for row in entries.itertuples(index=False)])
+        grid = entries.pivot(index="slot", columns="log_date", values="cell")
+        grid = grid.reindex(index=sorted(grid.index, key=slot_sort_key), columns=[str(day) for day in days])
+        grid.columns = [f"{day.strftime('%a')} {day.strftime('%m/%d')}" for day in days]
+        st.dataframe(grid.fillna(""))
+else:
+    per_day = entries.groupby("log_date").agg(hours=("slot", "size"), meetings=("meeting", "sum"))
+    rows, labels = [], []
+    for week in calendar.Calendar().monthdatescalendar(start_date.year, start_date.month):
+        cells = []
+        for day in week:
+            if day.month != start_date.month:
+                cells.append("")
+            elif str(day) in per_day.index:
+                counts = per_day.loc[str(day)]
+                meetings = f" · 🤝 {int(counts['meetings'])}" if counts["meetings"] else ""
+                cells.append(f"{day.day} · {int(counts['hours'])}h{meetings}")
+            else:
+                cells.append(str(day.day))
+        rows.append(cells)
+        labels.append(f"W{week[0].isocalendar()[1]:02d}")
+    st.dataframe(pd.DataFrame(rows, index=labels, columns=WEEKDAYS))
+
+    logged_days = sorted(per_day.index)
+    if logged_days:
+        # Read from the month already loaded; no query per day
+        day = st.selectbox("Show day", options=logged_days, index=len(logged_days) - 1, key="calendar_day")
+        day_entries = entries[entries["log_date"] == day].assign(meeting=lambda df: df["meeting"].astype(bool))
+        st.dataframe(
+            day_entries[["slot", "meeting", "meeting_info", "tasks", "general_info"]].rename(columns={
+                "slot": "Time", "meeting": "Meeting", "meeting_info": "Meeting Information",
+                "tasks": "Tasks", "general_info": "General Information",
+            }),
+            hide_index=True,
+        )
+    else:
+        st.info("Nothing saved this month.")
@@ -0,0 +1,51 @@
+import streamlit as st
+import pandas as pd
+from datetime import date
+
+from db_utils import init_db, get_rollups
+
+st.set_page_config(page_title="WorkLogger Reports", layout="wide")
+st.title("📈 WorkLogger Reports")
+
+init_db()
+
+granularity_labels = {"Daily": "day", "Weekly (ISO)": "week", "Monthly": "month"}
+granularity = granularity_labels[st.radio("Group by", options=list(granularity_labels), index=1, horizontal=True)]
+
+today = date.today()
+start_date, end_date = today - pd.Timedelta(days=365), today
+date_range = st.date_input("Date range", value=(start_date, end_date))
+if isinstance(date_range, (tuple, list)) and len(date_range) == 2:
+    start_date, end_date = date_range
+
+# Rollup keys sort lexically, so the range maps straight onto the period keys
+if granularity == "day":
+    start_key, end_key = start_date, end_date
+elif granularity == "week":
+    start_iso, end_iso = start_date.isocalendar(), end_date.isocalendar()
+    start_key = f"{start_iso[0]}-W{start_iso[1]:02d}"
+    end_key = f"{end_iso[0]}-W{end_iso[1]:02d}"
+else:
+    start_key, end_key = start_date.strftime("%Y-%m"), end_date.strftime("%Y-%m")
+
+rollups = get_rollups(granularity, start_key, end_key)
+
+if rollups.empty:
+    st.info("No saved logs in this range yet. Save a day's log to start building reports.")
+else:
+    period_col = "log_date" if granularity == "day" else "period"
+    chart_df = rollups.set_index(period_col)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Logged hours", int(chart_df["logged_slots"].sum()))
+    col2.metric("Hours in meetings", int(chart_df["meeting_slots"].sum()))
+    col3.metric("Hours with tasks", int(chart_df["task_slots"].sum()))
+
+    st.subheader("🤝 Hours in meetings")
+    st.bar_chart(chart_df["meeting_slots"])
+
+    st.subheader("🕒 Logged vs. task hours")
+    st.line_chart(chart_df[["logged_slots", "task_slots"]])
+
+    with st.expander("Raw rollup data"):
+        st.dataframe(rollups)
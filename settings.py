@@ -1,10 +1,8 @@
 import streamlit as st
 import os
 
-def hour_label(h):
-    suffix = "AM" if h < 12 else "PM"
-    hour12 = h if 1 <= h <= 12 else (h - 12 if h > 12 else 12)
-    return f"{hour12}:00 {suffix}"
+from worklogger import db
+from worklogger.logs import hour_label
 
 def get_time_range():
     st.sidebar.header("Select Time Range (24-hour format)")
@@ -19,9 +17,10 @@ def get_time_range():
     return start_hour, end_hour, hours
 
 def get_database_settings():
+    """Show the storage backend this process runs on (chosen with WORKLOGGER_DB_URL)"""
     st.sidebar.header("Database Settings")
-    db_type = st.sidebar.selectbox("Select Database", ["sqlite", "postgres"], index=0)
-    return db_type
+    st.sidebar.caption(f"🗄️ {db.backend.describe(db.DB_URL)}")
+    return db.backend.name
 
 def show_help_section():
     st.sidebar.header("📚 Help & Support")
@@ -0,0 +1,65 @@
+"""
+Shared fixtures. `database` runs a test once per storage backend: a SQLite
+file, SQLite in memory and PostgreSQL. The PostgreSQL run needs a server and
+a driver; point WORKLOGGER_TEST_POSTGRES_URL at a database the tests may
+create schemas in, e.g.
+
+    WORKLOGGER_TEST_POSTGRES_URL=postgresql+psycopg://postgres@localhost/worklogger_test pytest
+
+Without it (or when the server can't be reached) those runs are skipped.
+"""
+
+import os
+import sys
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worklogger import db  # noqa: E402
+
+POSTGRES_URL = os.environ.get("WORKLOGGER_TEST_POSTGRES_URL")
+
+def _postgres_schema():
+    """A fresh schema on the test server, dropped again by the generator's cleanup"""
+    if not POSTGRES_URL:
+        pytest.skip("set WORKLOGGER_TEST_POSTGRES_URL to run against PostgreSQL")
+    try:
+        admin = create_engine(POSTGRES_URL)
+        with admin.begin() as conn:
+            schema = f"worklogger_test_{uuid.uuid4().hex[:12]}"
+            conn.execute(text(f"CREATE SCHEMA {schema}"))
+    except Exception as e:  # no driver, no server
+        pytest.skip(f"PostgreSQL unavailable: {e}")
+    try:
+        yield schema
+    finally:
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+@pytest.fixture(params=["sqlite", "memory", "postgres"])
+def database(request, tmp_path):
+    """The worklogger.db module pointed at an empty, migrated database on each backend"""
+    saved = db.DB_URL, db.backend, db.engine
+    if request.param == "sqlite":
+        db.configure_engine(f"sqlite:///{tmp_path / 'work_logs.db'}")
+        schemas = None
+    elif request.param == "memory":
+        db.configure_engine("sqlite://")
+        schemas = None
+    else:
+        schemas = _postgres_schema()
+        schema = next(schemas)
+        db.configure_engine(POSTGRES_URL, connect_args={"options": f"-c timezone=UTC -c search_path={schema}"})
+    db.init_db()
+    try:
+        yield db
+    finally:
+        db.engine.dispose()
+        db.DB_URL, db.backend, db.engine = saved
+        db.query_cache.clear()
+        if schemas is not None:
+            schemas.close()
@@ -0,0 +1,71 @@
+import threading
+import time
+from datetime import date
+
+from worklogger import archive
+from worklogger.logs import DayLog
+
+SLOTS = ["9:00 AM", "10:00 AM"]
+
+def save(db, log_date, tasks):
+    log = DayLog(SLOTS, {"9:00 AM": {"tasks": tasks}})
+    db.save_log_to_db(log_date, log.summary(), log)
+
+def test_retention_moves_old_months_to_the_archive(database, tmp_path):
+    save(database, date(2024, 1, 15), "january")
+    save(database, date(2024, 5, 6), "may")
+
+    stats = archive.apply_retention(2, archive_dir=tmp_path, today=date(2024, 5, 20), reclaim=False)
+    assert (stats["months"], stats["days"], stats["entries"]) == (1, 1, 2)
+
+    assert list(database.get_all_logs()["log_date"]) == ["2024-05-06"]
+    assert archive.archived_months(archive_dir=tmp_path) == ["2024-01"]
+    archived = archive.get_archived_logs("2024-01", archive_dir=tmp_path)
+    assert "january" in archived["log_summary"][0]
+    # Rollups stay behind so reports still count the month
+    assert [row["period"] for row in database.get_rollups("month").to_dict("records")] == ["2024-01", "2024-05"]
+
+def test_a_save_during_archiving_stays_hot(database):
+    save(database, date(2024, 1, 15), "archived")
+    saver = threading.Thread(target=save, args=(database, date(2024, 1, 15), "saved meanwhile"))
+
+    def write(logs, entries):
+        assert "archived" in logs[0]["log_summary"]
+        # Another session saves the day after it has been read for the archive
+        saver.start()
+        time.sleep(0.3)
+
+    assert database.archive_month("2024-01", write) == (1, 2)
+    saver.join(30)
+
+    logs = database.get_all_logs()
+    assert list(logs["log_date"]) == ["2024-01-15"]
+    assert "saved meanwhile" in logs["log_summary"][0]
+    assert database.load_log_entries(date(2024, 1, 15))["9:00 AM"]["tasks"] == "saved meanwhile"
+
+def test_clearing_leaves_reclaiming_to_the_archive_run(database, tmp_path, monkeypatch):
+    reclaims = []
+    monkeypatch.setattr(database.backend, "reclaim_space", lambda engine: reclaims.append(engine))
+    save(database, date(2024, 5, 6), "may")
+
+    database.clear_all_logs()
+    assert reclaims == []
+    stats = archive.apply_retention(2, archive_dir=tmp_path, today=date(2024, 5, 20))
+    assert stats["months"] == 0 and reclaims == [database.engine]
+
+def test_an_archived_day_opens_with_its_slots_and_saves_back(database, tmp_path, monkeypatch):
+    from worklogger import cli
+
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    save(database, date(2024, 1, 15), "january")
+    archive.apply_retention(2, today=date(2024, 5, 20), reclaim=False)
+    assert database.load_log_entries(date(2024, 1, 15)) == {}
+
+    day_log = cli.load_day(date(2024, 1, 15))
+    assert day_log.slots == SLOTS and day_log.tasks == ["january", ""]
+    day_log.update(1, "tasks", "follow-up")
+    database.save_log_to_db(date(2024, 1, 15), day_log.summary(), day_log)
+
+    assert database.load_log_entries(date(2024, 1, 15))["10:00 AM"]["tasks"] == "follow-up"
+    archive.apply_retention(2, today=date(2024, 5, 20), reclaim=False)
+    assert archive.load_archived_entries(date(2024, 1, 15))["10:00 AM"]["tasks"] == "follow-up"
@@ -0,0 +1,87 @@
+import threading
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from worklogger import compression
+from worklogger.logs import DayLog
+
+SLOTS = ["9:00 AM", "10:00 AM"]
+
+def summary(tasks):
+    return DayLog(SLOTS, {"9:00 AM": {"tasks": tasks}, "10:00 AM": {"tasks": "code review"}}).summary()
+
+@pytest.fixture
+def compressing(database):
+    if not database.backend.compresses_summaries:
+        pytest.skip(f"{database.backend.name} stores summaries as plain text")
+    start = date(2024, 1, 1)
+    for i in range(database.MIN_TRAINING_SAMPLES + 10):
+        database.save_log_to_db(start + timedelta(days=i), summary(f"ticket {i} for the billing service"))
+    return database
+
+@pytest.mark.parametrize("codec", compression.available_codecs())
+def test_trained_dictionary_round_trips(codec):
+    samples = [summary(f"ticket {i} for the billing service") for i in range(100)]
+    dictionary = compression.train_dictionary(samples, codec)
+    packed = compression.SummaryCodec(7, codec, dictionary).pack(samples[0])
+    assert isinstance(packed, bytes) and len(packed) < len(samples[0].encode("utf-8"))
+    assert compression.packed_dictionary_id(packed) == 7
+    codec_for = {7: compression.SummaryCodec(7, codec, dictionary)}.get
+    assert compression.unpack(packed, codec_for) == samples[0]
+    assert compression.unpack("plain text", codec_for) == "plain text"
+
+@pytest.mark.parametrize("codec", compression.available_codecs())
+def test_one_codec_serves_many_threads(codec):
+    samples = [summary(f"ticket {i} for the billing service") for i in range(200)]
+    shared = compression.SummaryCodec(1, codec, compression.train_dictionary(samples, codec))
+    mismatches = []
+
+    def worker(offset):
+        for sample in samples[offset::4] * 5:
+            if shared.unpack(shared.pack(sample)) != sample:
+                mismatches.append(sample)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not mismatches
+
+def test_zlib_is_the_default_codec():
+    assert compression.default_codec() == "zlib"
+
+def test_compress_summaries_keeps_text_and_search(compressing):
+    db = compressing
+    before = db.get_all_logs()
+    stats = db.compress_summaries(batch_rows=16)
+    assert stats["rows"] == len(before)
+    assert stats["bytes_after"] < stats["bytes_before"]
+
+    db.query_cache.clear()
+    after = db.get_all_logs()
+    assert list(after["log_summary"]) == list(before["log_summary"])
+    assert [row["log_date"] for row in db.search_log_rows("ticket 7")[0]][:1] == ["2024-01-08"]
+
+def test_repack_leaves_rows_saved_since_they_were_read(compressing, monkeypatch):
+    db = compressing
+    with db.engine.begin() as conn:
+        codec = db._train_summary_dictionary(conn)
+    first_id = db.get_all_logs()["id"].min()
+    unpack = db._unpack_summary
+
+    def save_while_repacking(conn, value):
+        # Another session saves the first row after the batch has read it
+        if conn.execute(text("SELECT COUNT(*) FROM work_logs WHERE log_summary = 'edited'")).scalar() == 0:
+            conn.execute(text("UPDATE work_logs SET log_summary = 'edited' WHERE id = :id"), {"id": int(first_id)})
+        return unpack(conn, value)
+
+    monkeypatch.setattr(db, "_unpack_summary", save_while_repacking)
+    with db.engine.begin() as conn:
+        db._recompress_batch(conn, codec, 0)
+    monkeypatch.setattr(db, "_unpack_summary", unpack)
+
+    db.query_cache.clear()
+    assert db.get_log_summary(int(first_id)) == "edited"
@@ -0,0 +1,20 @@
+from datetime import date
+
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from worklogger.export import RANGE_EXPORT_FORMATS, range_export_bytes
+from worklogger.logs import DayLog
+
+SLOTS = ["9:00 AM", "10:00 AM"]
+
+@pytest.mark.parametrize("fmt", RANGE_EXPORT_FORMATS)
+def test_range_export_is_accepted_by_download_button(database, fmt):
+    log = DayLog(SLOTS, {"9:00 AM": {"tasks": "ship it"}})
+    database.save_log_to_db(date(2024, 5, 6), log.summary(), log)
+
+    # What the app's deferred data= callable hands to Streamlit on click
+    data = range_export_bytes(database.iter_log_entries("2024-05-01", "2024-05-31", chunksize=1), fmt)
+    converted, _ = convert_data_to_bytes_and_infer_mime(data, TypeError("unsupported"))
+    assert converted.count(b"ship it") == 1
+    assert len(converted.splitlines()) == (3 if fmt == "csv" else 2)
@@ -0,0 +1,17 @@
+from worklogger.logs import DayLog, parse_summary
+
+SLOTS = ["8:00 AM", "9:00 AM", "12:00 PM"]
+
+def test_parse_summary_inverts_summary():
+    day_log = DayLog(SLOTS, {
+        "8:00 AM": {"meeting": True, "meeting_info": "standup", "tasks": "a\n\nb", "general": ""},
+        "12:00 PM": {"meeting": False, "meeting_info": "", "tasks": "", "general": "lunch talk\nnotes"},
+    })
+    entries = parse_summary(day_log.summary())
+    assert list(entries) == ["8:00 AM", "12:00 PM"]
+    assert entries["8:00 AM"] == {"meeting": True, "meeting_info": "standup", "tasks": "a\n\nb", "general": ""}
+    assert DayLog(SLOTS, entries).summary() == day_log.summary()
+
+def test_parse_summary_of_an_empty_day():
+    assert parse_summary(DayLog(SLOTS).summary()) == {}
+    assert parse_summary(None) == {}
@@ -0,0 +1,71 @@
+import sqlite3
+
+from sqlalchemy import text
+
+from worklogger import cli, db
+from worklogger.logs import DayLog
+
+SLOTS = ["8:00 AM", "9:00 AM", "10:00 AM"]
+
+def legacy_database(path, days):
+    """A work_logs.db as the original app left it: summaries only, no schema_version"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+    CREATE TABLE work_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        log_date TEXT UNIQUE,
+        log_summary TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.executemany("INSERT INTO work_logs (log_date, log_summary) VALUES (?, ?)",
+                     [(log_date, day_log.summary()) for log_date, day_log in days])
+    conn.commit()
+    conn.close()
+
+def test_summary_only_days_get_entries_and_rollups(tmp_path):
+    days = [
+        ("2024-05-06", DayLog(SLOTS, {
+            "8:00 AM": {"meeting": True, "meeting_info": "standup\nwith infra", "tasks": "", "general": ""},
+            "10:00 AM": {"meeting": False, "meeting_info": "", "tasks": "fix login\n\nship it", "general": "calm"},
+        })),
+        ("2024-05-07", DayLog(SLOTS, {"9:00 AM": {"tasks": "reviews"}})),
+        ("2024-05-08", DayLog(SLOTS)),
+    ]
+    path = tmp_path / "work_logs.db"
+    legacy_database(path, days)
+
+    engine = db.create_db_engine(f"sqlite:///{path}")
+    try:
+        assert db.run_migrations(engine) == db.MIGRATIONS[-1][0]
+        with engine.connect() as conn:
+            rows = conn.execute(text("""
+            SELECT log_date, slot, meeting, meeting_info, tasks, general_info
+            FROM work_log_entries ORDER BY log_date, position
+            """)).fetchall()
+            months = conn.execute(text("""
+            SELECT user_id, period, logged_days, logged_slots, meeting_slots, task_slots FROM rollup_monthly
+            """)).fetchall()
+    finally:
+        engine.dispose()
+
+    assert [tuple(row) for row in rows] == [
+        ("2024-05-06", "8:00 AM", 1, "standup\nwith infra", "", ""),
+        ("2024-05-06", "10:00 AM", 0, "", "fix login\n\nship it", "calm"),
+        ("2024-05-07", "9:00 AM", 0, "", "reviews", ""),
+    ]
+    assert [tuple(row) for row in months] == [("default", "2024-05", 2, 3, 1, 2)]
+
+def test_range_export_includes_migrated_days(tmp_path, monkeypatch):
+    path = tmp_path / "work_logs.db"
+    legacy_database(path, [("2024-05-07", DayLog(SLOTS, {"9:00 AM": {"tasks": "reviews"}}))])
+    for name in ("DB_URL", "backend", "engine"):
+        monkeypatch.setattr(db, name, getattr(db, name))
+
+    out = tmp_path / "may.csv"
+    assert cli.main(["--db", f"sqlite:///{path}", "export", "--start", "2024-05-01", "--end", "2024-05-31",
+                     "--format", "csv", "-o", str(out)]) == 0
+    db.engine.dispose()
+    lines = out.read_text().splitlines()
+    assert len(lines) == 2
+    assert lines[1].startswith("2024-05-07,9:00 AM,No,,reviews")
@@ -0,0 +1,191 @@
+"""
+Outbox and pooled SMTP delivery against a local aiosmtpd server.
+"""
+
+import socket
+import time
+from email.message import EmailMessage
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from worklogger import db, mail
+from worklogger.outbox import EmailOutbox, PENDING_STATUSES
+
+class RecordingHandler:
+    """Accepts every message unless told to answer DATA with an error first"""
+
+    def __init__(self):
+        self.accepted = []
+        self.peers = set()
+        self.attempts = []
+        self.reply = None
+        self.failures = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.attempts.append(time.monotonic())
+        if self.reply is not None and self.failures:
+            self.failures -= 1
+            return self.reply
+        self.accepted.append(envelope)
+        self.peers.add(session.peer)
+        return "250 Message accepted for delivery"
+
+    def fail(self, reply, times=float("inf")):
+        self.reply, self.failures = reply, times
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    handler.transport = {"server": "127.0.0.1", "port": controller.port, "user": "me", "security": "none"}
+    try:
+        yield handler
+    finally:
+        controller.stop()
+
+@pytest.fixture
+def smtp_pool(monkeypatch):
+    """A fresh pool behind mail.deliver_message and deliver_batch, so connects are counted per test"""
+    pool = mail.SMTPConnectionPool()
+    monkeypatch.setattr(mail, "smtp_pool", pool)
+    yield pool
+    pool.close_all()
+
+@pytest.fixture
+def outbox_engine(tmp_path):
+    engine = db.create_db_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    db.run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+def message(number):
+    msg = EmailMessage()
+    msg["Subject"] = f"Work log {number}"
+    msg["From"] = "me@example.com"
+    msg["To"] = "boss@example.com"
+    msg.set_content(f"log {number}")
+    return msg
+
+def wait_until_settled(outbox, job_ids, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        rows = outbox.statuses(job_ids)
+        if all(row["status"] not in PENDING_STATUSES for row in rows):
+            return {row["id"]: row for row in rows}
+        time.sleep(0.02)
+    raise AssertionError(f"jobs still pending: {outbox.statuses(job_ids)}")
+
+def test_send_many_uses_one_connection_per_batch(smtp_server, smtp_pool):
+    batch = [(["boss@example.com"], message(i)) for i in range(4)]
+    smtp_pool.send_many(smtp_server.transport, "", "me@example.com", batch)
+
+    assert smtp_pool.connects == 1
+    assert len(smtp_server.peers) == 1
+    assert [envelope.content.count(b"Work log") for envelope in smtp_server.accepted] == [1] * 4
+
+def test_outbox_delivers_and_reuses_the_session(smtp_server, smtp_pool, outbox_engine):
+    outbox = EmailOutbox(outbox_engine, workers=1)
+    try:
+        job_ids = [outbox.enqueue(smtp_server.transport, "", "me@example.com", ["boss@example.com"], message(i))
+                   for i in range(4)]
+        jobs = wait_until_settled(outbox, job_ids)
+    finally:
+        outbox.shutdown()
+
+    assert {job["status"] for job in jobs.values()} == {"sent"}
+    assert all(job["attempts"] == 1 for job in jobs.values())
+    assert sorted(envelope.rcpt_tos[0] for envelope in smtp_server.accepted) == ["boss@example.com"] * 4
+    # The first message opens the session, the other three borrow it from the pool
+    assert smtp_pool.connects == 1
+    assert len(smtp_server.peers) == 1
+
+def queue_while_stopped(engine, transport, count):
+    """Jobs left queued by an outbox that stopped before sending them"""
+    stopped = EmailOutbox(engine, workers=1)
+    stopped.shutdown()
+    return [stopped.enqueue(transport, "", "me@example.com", ["boss@example.com"], message(i))
+            for i in range(count)]
+
+def test_outbox_sends_ready_messages_as_one_batch(smtp_server, smtp_pool, outbox_engine):
+    job_ids = queue_while_stopped(outbox_engine, smtp_server.transport, 4)
+    batches = []
+
+    def send(*args):
+        batches.append(len(args[3]))
+        mail.deliver_batch(*args)
+
+    outbox = EmailOutbox(outbox_engine, workers=1, credential_provider=lambda transport: "", send=send)
+    try:
+        jobs = wait_until_settled(outbox, job_ids)
+    finally:
+        outbox.shutdown()
+
+    assert {job["status"] for job in jobs.values()} == {"sent"}
+    assert batches == [4]
+    assert smtp_pool.connects == 1
+    assert len(smtp_server.accepted) == 4
+
+def test_a_rejected_message_does_not_sink_its_batch(smtp_server, smtp_pool, outbox_engine):
+    job_ids = queue_while_stopped(outbox_engine, smtp_server.transport, 3)
+    smtp_server.fail("554 Message rejected", times=1)
+    outbox = EmailOutbox(outbox_engine, workers=1, credential_provider=lambda transport: "")
+    try:
+        jobs = wait_until_settled(outbox, job_ids)
+    finally:
+        outbox.shutdown()
+
+    first, *rest = sorted(job_ids)
+    assert (jobs[first]["status"], jobs[first]["attempts"]) == ("failed", 1)
+    # The messages behind it were never tried with it, so their first real attempt counts as one
+    assert [(jobs[job_id]["status"], jobs[job_id]["attempts"]) for job_id in rest] == [("sent", 1)] * 2
+    assert len(smtp_server.accepted) == 2
+
+def test_outbox_retries_temporary_failures_with_backoff(smtp_server, smtp_pool, outbox_engine):
+    smtp_server.fail("451 Try again later", times=2)
+    outbox = EmailOutbox(outbox_engine, workers=1, retry_base=0.1)
+    try:
+        job_id = outbox.enqueue(smtp_server.transport, "", "me@example.com", ["boss@example.com"], message(1))
+        job = wait_until_settled(outbox, [job_id])[job_id]
+    finally:
+        outbox.shutdown()
+
+    assert job["status"] == "sent"
+    assert job["attempts"] == 3
+    first, second, third = smtp_server.attempts
+    # retry_delay doubles: 0.1 s before the second attempt, 0.2 s before the third
+    assert second - first >= 0.1
+    assert third - second >= 0.2
+    assert len(smtp_server.accepted) == 1
+
+def test_outbox_gives_up_after_max_attempts(smtp_server, smtp_pool, outbox_engine):
+    smtp_server.fail("421 Service not available")
+    outbox = EmailOutbox(outbox_engine, workers=1, retry_base=0.01)
+    try:
+        job_id = outbox.enqueue(smtp_server.transport, "", "me@example.com", ["boss@example.com"], message(1))
+        job = wait_until_settled(outbox, [job_id])[job_id]
+    finally:
+        outbox.shutdown()
+
+    assert job["status"] == "failed"
+    assert job["attempts"] == job["max_attempts"] == 5
+    assert len(smtp_server.attempts) == 5
+    assert not smtp_server.accepted
+
+def test_outbox_does_not_retry_permanent_rejections(smtp_server, smtp_pool, outbox_engine):
+    smtp_server.fail("554 Message rejected")
+    outbox = EmailOutbox(outbox_engine, workers=1, retry_base=0.01)
+    try:
+        job_id = outbox.enqueue(smtp_server.transport, "", "me@example.com", ["boss@example.com"], message(1))
+        job = wait_until_settled(outbox, [job_id])[job_id]
+    finally:
+        outbox.shutdown()
+
+    assert (job["status"], job["attempts"]) == ("failed", 1)
+    assert "554" in job["last_error"]
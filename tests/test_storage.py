@@ -0,0 +1,174 @@
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from worklogger.logs import DayLog
+
+SLOTS = ["9:00 AM", "10:00 AM", "11:00 AM"]
+
+def day_log(tasks="", meeting=False, meeting_info="", general=""):
+    return DayLog(SLOTS, {"9:00 AM": {"meeting": meeting, "meeting_info": meeting_info,
+                                      "tasks": tasks, "general": general}})
+
+def save(db, log_date, user_id=None, **fields):
+    log = day_log(**fields)
+    kwargs = {} if user_id is None else {"user_id": user_id}
+    db.save_log_to_db(log_date, log.summary(), log, **kwargs)
+
+def test_migrations_reach_the_latest_version(database):
+    latest = database.MIGRATIONS_BY_DIALECT[database.engine.dialect.name][-1][0]
+    with database.engine.connect() as conn:
+        assert database.get_schema_version(conn) == latest
+    assert database.run_migrations() == latest
+
+def test_save_replaces_the_days_summary_and_entries(database):
+    save(database, date(2024, 5, 6), tasks="deploy api", meeting=True, meeting_info="sync")
+    save(database, date(2024, 5, 6), tasks="deploy web")
+
+    logs = database.get_all_logs()
+    assert list(logs["log_date"]) == ["2024-05-06"]
+    assert "deploy web" in logs["log_summary"][0]
+    assert database.get_log_summary(int(logs["id"][0])) == day_log(tasks="deploy web").summary()
+    assert database.load_log_entries(date(2024, 5, 6)) == {
+        "9:00 AM": {"meeting": False, "meeting_info": "", "tasks": "deploy web", "general": ""},
+        "10:00 AM": {"meeting": False, "meeting_info": "", "tasks": "", "general": ""},
+        "11:00 AM": {"meeting": False, "meeting_info": "", "tasks": "", "general": ""},
+    }
+
+def test_users_only_see_their_own_logs(database):
+    save(database, date(2024, 5, 6), tasks="mine")
+    save(database, date(2024, 5, 6), user_id="bob@example.com", tasks="bobs release")
+
+    assert "mine" in database.get_all_logs()["log_summary"][0]
+    assert "bobs release" in database.get_all_logs(user_id="bob@example.com")["log_summary"][0]
+    assert database.search_log_rows("bobs") == ([], False)
+    assert database.load_log_entries(date(2024, 5, 6), user_id="bob@example.com")["9:00 AM"]["tasks"] == "bobs release"
+
+    database.clear_all_logs()
+    assert database.get_all_logs().empty
+    assert len(database.get_all_logs(user_id="bob@example.com")) == 1
+
+def test_search_matches_every_term_and_highlights_it(database):
+    save(database, date(2024, 5, 6), tasks="deploy the api gateway")
+    save(database, date(2024, 5, 7), tasks="deploy the web app")
+    save(database, date(2024, 5, 8), tasks="write docs")
+
+    rows, has_more = database.search_log_rows("deploy gateway")
+    assert [row["log_date"] for row in rows] == ["2024-05-06"]
+    assert "**gateway**" in rows[0]["snippet"]
+    assert not has_more
+
+    rows, has_more = database.search_log_rows("deploy", page_size=1)
+    assert len(rows) == 1 and has_more
+    # Query syntax in user input is treated as words
+    assert database.search_log_rows('deploy" OR "docs')[0] == []
+
+def test_search_index_follows_bulk_imports(database):
+    start = date(2023, 1, 1)
+    days = [(start + timedelta(days=i), day_log(tasks=f"ticket{i}").summary(), day_log(tasks=f"ticket{i}"))
+            for i in range(database.BULK_FTS_MIN_DAYS + 10)]
+    assert database.save_logs_batch(days) == len(days)
+    # Re-importing replaces each day's summary and its index entry
+    days[5] = (days[5][0], day_log(tasks="rewritten").summary(), day_log(tasks="rewritten"))
+    database.save_logs_batch(days)
+
+    assert database.search_log_rows("ticket5")[0] == []
+    assert [row["log_date"] for row in database.search_log_rows("rewritten")[0]] == [str(start + timedelta(days=5))]
+    assert len(database.get_all_logs()) == len(days)
+
+def test_import_checkpoint_commits_with_the_batch(database):
+    database.save_logs_batch([(date(2024, 1, 1), "x", None)],
+                             {"source": "history.csv", "fingerprint": "abc", "position": 7, "days": 1})
+    checkpoint = database.get_import_checkpoint("history.csv")
+    assert (checkpoint["fingerprint"], checkpoint["position"], checkpoint["completed"]) == ("abc", 7, 0)
+    database.clear_import_checkpoint("history.csv")
+    assert database.get_import_checkpoint("history.csv") is None
+
+def test_drafts_upsert_per_slot_and_are_dropped_on_save(database):
+    draft = DayLog(SLOTS)
+    draft.update(1, "tasks", "half done")
+    assert database.save_draft_entries(date(2024, 5, 6), draft, draft.take_dirty()) == 1
+    draft.update(1, "tasks", "done")
+    database.save_draft_entries(date(2024, 5, 6), draft, {1})
+    assert database.load_draft_entries(date(2024, 5, 6)) == {
+        "10:00 AM": {"meeting": False, "meeting_info": "", "tasks": "done", "general": ""},
+    }
+
+    database.save_log_to_db(date(2024, 5, 6), draft.summary(), draft)
+    assert database.load_draft_entries(date(2024, 5, 6)) == {}
+
+def test_rollups_follow_saved_entries(database):
+    save(database, date(2024, 5, 6), tasks="a", meeting=True, meeting_info="sync")
+    save(database, date(2024, 5, 7), general="reading")
+    save(database, date(2024, 5, 7), tasks="b")
+
+    week = database.get_rollups("week").to_dict("records")
+    assert week == [{"period": "2024-W19", "logged_days": 2, "logged_slots": 2, "meeting_slots": 1, "task_slots": 2}]
+    day = database.get_rollups("day", start="2024-05-07").to_dict("records")
+    assert day == [{"log_date": "2024-05-07", "logged_slots": 1, "meeting_slots": 0, "task_slots": 1}]
+
+    # An emptied day stops counting as logged
+    database.save_log_to_db(date(2024, 5, 7), "No details logged.", DayLog(SLOTS))
+    month = database.get_rollups("month").to_dict("records")
+    assert month == [{"period": "2024-05", "logged_days": 1, "logged_slots": 1, "meeting_slots": 1, "task_slots": 1}]
+
+def test_summary_only_saves_get_entries_and_rollups(database):
+    save(database, date(2024, 5, 6), tasks="old", general="note")
+    log = day_log(tasks="imported", meeting=True, meeting_info="sync")
+    database.save_log_to_db(date(2024, 5, 6), log.summary())
+
+    assert database.load_log_entries(date(2024, 5, 6)) == {
+        "9:00 AM": {"meeting": True, "meeting_info": "sync", "tasks": "imported", "general": ""},
+    }
+    entries = database.get_entries_in_range("2024-05-01", "2024-05-31")
+    assert list(entries["tasks"]) == ["imported"]
+    day = database.get_rollups("day").to_dict("records")
+    assert day == [{"log_date": "2024-05-06", "logged_slots": 1, "meeting_slots": 1, "task_slots": 1}]
+
+def test_history_pages_cover_every_log_once(database):
+    for day in range(1, 8):
+        save(database, date(2024, 5, day), tasks=f"day {day}")
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = database.get_log_history_page(3, cursor)
+        seen.extend(page["log_date"])
+        if cursor is None:
+            break
+    assert sorted(seen) == [f"2024-05-0{day}" for day in range(1, 8)]
+    assert len(seen) == 7
+
+def test_range_reads_return_saved_slots_in_order(database):
+    save(database, date(2024, 5, 6), tasks="a", meeting=True, meeting_info="sync")
+    save(database, date(2024, 5, 8), tasks="b")
+    save(database, date(2024, 6, 1), tasks="outside")
+
+    chunks = list(database.iter_log_entries("2024-05-01", "2024-05-31", chunksize=2))
+    rows = [row for chunk in chunks for row in chunk.to_dict("records")]
+    assert [(row["log_date"], row["slot"]) for row in rows] == [
+        ("2024-05-06", slot) for slot in SLOTS] + [("2024-05-08", slot) for slot in SLOTS]
+    assert len(database.get_entries_in_range("2024-05-01", "2024-05-31")) == 6
+
+    meetings = database.get_meeting_entries("2024-05-01", "2024-05-31")
+    assert list(meetings["meeting_info"]) == ["sync"]
+
+def test_concurrent_saves_all_land(database):
+    errors = []
+
+    def saver(worker):
+        try:
+            for day in range(1, 21):
+                save(database, date(2024, 1 + worker, day), tasks=f"worker {worker}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=saver, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    assert not errors
+    with database.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM work_logs")).scalar() == 120
+        assert conn.execute(text("SELECT COUNT(*) FROM work_log_entries")).scalar() == 360
@@ -1,32 +1,48 @@
 """
 Timezone utilities for WorkLogger application
 Handles timezone conversions for deployment environments
+
+Zone resolution and UTC conversion live in worklogger.timezones; this
+module adds the secrets default and the per-session override.
 """
 
-import pytz
 from datetime import datetime
+from functools import lru_cache
+
 import streamlit as st
 
-def get_user_timezone():
-    """Get the user's preferred timezone from secrets or default to EST/EDT"""
+from worklogger.timezones import DEFAULT_TIMEZONE, resolve_timezone, list_timezones, utc_now  # noqa: F401
+from worklogger import timezones
+
+TIMEZONE_OVERRIDE_KEY = "timezone_override"
+
+@lru_cache(maxsize=1)
+def get_app_timezone_name():
+    """The deployment's default zone from secrets, read once per process"""
     try:
-        # Try to get timezone from secrets
-        timezone_name = st.secrets.get("app", {}).get("timezone", "America/New_York")
-    except:
+        return st.secrets.get("app", {}).get("timezone", DEFAULT_TIMEZONE)
+    except Exception:
         # Default to Eastern Time if no secrets configured
-        timezone_name = "America/New_York"
-    
+        return DEFAULT_TIMEZONE
+
+def set_user_timezone(timezone_name):
+    """Per-session override of the app timezone (None clears it)"""
+    if timezone_name:
+        st.session_state[TIMEZONE_OVERRIDE_KEY] = timezone_name
+    else:
+        st.session_state.pop(TIMEZONE_OVERRIDE_KEY, None)
+
+def get_user_timezone():
+    """Get the user's preferred timezone: session override, then secrets, then EST/EDT"""
     try:
-        return pytz.timezone(timezone_name)
-    except:
-        # Fallback to UTC if timezone is invalid
-        return pytz.UTC
+        timezone_name = st.session_state.get(TIMEZONE_OVERRIDE_KEY) or get_app_timezone_name()
+    except Exception:
+        timezone_name = get_app_timezone_name()
+    return resolve_timezone(timezone_name)
 
-def get_current_time_in_timezone():
+def get_current_time_in_timezone(user_tz=None):
     """Get current time in the user's timezone"""
-    user_tz = get_user_timezone()
-    utc_now = datetime.now(pytz.UTC)
-    return utc_now.astimezone(user_tz)
+    return datetime.now(user_tz or get_user_timezone())
 
 def format_time_with_timezone(dt=None):
     """Format datetime with timezone info"""
@@ -35,12 +51,16 @@ def format_time_with_timezone(dt=None):
     
     return dt.strftime("%Y-%m-%d %H:%M:%S %Z")
 
-def get_timezone_display_name():
+def get_timezone_display_name(user_tz=None, now=None):
     """Get a user-friendly timezone name for display"""
-    user_tz = get_user_timezone()
-    now = get_current_time_in_timezone()
+    user_tz = user_tz or get_user_timezone()
+    now = now or get_current_time_in_timezone(user_tz)
     
     # Get the timezone abbreviation (like EST, EDT, PST, etc.)
     tz_name = now.strftime("%Z")
     
-    return f"{user_tz.zone} ({tz_name})"
+    return f"{user_tz.key} ({tz_name})"
+
+def utc_to_local(values, user_tz=None, fmt="%Y-%m-%d %H:%M %Z"):
+    """Convert naive-UTC DB timestamps to local display strings (defaults to the user's zone)"""
+    return timezones.utc_to_local(values, user_tz or get_user_timezone(), fmt)
@@ -0,0 +1,6 @@
+"""
+WorkLogger core: storage, day log model, exports and email delivery,
+usable without Streamlit. `python -m worklogger` runs the command-line tool.
+"""
+
+__version__ = "1.0"
@@ -0,0 +1,5 @@
+import sys
+
+from worklogger.cli import main
+
+sys.exit(main())
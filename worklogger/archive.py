@@ -0,0 +1,192 @@
+"""
+Retention for WorkLogger: saved logs older than the hot window are moved
+out of the database into compressed per-month archive files, one per user
+and month, which stay readable.
+
+    log_archive/<user>/2023-04.sqlite.xz
+
+Each file is a small SQLite database holding that month's work_logs and
+work_log_entries rows (summaries as plain text), compressed with lzma.
+Reading a month decompresses it into memory and opens it read-only, so
+archived logs can be browsed without touching the hot database. Rollups
+are not archived; reports keep counting archived months.
+"""
+
+import lzma
+import os
+import sqlite3
+import tempfile
+from datetime import date
+from urllib.parse import quote
+
+from worklogger import db
+
+ARCHIVE_DIR = os.environ.get("WORKLOGGER_ARCHIVE_DIR", "log_archive")
+# Months kept in the database, counting the current one
+KEEP_MONTHS = int(os.environ.get("WORKLOGGER_KEEP_MONTHS", "18"))
+ARCHIVE_SUFFIX = ".sqlite.xz"
+ARCHIVE_FORMAT = 1
+# xz preset: archives are written once and read rarely
+LZMA_PRESET = 9
+
+_ARCHIVE_SCHEMA = """
+CREATE TABLE archive_info (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE work_logs (
+    log_date TEXT PRIMARY KEY,
+    log_summary TEXT,
+    created_at TEXT
+);
+CREATE TABLE work_log_entries (
+    log_date TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    meeting INTEGER NOT NULL DEFAULT 0,
+    meeting_info TEXT NOT NULL DEFAULT '',
+    tasks TEXT NOT NULL DEFAULT '',
+    general_info TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (log_date, slot)
+);
+"""
+
+def retention_cutoff(keep_months, today=None):
+    """First day (YYYY-MM-DD) of the oldest month kept hot: the current
+    month and the `keep_months - 1` before it"""
+    if keep_months < 1:
+        raise ValueError("keep at least one month")
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (keep_months - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}-01"
+
+def _user_dir(user_id, archive_dir=None):
+    # Emails are fine as directory names; anything path-like is escaped
+    return os.path.join(archive_dir or ARCHIVE_DIR, quote(user_id, safe="@.+_-"))
+
+def archive_path(month, user_id=db.DEFAULT_USER_ID, archive_dir=None):
+    return os.path.join(_user_dir(user_id, archive_dir), f"{month}{ARCHIVE_SUFFIX}")
+
+def archived_months(user_id=db.DEFAULT_USER_ID, archive_dir=None):
+    """YYYY-MM months the user has archive files for, oldest first"""
+    try:
+        names = os.listdir(_user_dir(user_id, archive_dir))
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len(ARCHIVE_SUFFIX)] for name in names if name.endswith(ARCHIVE_SUFFIX))
+
+def _load(path, readonly):
+    with open(path, "rb") as f:
+        data = lzma.decompress(f.read())
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.deserialize(data)
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def open_archive(month, user_id=db.DEFAULT_USER_ID, archive_dir=None):
+    """A read-only, in-memory sqlite3 connection to one archived month.
+
+    Tables: work_logs(log_date, log_summary, created_at) and
+    work_log_entries(log_date, slot, position, meeting, meeting_info,
+    tasks, general_info). Raises FileNotFoundError for months not archived.
+    """
+    return _load(archive_path(month, user_id, archive_dir), readonly=True)
+
+def _write_month(path, month, user_id, logs, entries):
+    """Merge rows into a month's archive file, replacing it atomically"""
+    if os.path.exists(path):
+        # The month was archived before and more of it has aged out since
+        conn = _load(path, readonly=False)
+    else:
+        conn = sqlite3.connect(":memory:")
+        conn.executescript(_ARCHIVE_SCHEMA)
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO archive_info VALUES (?, ?)", [
+            ("format", str(ARCHIVE_FORMAT)), ("user_id", user_id), ("month", month),
+        ])
+        conn.executemany("INSERT OR REPLACE INTO work_logs VALUES (:log_date, :log_summary, :created_at)", logs)
+        # A re-archived day brings its complete slot list
+        conn.executemany("DELETE FROM work_log_entries WHERE log_date = ?",
+                         [(log_date,) for log_date in {entry["log_date"] for entry in entries}])
+        conn.executemany("""
+        INSERT INTO work_log_entries
+        VALUES (:log_date, :slot, :position, :meeting, :meeting_info, :tasks, :general_info)
+        """, entries)
+    data = lzma.compress(conn.serialize(), preset=LZMA_PRESET)
+    conn.close()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            # On disk before the rows are deleted from the database
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(data)
+
+def apply_retention(keep_months, user_id=db.DEFAULT_USER_ID, archive_dir=None, today=None,
+                    reclaim=True, progress=None):
+    """Archive the user's saved logs older than the last `keep_months` months.
+
+    Each month is written to its archive file and then deleted from the
+    database in its own transaction, so an interrupted run leaves every day
+    either hot, archived, or (if it stopped between the two) both; running
+    again finishes the job. With `reclaim`, pages freed by this run or by
+    earlier deletes (e.g. Clear All Logs) are returned to the filesystem
+    afterwards. Returns a dict of months, days, entries,
+    archive_bytes and reclaimed_bytes.
+    """
+    stats = {"months": 0, "days": 0, "entries": 0, "archive_bytes": 0, "reclaimed_bytes": 0}
+    cutoff = retention_cutoff(keep_months, today)
+    for month in db.months_before(cutoff, user_id):
+        path = archive_path(month, user_id, archive_dir)
+
+        def write(logs, entries, path=path, month=month):
+            stats["archive_bytes"] += _write_month(path, month, user_id, logs, entries)
+
+        days, entries = db.archive_month(month, write, user_id)
+        stats["months"] += 1
+        stats["days"] += days
+        stats["entries"] += entries
+        if progress is not None:
+            progress(month, stats)
+    if reclaim:
+        stats["reclaimed_bytes"] = db.reclaim_space() or 0
+    return stats
+
+def get_archived_logs(month, user_id=db.DEFAULT_USER_ID, archive_dir=None):
+    """An archived month's logs as a DataFrame (log_date, log_summary, created_at), oldest first"""
+    conn = open_archive(month, user_id, archive_dir)
+    try:
+        cursor = conn.execute("SELECT log_date, log_summary, created_at FROM work_logs ORDER BY log_date")
+        rows = [tuple(row) for row in cursor]
+    finally:
+        conn.close()
+    import pandas as pd
+    return pd.DataFrame(rows, columns=["log_date", "log_summary", "created_at"])
+
+def load_archived_entries(log_date, user_id=db.DEFAULT_USER_ID, archive_dir=None):
+    """An archived day's per-hour entries as {slot: entry}, like db.load_log_entries()"""
+    try:
+        conn = open_archive(str(log_date)[:7], user_id, archive_dir)
+    except FileNotFoundError:
+        return {}
+    try:
+        return {
+            row["slot"]: {
+                "meeting": bool(row["meeting"]),
+                "meeting_info": row["meeting_info"],
+                "tasks": row["tasks"],
+                "general": row["general_info"],
+            }
+            for row in conn.execute("""
+            SELECT slot, meeting, meeting_info, tasks, general_info FROM work_log_entries
+            WHERE log_date = ? ORDER BY position
+            """, (str(log_date),))
+        }
+    finally:
+        conn.close()
@@ -0,0 +1,219 @@
+"""
+Storage backends for WorkLogger: how to build a pooled engine for each kind
+of database URL, and the few statements whose SQL differs between them.
+
+    sqlite:///work_logs.db                  SQLiteBackend (file, WAL)
+    sqlite://  or  sqlite:///:memory:       SQLiteMemoryBackend (one connection, one thread at a time)
+    postgresql+psycopg://user@host/dbname   PostgresBackend (needs a PostgreSQL driver)
+
+Queries in worklogger.db are written in the SQL both dialects accept; the
+backend supplies the engine, the upsert form, bulk inserts and which full-text
+search implementation the schema has.
+"""
+
+import threading
+
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.pool import StaticPool
+
+from worklogger.compression import register_sqlite_function
+
+# Applied to every new SQLite DBAPI connection
+SQLITE_PRAGMAS = {
+    # Takes effect in new files; older ones are converted by their first reclaim_space()
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",          # readers don't block on the writer
+    "synchronous": "NORMAL",        # durable enough under WAL, far fewer fsyncs
+    "busy_timeout": 5000,           # ms to wait on a locked database instead of failing
+    "cache_size": -64000,           # negative = KiB, i.e. ~64 MB page cache
+    "mmap_size": 268435456,         # 256 MB memory-mapped I/O
+    "temp_store": "MEMORY",
+}
+
+# Free pages moved per incremental_vacuum step (4 KB pages: 8 MB)
+INCREMENTAL_VACUUM_PAGES = 2000
+
+def _prepare_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+    # The search index reads summaries through this, compressed or not
+    register_sqlite_function(dbapi_connection)
+
+class SerializedStaticPool(StaticPool):
+    """StaticPool whose single connection is checked out by one thread at a time.
+
+    Other threads wait at checkout until it is returned, so their
+    transactions run one after another instead of interleaving on the shared
+    connection. The owning thread may check it out again (nested use).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._owner = threading.RLock()
+
+    def _do_get(self):
+        self._owner.acquire()
+        try:
+            return super()._do_get()
+        except BaseException:
+            self._owner.release()
+            raise
+
+    def _do_return_conn(self, record):
+        self._owner.release()
+
+class StorageBackend:
+    """Engine factory and dialect-specific SQL for one kind of database"""
+
+    name = None
+    dialect = None
+    # "fts5" (SQLite virtual table) or "tsvector" (PostgreSQL GIN index)
+    full_text = None
+    # Whether summaries are stored dictionary-compressed (see worklogger.compression)
+    compresses_summaries = False
+    # Appended to a SELECT to lock the rows it reads until the transaction ends
+    row_lock = ""
+    engine_options = {}
+
+    def create_engine(self, url, **options):
+        """A pooled engine for `url`; keyword options override the backend's tuning"""
+        return create_engine(url, **{**self.engine_options, **options})
+
+    def upsert(self, table, columns, conflict, update=(), increment=(), touch=()):
+        """INSERT ... ON CONFLICT for `table` with :named values for `columns`.
+
+        On a conflicting `conflict` key, `update` columns take the new value,
+        `increment` columns add it to the stored one and `touch` columns are
+        set to CURRENT_TIMESTAMP. Stored values are qualified with the table
+        name, which PostgreSQL requires and SQLite accepts.
+        """
+        assignments = [f"{column}=excluded.{column}" for column in update]
+        assignments += [f"{column}={table}.{column} + excluded.{column}" for column in increment]
+        assignments += [f"{column}=CURRENT_TIMESTAMP" for column in touch]
+        action = f"DO UPDATE SET {', '.join(assignments)}" if assignments else "DO NOTHING"
+        return f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES ({", ".join(f":{column}" for column in columns)})
+        ON CONFLICT({", ".join(conflict)}) {action}
+        """
+
+    def insert_many(self, conn, sql, rows):
+        """executemany `sql` (with :named parameters) over a list of dicts"""
+        conn.execute(text(sql), rows)
+
+    def begin_write(self, conn):
+        """Run first in a transaction that reads rows and then writes based on
+        them, to hold off other writers until it ends where that's needed"""
+
+    def reclaim_space(self, engine):
+        """Give space freed by large deletes back to the filesystem; returns bytes freed, or None
+        when the database manages that itself"""
+        return None
+
+    def describe(self, url):
+        return f"{self.name} ({make_url(url).render_as_string(hide_password=True)})"
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+    dialect = "sqlite"
+    full_text = "fts5"
+    compresses_summaries = True
+    # A connection per concurrent session thread plus the outbox workers;
+    # WAL lets them read in parallel while one writes
+    engine_options = {"pool_size": 8, "max_overflow": 8, "pool_timeout": 30}
+
+    def create_engine(self, url, **options):
+        engine = super().create_engine(url, **options)
+        event.listen(engine, "connect", _prepare_sqlite_connection)
+        return engine
+
+    def insert_many(self, conn, sql, rows):
+        # Handed straight to the driver (sqlite3 understands :named): bulk imports
+        # write hundreds of thousands of rows and per-row bind processing dominated
+        conn.exec_driver_sql(sql, rows)
+
+    def begin_write(self, conn):
+        # A deferred transaction that has read can't start writing once another
+        # connection has committed (SQLITE_BUSY), so take the write lock up
+        # front; concurrent saves wait on busy_timeout instead
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def reclaim_space(self, engine, batch_pages=INCREMENTAL_VACUUM_PAGES):
+        """Truncate free pages off the file, `batch_pages` per write transaction.
+
+        A file created before auto_vacuum=INCREMENTAL was set gets one full
+        VACUUM to switch it over; later calls only move free pages.
+        """
+        # VACUUM and incremental_vacuum can't run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+            pages_before = conn.exec_driver_sql("PRAGMA page_count").scalar()
+            if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+                conn.exec_driver_sql("VACUUM")
+            else:
+                # sqlite3's execute() steps this pragma once, freeing a single page;
+                # executescript() runs it to completion
+                dbapi_connection = conn.connection.dbapi_connection
+                while conn.exec_driver_sql("PRAGMA freelist_count").scalar():
+                    # Short batches let the app's writes in between
+                    dbapi_connection.executescript(f"PRAGMA incremental_vacuum({int(batch_pages)});")
+            pages_after = conn.exec_driver_sql("PRAGMA page_count").scalar()
+            # Under WAL the file only shrinks once the log is checkpointed
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return (pages_before - pages_after) * page_size
+
+    def describe(self, url):
+        return f"SQLite file {make_url(url).database}"
+
+class SQLiteMemoryBackend(SQLiteBackend):
+    """Private in-memory database, e.g. for tests and throwaway CLI runs.
+
+    Every connection to `sqlite://` would get its own empty database, so the
+    engine keeps one connection and lends it to one thread at a time.
+    """
+
+    name = "memory"
+    engine_options = {"poolclass": SerializedStaticPool, "connect_args": {"check_same_thread": False}}
+
+    def describe(self, url):
+        return "SQLite in memory"
+
+class PostgresBackend(StorageBackend):
+    name = "postgres"
+    dialect = "postgresql"
+    full_text = "tsvector"
+    # Large values are already compressed by TOAST, and search indexes the plain column
+    compresses_summaries = False
+    # reclaim_space() stays a no-op: autovacuum makes freed space reusable, and
+    # VACUUM FULL would lock the tables
+    row_lock = "FOR UPDATE"
+    engine_options = {
+        "pool_size": 10,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        # Drop connections the server or a proxy has closed instead of failing a rerun
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        # Reuse the warmest connections so idle extras can time out server-side
+        "pool_use_lifo": True,
+        # CURRENT_TIMESTAMP in UTC, matching the naive-UTC timestamps SQLite stores
+        "connect_args": {"options": "-c timezone=UTC"},
+    }
+
+BACKENDS = {backend.name: backend for backend in (SQLiteBackend(), SQLiteMemoryBackend(), PostgresBackend())}
+
+def _is_memory_sqlite(url):
+    database = url.database or ""
+    return database in ("", ":memory:") or "mode=memory" in database or url.query.get("mode") == "memory"
+
+def backend_for_url(url):
+    """The StorageBackend that serves a SQLAlchemy URL"""
+    url = make_url(url)
+    name = url.get_backend_name()
+    if name == "sqlite":
+        return BACKENDS["memory" if _is_memory_sqlite(url) else "sqlite"]
+    if name == "postgresql":
+        return BACKENDS["postgres"]
+    raise ValueError(f"unsupported database {name!r}; use a sqlite:// or postgresql:// URL")
@@ -0,0 +1,315 @@
+"""
+Headless WorkLogger command line.
+
+    python -m worklogger add 2024-05-06 9 --tasks "Sprint planning" --meeting "Team sync"
+    python -m worklogger save 2024-05-06
+    python -m worklogger export 2024-05-06 --format docx -o log.docx
+    python -m worklogger export --start 2024-01-01 --end 2024-03-31 --format ndjson
+    python -m worklogger email 2024-05-06 --to boss@example.com --server smtp.example.com --user me@example.com
+    python -m worklogger search "deploy"
+    python -m worklogger import history.csv
+    python -m worklogger compress
+    python -m worklogger archive --keep-months 18
+
+The database defaults to ./work_logs.db (or WORKLOGGER_DB_URL); pass --db
+to use another. Logs belong to --user-id (or WORKLOGGER_USER), which
+defaults to the same shared user the app uses without sign-in. SMTP
+passwords are read from WORKLOGGER_SMTP_PASSWORD.
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+from worklogger import archive, db
+from worklogger.compression import available_codecs
+from worklogger.logs import DayLog, hour_label, slot_sort_key
+
+FORMATS = {
+    "csv": ("text", "csv", "csv"),
+    "docx": ("application", "vnd.openxmlformats-officedocument.wordprocessingml.document", "docx"),
+    "txt": ("text", "plain", "txt"),
+}
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD")
+
+def _parse_slot(value):
+    """Accept an hour (0-23) or a slot label such as '9:00 AM'"""
+    if value.isdigit():
+        hour = int(value)
+        if not 0 <= hour <= 23:
+            raise argparse.ArgumentTypeError("hour must be between 0 and 23")
+        return hour_label(hour)
+    return value
+
+def load_day(log_date, user_id=db.DEFAULT_USER_ID):
+    """DayLog for a date from saved (or archived) entries with autosaved draft slots on top"""
+    entries = db.load_log_entries(log_date, user_id) or archive.load_archived_entries(log_date, user_id)
+    entries.update(db.load_draft_entries(log_date, user_id))
+    return DayLog(sorted(entries, key=slot_sort_key), entries)
+
+def _render_day(log_date, fmt, user_id):
+    from worklogger.export import LazyExports
+
+    exports = LazyExports(load_day(log_date, user_id).render(), log_date)
+    return {"csv": exports.csv, "docx": exports.docx, "txt": exports.text_bytes}[fmt]()
+
+def _open_output(path):
+    if path in (None, "-"):
+        return sys.stdout.buffer, False
+    return open(path, "wb"), True
+
+def cmd_add(args):
+    day_log = load_day(args.date, args.user_id)
+    if args.slot not in day_log:
+        slots = sorted(day_log.slots + [args.slot], key=slot_sort_key)
+        day_log = DayLog(slots, {slot: day_log.entry(day_log.position(slot)) for slot in day_log.slots})
+    i = day_log.position(args.slot)
+    if args.meeting is not None:
+        day_log.update(i, "meeting", True)
+        day_log.update(i, "meeting_info", args.meeting)
+    if args.tasks is not None:
+        day_log.update(i, "tasks", args.tasks)
+    if args.general is not None:
+        day_log.update(i, "general", args.general)
+    # Every position gets rewritten so draft ordering matches the new slot list
+    db.save_draft_entries(args.date, day_log, set(range(len(day_log))), args.user_id)
+    print(f"Added {args.slot} to the {args.date} draft. Run `save` to store the day.")
+    return 0
+
+def cmd_save(args):
+    day_log = load_day(args.date, args.user_id)
+    if not len(day_log):
+        print(f"Nothing logged for {args.date}.", file=sys.stderr)
+        return 1
+    rendered = day_log.render()
+    db.save_log_to_db(args.date, rendered.summary, day_log, args.user_id)
+    print(rendered.summary)
+    return 0
+
+def cmd_export(args):
+    if args.start or args.end:
+        if not (args.start and args.end):
+            print("Range exports need both --start and --end.", file=sys.stderr)
+            return 2
+        if args.format not in ("csv", "ndjson"):
+            print("Range exports support csv and ndjson.", file=sys.stderr)
+            return 2
+        from worklogger.export import write_range_export
+
+        out, close = _open_output(args.output)
+        try:
+            write_range_export(db.iter_log_entries(args.start, args.end, user_id=args.user_id), args.format, out)
+        finally:
+            if close:
+                out.close()
+        return 0
+
+    if args.date is None:
+        print("Give a DATE or --start/--end.", file=sys.stderr)
+        return 2
+    if args.format == "ndjson":
+        print("ndjson is only available for range exports.", file=sys.stderr)
+        return 2
+    data = _render_day(args.date, args.format, args.user_id)
+    out, close = _open_output(args.output)
+    try:
+        out.write(data)
+    finally:
+        if close:
+            out.close()
+    return 0
+
+def cmd_email(args):
+    from worklogger.mail import build_message, deliver_message
+
+    password = os.environ.get("WORKLOGGER_SMTP_PASSWORD")
+    transport = {"server": args.server, "port": args.port, "user": args.user, "security": args.security}
+    file_date_str = args.date.strftime('%A_%B_%d_%Y')
+    attachments = []
+    for fmt in args.attach:
+        maintype, subtype, ext = FORMATS[fmt]
+        attachments.append((_render_day(args.date, fmt, args.user_id), maintype, subtype, f"{file_date_str}_daily_work_log.{ext}"))
+    subject = args.subject or f"{file_date_str} Daily Work Log"
+    body = args.body or f"Please find attached the work log for {args.date.strftime('%A, %B %d, %Y')}."
+    msg, recipients = build_message(args.from_name, args.user, args.to, args.cc, subject, body, attachments)
+    try:
+        deliver_message(transport, password, args.user, recipients, msg)
+    except Exception as e:
+        print(f"Failed to send email: {e}", file=sys.stderr)
+        return 1
+    print(f"Sent {subject!r} to {', '.join(recipients)}")
+    return 0
+
+def cmd_search(args):
+    rows, has_more = db.search_log_rows(args.query, args.limit, args.offset, args.user_id)
+    if not rows:
+        print("No matching logs.")
+        return 0
+    for row in rows:
+        snippet = " ".join(row["snippet"].split())
+        print(f"{row['log_date']}  (saved {row['created_at']} UTC)\n    {snippet}")
+    if has_more:
+        print(f"… more results: --offset {args.offset + args.limit}")
+    return 0
+
+def _print_import_progress(stats):
+    pct = f"{stats.fraction:6.1%} " if stats.fraction is not None else ""
+    rate = stats.slots / stats.elapsed if stats.elapsed else 0
+    print(f"\r{pct}{stats.days} days imported ({rate:,.0f} slots/s)", end="", file=sys.stderr, flush=True)
+
+def cmd_import(args):
+    from worklogger.importer import import_logs
+
+    try:
+        stats = import_logs(args.path, args.format, args.date, args.batch_days,
+                            progress=_print_import_progress, restart=args.restart, user_id=args.user_id)
+    except (OSError, ValueError) as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    if stats.resumed_from and not stats.slots:
+        print(f"{args.path} was already imported ({stats.days} days); use --restart to import it again.")
+    else:
+        resumed = f", resumed at position {stats.resumed_from}" if stats.resumed_from else ""
+        print(f"Imported {stats.slots} slots; {stats.days} days in total{resumed} ({stats.elapsed:.1f}s).")
+    if stats.error_count:
+        print(f"{stats.error_count} problem(s) skipped:", file=sys.stderr)
+        for message in stats.errors:
+            print(f"  {message}", file=sys.stderr)
+        if stats.error_count > len(stats.errors):
+            print(f"  … and {stats.error_count - len(stats.errors)} more", file=sys.stderr)
+    return 0
+
+def cmd_compress(args):
+    try:
+        stats = db.compress_summaries(args.codec, args.batch_rows,
+                                      progress=lambda rows: print(f"\r{rows} summaries repacked", end="",
+                                                                  file=sys.stderr, flush=True))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    before, after = stats["bytes_before"], stats["bytes_after"]
+    saved = 1 - after / before if before else 0
+    dictionary = f"dictionary {stats['dictionary_id']}" if stats["dictionary_id"] else "the built-in dictionary"
+    print(f"{stats['rows']} summaries with {dictionary}: {before:,} -> {after:,} bytes ({saved:.0%} smaller).")
+    print("Freed pages stay in the database file until it is vacuumed.")
+    return 0
+
+def cmd_archive(args):
+    if args.list:
+        for month in archive.archived_months(args.user_id, args.archive_dir):
+            print(month)
+        return 0
+    if args.show:
+        try:
+            logs = archive.get_archived_logs(args.show, args.user_id, args.archive_dir)
+        except FileNotFoundError:
+            print(f"{args.show} is not archived.", file=sys.stderr)
+            return 1
+        for row in logs.itertuples(index=False):
+            print(f"Date: {row.log_date}  (saved {row.created_at} UTC)\n{row.log_summary}\n")
+        return 0
+
+    try:
+        stats = archive.apply_retention(
+            args.keep_months, args.user_id, args.archive_dir, reclaim=not args.no_vacuum,
+            progress=lambda month, stats: print(f"\r{month}: {stats['days']} days archived", end="",
+                                                file=sys.stderr, flush=True))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not stats["months"]:
+        print(f"Nothing older than {archive.retention_cutoff(args.keep_months)} to archive.")
+    else:
+        print(file=sys.stderr)
+        print(f"Archived {stats['days']} days ({stats['entries']} slots) from {stats['months']} month(s) "
+              f"into {stats['archive_bytes']:,} bytes under {args.archive_dir}.")
+    if stats["reclaimed_bytes"]:
+        print(f"Database shrank by {stats['reclaimed_bytes']:,} bytes.")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="worklogger", description="Headless WorkLogger")
+    parser.add_argument("--db", help="SQLAlchemy database URL (default: %(default)s)", default=db.DB_URL)
+    # Not --user: the email command already uses that for the SMTP login
+    parser.add_argument("--user-id", default=os.environ.get("WORKLOGGER_USER", db.DEFAULT_USER_ID),
+                        help="whose logs to read and write (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="add or update one hour slot in a day's draft")
+    add.add_argument("date", type=_parse_date)
+    add.add_argument("slot", type=_parse_slot, help="hour 0-23 or a label like '9:00 AM'")
+    add.add_argument("--meeting", metavar="INFO", nargs="?", const="", help="mark as a meeting, with optional notes")
+    add.add_argument("--tasks")
+    add.add_argument("--general")
+    add.set_defaults(func=cmd_add)
+
+    save = sub.add_parser("save", help="save a day's draft to the log database")
+    save.add_argument("date", type=_parse_date)
+    save.set_defaults(func=cmd_save)
+
+    export = sub.add_parser("export", help="export one day or a date range")
+    export.add_argument("date", type=_parse_date, nargs="?")
+    export.add_argument("--start", type=_parse_date)
+    export.add_argument("--end", type=_parse_date)
+    export.add_argument("--format", choices=["csv", "docx", "txt", "ndjson"], default="csv")
+    export.add_argument("-o", "--output", help="file to write (default: stdout)")
+    export.set_defaults(func=cmd_export)
+
+    email = sub.add_parser("email", help="email a day's log")
+    email.add_argument("date", type=_parse_date)
+    email.add_argument("--to", required=True)
+    email.add_argument("--cc", default="")
+    email.add_argument("--subject")
+    email.add_argument("--body")
+    email.add_argument("--from-name", default="Daily Work Logger")
+    email.add_argument("--attach", nargs="+", choices=list(FORMATS), default=["csv", "docx"])
+    email.add_argument("--server", required=True)
+    email.add_argument("--port", type=int, default=465)
+    email.add_argument("--user", required=True)
+    email.add_argument("--security", choices=["ssl", "starttls", "none"], default="ssl")
+    email.set_defaults(func=cmd_email)
+
+    search = sub.add_parser("search", help="full-text search over saved logs")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+    search.add_argument("--offset", type=int, default=0)
+    search.set_defaults(func=cmd_search)
+
+    imp = sub.add_parser("import", help="bulk-import historical CSV or text-list logs")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=["csv", "text"], help="default: from the file extension")
+    imp.add_argument("--date", type=_parse_date, help="date for single-day files without dates")
+    imp.add_argument("--batch-days", type=int, default=2000, help="days per transaction (default: %(default)s)")
+    imp.add_argument("--restart", action="store_true", help="ignore any saved progress for this file")
+    imp.set_defaults(func=cmd_import)
+
+    compress = sub.add_parser("compress", help="train a summary dictionary on saved logs and repack them")
+    compress.add_argument("--codec", choices=available_codecs(), help="default: %s" % db.SUMMARY_CODEC)
+    compress.add_argument("--batch-rows", type=int, default=db.RECOMPRESS_BATCH_ROWS,
+                          help="summaries per transaction (default: %(default)s)")
+    compress.set_defaults(func=cmd_compress)
+
+    archive_cmd = sub.add_parser("archive", help="move logs older than the retention window to compressed monthly files")
+    archive_cmd.add_argument("--keep-months", type=int, default=archive.KEEP_MONTHS,
+                         help="months kept in the database, including this one (default: %(default)s)")
+    archive_cmd.add_argument("--archive-dir", default=archive.ARCHIVE_DIR, help="default: %(default)s")
+    archive_cmd.add_argument("--no-vacuum", action="store_true", help="leave the freed pages in the database file")
+    archive_cmd.add_argument("--list", action="store_true", help="list archived months instead")
+    archive_cmd.add_argument("--show", metavar="YYYY-MM", help="print one archived month instead")
+    archive_cmd.set_defaults(func=cmd_archive)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db != db.DB_URL:
+        db.configure_engine(args.db)
+    db.init_db()
+    return args.func(args)
@@ -0,0 +1,171 @@
+"""
+Dictionary compression for saved log summaries.
+
+Summaries repeat the same scaffolding ("9:00 AM: Meeting: No", "  Tasks: ")
+and often the same task lines day after day, which general-purpose
+compression can't exploit in a few hundred bytes of text. A dictionary of
+those recurring strings, trained on the stored logs, lets each summary be
+compressed on its own and still shrink several-fold.
+
+Packed summaries are bytes: MAGIC, one codec byte, the 4-byte dictionary id
+and the compressed payload. Anything else (plain TEXT rows) passes through
+unchanged, so old and new rows can live side by side. Dictionary 0 is the
+built-in SEED_DICTIONARY; trained ones are stored in summary_dictionaries.
+zlib is the default; zstd needs the optional `zstandard` package and has to
+be asked for (WORKLOGGER_SUMMARY_CODEC=zstd, or `compress --codec zstd`).
+"""
+
+import struct
+import threading
+import zlib
+from collections import Counter
+
+from worklogger.logs import hour_label
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+MAGIC = b"WL"
+_HEADER = struct.Struct(">2scI")
+CODEC_BYTES = {"zlib": b"z", "zstd": b"s"}
+CODECS_BY_BYTE = {value: name for name, value in CODEC_BYTES.items()}
+
+# zlib can only reach back 32 KB, so a bigger dictionary would be wasted
+DICTIONARY_SIZE = 32 * 1024
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 19
+# Strings that show up fewer times than this in the samples aren't worth a dictionary slot
+MIN_OCCURRENCES = 3
+MIN_WORD_LENGTH = 4
+
+def _seed_dictionary():
+    lines = ["  General: ", "  Info: ", "  Tasks: "]
+    for hour in range(24):
+        for meeting in ("No", "Yes"):
+            lines.append(f"{hour_label(hour)}: Meeting: {meeting}\n")
+    return "\n".join(lines).encode("utf-8")
+
+# The summary layout from worklogger.logs, for databases with nothing to train on yet
+SEED_DICTIONARY = _seed_dictionary()
+
+def available_codecs():
+    return ["zstd", "zlib"] if zstandard is not None else ["zlib"]
+
+def default_codec():
+    # zstandard isn't a requirement, so installing it mustn't change what new databases are written with
+    return "zlib"
+
+def train_dictionary(samples, codec="zlib", size=DICTIONARY_SIZE):
+    """Build a `codec` dictionary from sample summaries (str).
+
+    zstd uses its own trainer when it has enough material. Otherwise the
+    dictionary is the recurring lines and words of the samples, ordered so
+    the most valuable strings sit at the end, nearest the data.
+    """
+    if codec == "zstd" and zstandard is not None:
+        try:
+            return zstandard.train_dictionary(size, [s.encode("utf-8") for s in samples]).as_bytes()
+        except zstandard.ZstdError:
+            pass  # too few samples for the trainer; fall back to a raw-content dictionary
+
+    counts = Counter()
+    for sample in samples:
+        for line in sample.splitlines():
+            if line.strip():
+                counts[line + "\n"] += 1
+                counts.update(word + " " for word in line.split() if len(word) >= MIN_WORD_LENGTH)
+    # Bytes saved if each occurrence became a back-reference
+    scored = sorted(((n * len(s), s) for s, n in counts.items() if n >= MIN_OCCURRENCES), reverse=True)
+    chosen, used = [], len(SEED_DICTIONARY)
+    for _, string in scored:
+        encoded = string.encode("utf-8")
+        if used + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+    return SEED_DICTIONARY + b"".join(reversed(chosen))
+
+class SummaryCodec:
+    """Packs and unpacks summaries with one dictionary"""
+
+    def __init__(self, dictionary_id, codec, dictionary):
+        self.dictionary_id = dictionary_id
+        self.codec = codec
+        self._header = _HEADER.pack(MAGIC, CODEC_BYTES[codec], dictionary_id)
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("summaries were compressed with zstd; install the zstandard package")
+            self._zstd_dict = zstandard.ZstdCompressionDict(dictionary)
+            # zstandard (de)compressors must not be used from two threads at
+            # once, and codecs are shared by every session, so each thread
+            # gets its own pair
+            self._zstd_local = threading.local()
+        else:
+            # Primed once; copy() is far cheaper than loading the dictionary per summary
+            self._zlib_compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15, zdict=dictionary)
+            self._zlib_decompressor = zlib.decompressobj(-15, zdict=dictionary)
+
+    def _zstd(self):
+        local = self._zstd_local
+        if not hasattr(local, "compressor"):
+            local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=self._zstd_dict,
+                                                        write_content_size=True, write_checksum=False)
+            local.decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dict)
+        return local
+
+    def pack(self, summary):
+        """Packed bytes, or the summary itself when packing wouldn't make it smaller"""
+        raw = summary.encode("utf-8")
+        if self.codec == "zstd":
+            payload = self._zstd().compressor.compress(raw)
+        else:
+            compressor = self._zlib_compressor.copy()
+            payload = compressor.compress(raw) + compressor.flush()
+        if len(payload) + _HEADER.size >= len(raw):
+            return summary
+        return self._header + payload
+
+    def unpack(self, value):
+        payload = memoryview(value)[_HEADER.size:]
+        if self.codec == "zstd":
+            return self._zstd().decompressor.decompress(payload).decode("utf-8")
+        decompressor = self._zlib_decompressor.copy()
+        return (decompressor.decompress(payload) + decompressor.flush()).decode("utf-8")
+
+SEED_CODEC = SummaryCodec(0, "zlib", SEED_DICTIONARY)
+
+def packed_dictionary_id(value):
+    """Dictionary id of a packed summary, or None for plain text"""
+    if isinstance(value, (bytes, memoryview)) and bytes(value[:2]) == MAGIC:
+        return _HEADER.unpack_from(value)[2]
+    return None
+
+def unpack(value, codec_for):
+    """Plain text of a stored summary; `codec_for(dictionary_id)` supplies codecs"""
+    dictionary_id = packed_dictionary_id(value)
+    if dictionary_id is None:
+        return value
+    codec = SEED_CODEC if dictionary_id == 0 else codec_for(dictionary_id)
+    return codec.unpack(value)
+
+def register_sqlite_function(dbapi_connection):
+    """Add worklogger_summary(value) to a sqlite3 connection: the plain text of a stored summary.
+
+    The search index's content view and triggers call it; dictionaries are
+    read from the same connection and kept for its lifetime.
+    """
+    codecs = {}
+
+    def codec_for(dictionary_id):
+        if dictionary_id not in codecs:
+            codec, dictionary = dbapi_connection.execute(
+                "SELECT codec, dictionary FROM summary_dictionaries WHERE id = ?", (dictionary_id,)
+            ).fetchone()
+            codecs[dictionary_id] = SummaryCodec(dictionary_id, codec, dictionary)
+        return codecs[dictionary_id]
+
+    dbapi_connection.create_function(
+        "worklogger_summary", 1, lambda value: unpack(value, codec_for), deterministic=True,
+    )
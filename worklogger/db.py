@@ -0,0 +1,1335 @@
+"""
+Storage layer for WorkLogger: schema migrations, saved logs, per-hour
+entries, drafts, search and rollups. No Streamlit dependency; pandas is
+imported only by the functions that return DataFrames, so scripted use
+starts fast. The engine comes from the URL's backend in worklogger.backends
+(SQLite file, SQLite in-memory or PostgreSQL).
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import date
+
+from sqlalchemy import bindparam, text
+
+from worklogger import compression
+from worklogger.backends import backend_for_url
+from worklogger.logs import DayLog, parse_summary
+from worklogger.querycache import query_cache
+
+# Owner of rows written without a signed-in user (CLI, single-user installs)
+DEFAULT_USER_ID = "default"
+# Relative file db in the working directory unless WORKLOGGER_DB_URL says otherwise
+DB_URL = os.environ.get("WORKLOGGER_DB_URL", "sqlite:///work_logs.db")
+
+def create_db_engine(url, **options):
+    """A pooled engine tuned for the URL's backend (see worklogger.backends)"""
+    return backend_for_url(url).create_engine(url, **options)
+
+# Create engine
+backend = backend_for_url(DB_URL)
+engine = backend.create_engine(DB_URL)
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+def configure_engine(url, **options):
+    """Point the module at another database (e.g. the CLI's --db option)"""
+    global engine, backend, DB_URL
+    DB_URL = url
+    backend = backend_for_url(url)
+    engine = backend.create_engine(url, **options)
+    query_cache.clear()
+    return engine
+
+# Per-user counters bumped after every committed write to saved logs; cached
+# reads (see worklogger.querycache) are keyed by them
+_data_versions = {}
+_data_versions_lock = threading.Lock()
+
+def data_version(user_id=DEFAULT_USER_ID):
+    return _data_versions.get(user_id, 0)
+
+def _bump_data_version(user_id):
+    with _data_versions_lock:
+        version = _data_versions[user_id] = _data_versions.get(user_id, 0) + 1
+    current_engine = engine
+    query_cache.discard(lambda key: key[0] is current_engine and key[1] == user_id and key[2] < version)
+
+def _cached_query(fn):
+    """Serve `fn` from the shared query cache until the user's saved logs change.
+
+    Results are copies, so callers can add columns or update dicts freely.
+    """
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        user_id = bound.arguments["user_id"]
+        # Read the version before querying: a write committed in between
+        # files this result under the old version, where nothing looks it up
+        key = (engine, user_id, data_version(user_id), fn.__name__, tuple(bound.arguments.items()))
+        return query_cache.get_or_build(key, lambda: fn(*bound.args, **bound.kwargs))
+
+    wrapper.uncached = fn
+    return wrapper
+
+ROLLUP_TABLES = {"day": "rollup_daily", "week": "rollup_weekly", "month": "rollup_monthly"}
+ROLLUP_COUNTS = ("logged_slots", "meeting_slots", "task_slots")
+ENTRY_COLUMNS = ("user_id", "log_date", "slot", "position", "meeting", "meeting_info", "tasks", "general_info")
+# Batches at least this large maintain the search index set-wise instead of per row
+BULK_FTS_MIN_DAYS = 200
+# Dates per IN (...) lookup, well under SQLite's bound-parameter limit
+ROLLUP_LOOKUP_CHUNK = 500
+# Summary-only days parsed into entries per batch by migration 12
+SUMMARY_BACKFILL_BATCH_DAYS = 2000
+
+# Codec for newly trained summary dictionaries: zlib (default), zstd (needs
+# zstandard), or off to store plain text
+SUMMARY_CODEC = os.environ.get("WORKLOGGER_SUMMARY_CODEC", compression.default_codec())
+# Most recent summaries a dictionary is trained on, and the fewest worth training on
+DICTIONARY_TRAINING_SAMPLES = 5000
+MIN_TRAINING_SAMPLES = 50
+RECOMPRESS_BATCH_ROWS = 1000
+
+# Dictionaries never change once stored, so their codecs are kept per (engine, id)
+_codecs = {}
+# Codec new summaries are packed with, per engine
+_writers = {}
+
+def _codec_for(conn, dictionary_id):
+    key = (conn.engine, dictionary_id)
+    if key not in _codecs:
+        row = conn.execute(text("SELECT codec, dictionary FROM summary_dictionaries WHERE id = :id"),
+                           {"id": dictionary_id}).one()
+        _codecs[key] = compression.SummaryCodec(dictionary_id, row.codec, row.dictionary)
+    return _codecs[key]
+
+def _summary_writer(conn):
+    """The newest dictionary's codec (the seed before any training), or None when not compressing"""
+    if not backend.compresses_summaries or SUMMARY_CODEC == "off":
+        return None
+    if conn.engine not in _writers:
+        dictionary_id = conn.execute(text("SELECT MAX(id) FROM summary_dictionaries")).scalar()
+        _writers[conn.engine] = _codec_for(conn, dictionary_id) if dictionary_id else compression.SEED_CODEC
+    return _writers[conn.engine]
+
+def _pack_summary(conn, summary):
+    codec = _summary_writer(conn)
+    return summary if codec is None or summary is None else codec.pack(summary)
+
+def _unpack_summary(conn, value):
+    return compression.unpack(value, lambda dictionary_id: _codec_for(conn, dictionary_id))
+
+def _stored_size(value):
+    if value is None:
+        return 0
+    return len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+
+def _train_summary_dictionary(conn, codec_name=None):
+    """Train and store a dictionary from the newest summaries; None if there are too few"""
+    stored = conn.execute(text("""
+    SELECT log_summary FROM work_logs WHERE log_summary IS NOT NULL ORDER BY id DESC LIMIT :limit
+    """), {"limit": DICTIONARY_TRAINING_SAMPLES}).scalars()
+    samples = [summary for summary in (_unpack_summary(conn, value) for value in stored) if summary.strip()]
+    if len(samples) < MIN_TRAINING_SAMPLES:
+        return None
+    codec_name = codec_name or SUMMARY_CODEC
+    dictionary = compression.train_dictionary(samples, codec_name)
+    dictionary_id = conn.execute(text("""
+    INSERT INTO summary_dictionaries (codec, dictionary, samples) VALUES (:codec, :dictionary, :samples)
+    RETURNING id
+    """), {"codec": codec_name, "dictionary": dictionary, "samples": len(samples)}).scalar_one()
+    # Set (not just cached) in case a rolled-back attempt left another dictionary under this id
+    codec = _codecs[(conn.engine, dictionary_id)] = compression.SummaryCodec(dictionary_id, codec_name, dictionary)
+    _writers.pop(conn.engine, None)
+    return codec
+
+@contextmanager
+def _write_transaction():
+    """engine.begin() for read-then-write work, holding the backend's write lock from the first read"""
+    with engine.begin() as conn:
+        backend.begin_write(conn)
+        yield conn
+
+@contextmanager
+def _fts_triggers_suspended(conn):
+    """Drop the work_logs search triggers for the block and restore them after.
+
+    Trigger DDL is transactional in SQLite, so other connections never see
+    the table without them.
+    """
+    triggers = conn.execute(text("""
+    SELECT name, sql FROM sqlite_master
+    WHERE type = 'trigger' AND tbl_name = 'work_logs' AND name LIKE 'work_logs_fts_%'
+    """)).fetchall()
+    for name, _ in triggers:
+        conn.execute(text(f"DROP TRIGGER {name}"))
+    yield
+    for _, sql in triggers:
+        conn.exec_driver_sql(sql)
+
+def _recompress_batch(conn, codec, after_id, batch_rows=RECOMPRESS_BATCH_ROWS):
+    """Repack up to `batch_rows` summaries with id > after_id using `codec`.
+
+    Returns (last id seen or None when done, rows seen, stored bytes before, after).
+    Only the encoding changes, so the search index stays valid and its
+    triggers are skipped. A row saved again since it was read keeps its new
+    summary: the update only matches the value that was repacked.
+    """
+    rows = conn.execute(text("""
+    SELECT id, log_summary FROM work_logs WHERE id > :after_id ORDER BY id LIMIT :limit
+    """), {"after_id": after_id, "limit": batch_rows}).fetchall()
+    if not rows:
+        return None, 0, 0, 0
+    before = after = 0
+    updates = []
+    for row in rows:
+        if row.log_summary is None:
+            continue
+        packed = codec.pack(_unpack_summary(conn, row.log_summary))
+        before += _stored_size(row.log_summary)
+        after += _stored_size(packed)
+        if packed != row.log_summary:
+            updates.append({"id": row.id, "log_summary": packed, "old": row.log_summary})
+    if updates:
+        suspended = _fts_triggers_suspended(conn) if backend.full_text == "fts5" else nullcontext()
+        with suspended:
+            conn.execute(text("""
+            UPDATE work_logs SET log_summary = :log_summary WHERE id = :id AND log_summary = :old
+            """), updates)
+    return rows[-1].id, len(rows), before, after
+
+def _compress_existing_summaries(conn):
+    if not backend.compresses_summaries or SUMMARY_CODEC == "off":
+        return
+    codec = _train_summary_dictionary(conn) or compression.SEED_CODEC
+    after_id = 0
+    while after_id is not None:
+        after_id = _recompress_batch(conn, codec, after_id)[0]
+
+def compress_summaries(codec_name=None, batch_rows=RECOMPRESS_BATCH_ROWS, progress=None):
+    """Train a new dictionary on the saved summaries and repack every row with it.
+
+    Each batch of `batch_rows` is its own transaction, so saves from the app
+    carry on in between; `progress(rows_done)` is called after each one.
+    Returns dict(rows, bytes_before, bytes_after, dictionary_id). Freed pages
+    stay in the file until it is vacuumed.
+    """
+    if not backend.compresses_summaries:
+        raise ValueError(f"{backend.name} databases don't store compressed summaries")
+    with engine.begin() as conn:
+        codec = _train_summary_dictionary(conn, codec_name) or compression.SEED_CODEC
+    stats = {"rows": 0, "bytes_before": 0, "bytes_after": 0, "dictionary_id": codec.dictionary_id}
+    after_id = 0
+    while True:
+        with _write_transaction() as conn:
+            last_id, done, before, after = _recompress_batch(conn, codec, after_id, batch_rows)
+        if last_id is None:
+            break
+        after_id = last_id
+        stats["rows"] += done
+        stats["bytes_before"] += before
+        stats["bytes_after"] += after
+        if progress is not None:
+            progress(stats["rows"])
+    return stats
+
+def _rollup_periods(log_date):
+    """(ISO week, month) keys for a YYYY-MM-DD date string"""
+    iso_year, iso_week, _ = date.fromisoformat(str(log_date)).isocalendar()
+    return f"{iso_year}-W{iso_week:02d}", str(log_date)[:7]
+
+def _count_slots(rows):
+    counts = dict.fromkeys(ROLLUP_COUNTS, 0)
+    for row in rows:
+        has_tasks = bool(row["tasks"].strip())
+        if row["meeting"] or has_tasks or row["general_info"].strip():
+            counts["logged_slots"] += 1
+        counts["meeting_slots"] += int(bool(row["meeting"]))
+        counts["task_slots"] += int(has_tasks)
+    return counts
+
+def _apply_rollup_deltas(conn, counts_by_date, user_id):
+    """Replace each of a user's day counts and push the differences into their week and month rows.
+
+    `counts_by_date` maps YYYY-MM-DD to new counts; old counts are read and
+    the weekly/monthly upserts written in a few batched statements.
+    """
+    if not counts_by_date:
+        return
+    old_by_date = {}
+    dates = list(counts_by_date)
+    for i in range(0, len(dates), ROLLUP_LOOKUP_CHUNK):
+        rows = conn.execute(text("""
+        SELECT log_date, logged_slots, meeting_slots, task_slots
+        FROM rollup_daily WHERE user_id = :user_id AND log_date IN :dates
+        """).bindparams(bindparam("dates", expanding=True)),
+            {"user_id": user_id, "dates": dates[i:i + ROLLUP_LOOKUP_CHUNK]}).mappings()
+        for row in rows:
+            old_by_date[row["log_date"]] = row
+
+    conn.execute(text(backend.upsert(
+        "rollup_daily", ("user_id", "log_date", *ROLLUP_COUNTS), ("user_id", "log_date"), update=ROLLUP_COUNTS,
+    )), [{"user_id": user_id, "log_date": log_date, **counts} for log_date, counts in counts_by_date.items()])
+
+    period_deltas = {"rollup_weekly": {}, "rollup_monthly": {}}
+    for log_date, new_counts in counts_by_date.items():
+        old_counts = old_by_date.get(log_date) or dict.fromkeys(ROLLUP_COUNTS, 0)
+        delta = {name: new_counts[name] - old_counts[name] for name in ROLLUP_COUNTS}
+        delta["logged_days"] = (1 if new_counts["logged_slots"] else 0) - (1 if old_counts["logged_slots"] else 0)
+        if not any(delta.values()):
+            continue
+        week, month = _rollup_periods(log_date)
+        for table, period in (("rollup_weekly", week), ("rollup_monthly", month)):
+            totals = period_deltas[table].setdefault(period, dict.fromkeys(delta, 0))
+            for name, value in delta.items():
+                totals[name] += value
+
+    for table, periods in period_deltas.items():
+        if not periods:
+            continue
+        counts = ("logged_days", *ROLLUP_COUNTS)
+        conn.execute(text(backend.upsert(
+            table, ("user_id", "period", *counts), ("user_id", "period"), increment=counts,
+        )), [{"user_id": user_id, "period": period, **totals} for period, totals in periods.items()])
+
+def _backfill_rollups(conn):
+    """Migration 8's backfill into the rollup tables as it created them, before
+    they had a user_id. Kept as shipped; migration 10 recounts per user."""
+    by_day = {}
+    for row in conn.execute(text("""
+    SELECT log_date, meeting, tasks, general_info FROM work_log_entries ORDER BY log_date
+    """)).mappings():
+        by_day.setdefault(row["log_date"], []).append(row)
+    daily = {log_date: _count_slots(rows) for log_date, rows in by_day.items()}
+    periods = {"rollup_weekly": {}, "rollup_monthly": {}}
+    for log_date, counts in daily.items():
+        for table, period in zip(periods, _rollup_periods(log_date)):
+            totals = periods[table].setdefault(period, dict.fromkeys(("logged_days", *ROLLUP_COUNTS), 0))
+            totals["logged_days"] += 1 if counts["logged_slots"] else 0
+            for name in ROLLUP_COUNTS:
+                totals[name] += counts[name]
+    if daily:
+        conn.execute(text("""
+        INSERT INTO rollup_daily (log_date, logged_slots, meeting_slots, task_slots)
+        VALUES (:log_date, :logged_slots, :meeting_slots, :task_slots)
+        """), [{"log_date": log_date, **counts} for log_date, counts in daily.items()])
+    for table, totals_by_period in periods.items():
+        if totals_by_period:
+            conn.execute(text(f"""
+            INSERT INTO {table} (period, logged_days, logged_slots, meeting_slots, task_slots)
+            VALUES (:period, :logged_days, :logged_slots, :meeting_slots, :task_slots)
+            """), [{"period": period, **totals} for period, totals in totals_by_period.items()])
+
+def _backfill_user_rollups(conn):
+    result = conn.execute(text("""
+    SELECT user_id, log_date, meeting, tasks, general_info FROM work_log_entries ORDER BY user_id, log_date
+    """))
+    by_user = {}
+    for row in result.mappings():
+        by_user.setdefault(row["user_id"], {}).setdefault(row["log_date"], []).append(row)
+    for user_id, by_day in by_user.items():
+        _apply_rollup_deltas(conn, {log_date: _count_slots(rows) for log_date, rows in by_day.items()}, user_id)
+
+def _rebuild_table(table, create_sql, columns, indexes=()):
+    """Statements that recreate `table` from `create_sql` (as {table}), copying
+    `columns` and assigning existing rows to the default user.
+
+    SQLite can't change a table's keys in place, so the data moves through a
+    new table that is then renamed over the old one.
+    """
+    column_list = ", ".join(columns)
+    return [
+        create_sql.format(table=f"{table}_new"),
+        f"""
+        INSERT INTO {table}_new (user_id, {column_list})
+        SELECT '{DEFAULT_USER_ID}', {column_list} FROM {table}
+        """,
+        f"DROP TABLE {table}",
+        f"ALTER TABLE {table}_new RENAME TO {table}",
+        *indexes,
+    ]
+
+def _insert_entries(conn, days, user_id):
+    """Insert the entries of a user's (log_date, day_log) days and update their rollups"""
+    rows, counts = [], {}
+    for log_date, day_log in days:
+        day_rows = _entry_rows(log_date, day_log, user_id)
+        counts[log_date] = _count_slots(day_rows)
+        rows.extend(day_rows)
+    if rows:
+        backend.insert_many(conn, """
+        INSERT INTO work_log_entries
+          (user_id, log_date, slot, position, meeting, meeting_info, tasks, general_info)
+        VALUES
+          (:user_id, :log_date, :slot, :position, :meeting, :meeting_info, :tasks, :general_info)
+        """, rows)
+    # Keep the reporting rollups in step with these days' entries
+    _apply_rollup_deltas(conn, counts, user_id)
+
+def _summary_day_log(summary):
+    """A DayLog of the slots a summary lists"""
+    entries = parse_summary(summary)
+    return DayLog(list(entries), entries)
+
+def _backfill_summary_entries(conn, batch_days=SUMMARY_BACKFILL_BATCH_DAYS):
+    """Parse entries, and count rollups, for saved days that only have a summary.
+
+    Logs saved before work_log_entries existed kept nothing else, so range
+    exports, the calendar and reports didn't see them.
+    """
+    after_id = 0
+    while True:
+        rows = conn.execute(text("""
+        SELECT w.id, w.user_id, w.log_date, w.log_summary FROM work_logs w
+        WHERE w.id > :after_id AND NOT EXISTS (
+            SELECT 1 FROM work_log_entries e WHERE e.user_id = w.user_id AND e.log_date = w.log_date
+        )
+        ORDER BY w.id LIMIT :limit
+        """), {"after_id": after_id, "limit": batch_days}).fetchall()
+        if not rows:
+            return
+        after_id = rows[-1].id
+        by_user = {}
+        for row in rows:
+            day_log = _summary_day_log(_unpack_summary(conn, row.log_summary))
+            if len(day_log):
+                by_user.setdefault(row.user_id, []).append((row.log_date, day_log))
+        for user_id, days in by_user.items():
+            _insert_entries(conn, days, user_id)
+
+# Ordered schema migrations: (version, description, statements).
+# Append new versions at the end; never edit one that has shipped.
+MIGRATIONS = [
+    (1, "create work_logs", [
+        """
+        CREATE TABLE IF NOT EXISTS work_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            log_date TEXT UNIQUE,
+            log_summary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "index work_logs by created_at for keyset paging", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_work_logs_created_at
+        ON work_logs (created_at DESC, id DESC)
+        """,
+    ]),
+    (3, "create work_log_entries", [
+        """
+        CREATE TABLE IF NOT EXISTS work_log_entries (
+            log_date TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            meeting INTEGER NOT NULL DEFAULT 0,
+            meeting_info TEXT NOT NULL DEFAULT '',
+            tasks TEXT NOT NULL DEFAULT '',
+            general_info TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (log_date, slot)
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_work_log_entries_meetings
+        ON work_log_entries (log_date) WHERE meeting = 1
+        """,
+    ]),
+    (4, "full-text index over work_logs.log_summary", [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS work_logs_fts
+        USING fts5(log_summary, content='work_logs', content_rowid='id')
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS work_logs_fts_ai AFTER INSERT ON work_logs BEGIN
+          INSERT INTO work_logs_fts(rowid, log_summary) VALUES (new.id, new.log_summary);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS work_logs_fts_ad AFTER DELETE ON work_logs BEGIN
+          INSERT INTO work_logs_fts(work_logs_fts, rowid, log_summary)
+          VALUES ('delete', old.id, old.log_summary);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS work_logs_fts_au AFTER UPDATE ON work_logs BEGIN
+          INSERT INTO work_logs_fts(work_logs_fts, rowid, log_summary)
+          VALUES ('delete', old.id, old.log_summary);
+          INSERT INTO work_logs_fts(rowid, log_summary) VALUES (new.id, new.log_summary);
+        END
+        """,
+        # Index rows saved before search existed
+        "INSERT INTO work_logs_fts(work_logs_fts) VALUES ('rebuild')",
+    ]),
+    (5, "create email_outbox", [
+        """
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            subject TEXT NOT NULL DEFAULT '',
+            from_addr TEXT NOT NULL,
+            recipients TEXT NOT NULL,
+            message BLOB NOT NULL,
+            transport TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_pending
+        ON email_outbox (next_attempt_at) WHERE status IN ('queued', 'sending')
+        """,
+    ]),
+    (6, "create log_drafts", [
+        """
+        CREATE TABLE IF NOT EXISTS log_drafts (
+            draft_key TEXT PRIMARY KEY,
+            log_date TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (7, "per-slot drafts for incremental autosave", [
+        """
+        CREATE TABLE IF NOT EXISTS log_draft_entries (
+            log_date TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            meeting INTEGER NOT NULL DEFAULT 0,
+            meeting_info TEXT NOT NULL DEFAULT '',
+            tasks TEXT NOT NULL DEFAULT '',
+            general_info TEXT NOT NULL DEFAULT '',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (log_date, slot)
+        )
+        """,
+        """
+        INSERT OR REPLACE INTO log_draft_entries
+          (log_date, slot, position, meeting, meeting_info, tasks, general_info, updated_at)
+        SELECT d.log_date, s.value, s.key,
+               json_extract(d.payload, '$.meeting[' || s.key || ']'),
+               json_extract(d.payload, '$.meeting_info[' || s.key || ']'),
+               json_extract(d.payload, '$.tasks[' || s.key || ']'),
+               json_extract(d.payload, '$.general[' || s.key || ']'),
+               d.updated_at
+        FROM log_drafts d, json_each(d.payload, '$.slots') s
+        """,
+        "DROP TABLE IF EXISTS log_drafts",
+    ]),
+    (8, "weekly/monthly rollups of logged, meeting and task slots", [
+        """
+        CREATE TABLE IF NOT EXISTS rollup_daily (
+            log_date TEXT PRIMARY KEY,
+            logged_slots INTEGER NOT NULL DEFAULT 0,
+            meeting_slots INTEGER NOT NULL DEFAULT 0,
+            task_slots INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rollup_weekly (
+            period TEXT PRIMARY KEY,
+            logged_days INTEGER NOT NULL DEFAULT 0,
+            logged_slots INTEGER NOT NULL DEFAULT 0,
+            meeting_slots INTEGER NOT NULL DEFAULT 0,
+            task_slots INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rollup_monthly (
+            period TEXT PRIMARY KEY,
+            logged_days INTEGER NOT NULL DEFAULT 0,
+            logged_slots INTEGER NOT NULL DEFAULT 0,
+            meeting_slots INTEGER NOT NULL DEFAULT 0,
+            task_slots INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        _backfill_rollups,
+    ]),
+    (9, "resume checkpoints for bulk imports", [
+        """
+        CREATE TABLE IF NOT EXISTS import_progress (
+            source TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            days INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (10, "partition logs, drafts, rollups and import progress by user", [
+        # The search index and its triggers are rebuilt over the new table below
+        "DROP TRIGGER IF EXISTS work_logs_fts_ai",
+        "DROP TRIGGER IF EXISTS work_logs_fts_ad",
+        "DROP TRIGGER IF EXISTS work_logs_fts_au",
+        "DROP TABLE IF EXISTS work_logs_fts",
+        # ids are kept, so saved history keeps its keyset cursors and search rowids
+        *_rebuild_table("work_logs", """
+        CREATE TABLE {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            log_date TEXT NOT NULL,
+            log_summary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """, ["id", "log_date", "log_summary", "created_at"], [
+            "CREATE UNIQUE INDEX idx_work_logs_user_date ON work_logs (user_id, log_date)",
+            """
+            CREATE INDEX idx_work_logs_user_created_at
+            ON work_logs (user_id, created_at DESC, id DESC)
+            """,
+        ]),
+        *_rebuild_table("work_log_entries", """
+        CREATE TABLE {table} (
+            user_id TEXT NOT NULL DEFAULT 'default',
+            log_date TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            meeting INTEGER NOT NULL DEFAULT 0,
+            meeting_info TEXT NOT NULL DEFAULT '',
+            tasks TEXT NOT NULL DEFAULT '',
+            general_info TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (user_id, log_date, slot)
+        )
+        """, ["log_date", "slot", "position", "meeting", "meeting_info", "tasks", "general_info"], [
+            """
+            CREATE INDEX idx_work_log_entries_meetings
+            ON work_log_entries (user_id, log_date) WHERE meeting = 1
+            """,
+        ]),
+        *_rebuild_table("log_draft_entries", """
+        CREATE TABLE {table} (
+            user_id TEXT NOT NULL DEFAULT 'default',
+            log_date TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            meeting INTEGER NOT NULL DEFAULT 0,
+            meeting_info TEXT NOT NULL DEFAULT '',
+            tasks TEXT NOT NULL DEFAULT '',
+            general_info TEXT NOT NULL DEFAULT '',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, log_date, slot)
+        )
+        """, ["log_date", "slot", "position", "meeting", "meeting_info", "tasks", "general_info", "updated_at"]),
+        *_rebuild_table("import_progress", """
+        CREATE TABLE {table} (
+            user_id TEXT NOT NULL DEFAULT 'default',
+            source TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            days INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, source)
+        )
+        """, ["source", "fingerprint", "position", "days", "completed", "updated_at"]),
+        # Rollups are derived data: recreate them empty and recount per user
+        "DROP TABLE IF EXISTS rollup_daily",
+        "DROP TABLE IF EXISTS rollup_weekly",
+        "DROP TABLE IF EXISTS rollup_monthly",
+        """
+        CREATE TABLE rollup_daily (
+            user_id TEXT NOT NULL,
+            log_date TEXT NOT NULL,
+            logged_slots INTEGER NOT NULL DEFAULT 0,
+            meeting_slots INTEGER NOT NULL DEFAULT 0,
+            task_slots INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, log_date)
+        )
+        """,
+        """
+        CREATE TABLE rollup_weekly (
+            user_id TEXT NOT NULL,
+            period TEXT NOT NULL,
+            logged_days INTEGER NOT NULL DEFAULT 0,
+            logged_slots INTEGER NOT NULL DEFAULT 0,
+            meeting_slots INTEGER NOT NULL DEFAULT 0,
+            task_slots INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, period)
+        )
+        """,
+        """
+        CREATE TABLE rollup_monthly (
+            user_id TEXT NOT NULL,
+            period TEXT NOT NULL,
+            logged_days INTEGER NOT NULL DEFAULT 0,
+            logged_slots INTEGER NOT NULL DEFAULT 0,
+            meeting_slots INTEGER NOT NULL DEFAULT 0,
+            task_slots INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, period)
+        )
+        """,
+        _backfill_user_rollups,
+        # user_id is indexed too, so a search only walks the searching user's postings
+        """
+        CREATE VIRTUAL TABLE work_logs_fts
+        USING fts5(log_summary, user_id, content='work_logs', content_rowid='id')
+        """,
+        """
+        CREATE TRIGGER work_logs_fts_ai AFTER INSERT ON work_logs BEGIN
+          INSERT INTO work_logs_fts(rowid, log_summary, user_id)
+          VALUES (new.id, new.log_summary, new.user_id);
+        END
+        """,
+        """
+        CREATE TRIGGER work_logs_fts_ad AFTER DELETE ON work_logs BEGIN
+          INSERT INTO work_logs_fts(work_logs_fts, rowid, log_summary, user_id)
+          VALUES ('delete', old.id, old.log_summary, old.user_id);
+        END
+        """,
+        """
+        CREATE TRIGGER work_logs_fts_au AFTER UPDATE ON work_logs BEGIN
+          INSERT INTO work_logs_fts(work_logs_fts, rowid, log_summary, user_id)
+          VALUES ('delete', old.id, old.log_summary, old.user_id);
+          INSERT INTO work_logs_fts(rowid, log_summary, user_id)
+          VALUES (new.id, new.log_summary, new.user_id);
+        END
+        """,
+        "INSERT INTO work_logs_fts(work_logs_fts) VALUES ('rebuild')",
+    ]),
+    (11, "dictionary-compressed summaries", [
+        """
+        CREATE TABLE IF NOT EXISTS summary_dictionaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codec TEXT NOT NULL,
+            dictionary BLOB NOT NULL,
+            samples INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "DROP TRIGGER IF EXISTS work_logs_fts_ai",
+        "DROP TRIGGER IF EXISTS work_logs_fts_ad",
+        "DROP TRIGGER IF EXISTS work_logs_fts_au",
+        "DROP TABLE IF EXISTS work_logs_fts",
+        _compress_existing_summaries,
+        # Search indexes and snippets the plain text; worklogger_summary() is
+        # registered on every connection by the SQLite backend
+        """
+        CREATE VIEW work_logs_text AS
+        SELECT id, user_id, worklogger_summary(log_summary) AS log_summary FROM work_logs
+        """,
+        """
+        CREATE VIRTUAL TABLE work_logs_fts
+        USING fts5(log_summary, user_id, content='work_logs_text', content_rowid='id')
+        """,
+        """
+        CREATE TRIGGER work_logs_fts_ai AFTER INSERT ON work_logs BEGIN
+          INSERT INTO work_logs_fts(rowid, log_summary, user_id)
+          VALUES (new.id, worklogger_summary(new.log_summary), new.user_id);
+        END
+        """,
+        """
+        CREATE TRIGGER work_logs_fts_ad AFTER DELETE ON work_logs BEGIN
+          INSERT INTO work_logs_fts(work_logs_fts, rowid, log_summary, user_id)
+          VALUES ('delete', old.id, worklogger_summary(old.log_summary), old.user_id);
+        END
+        """,
+        """
+        CREATE TRIGGER work_logs_fts_au AFTER UPDATE ON work_logs BEGIN
+          INSERT INTO work_logs_fts(work_logs_fts, rowid, log_summary, user_id)
+          VALUES ('delete', old.id, worklogger_summary(old.log_summary), old.user_id);
+          INSERT INTO work_logs_fts(rowid, log_summary, user_id)
+          VALUES (new.id, worklogger_summary(new.log_summary), new.user_id);
+        END
+        """,
+        "INSERT INTO work_logs_fts(work_logs_fts) VALUES ('rebuild')",
+    ]),
+    (12, "per-hour entries for days saved with only a summary", [
+        _backfill_summary_entries,
+    ]),
+]
+
+# PostgreSQL databases start at the current schema in one step; later
+# versions are appended to both lists.
+POSTGRES_MIGRATIONS = [
+    (10, "create the per-user schema", [
+        """
+        CREATE TABLE IF NOT EXISTS work_logs (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            log_date TEXT NOT NULL,
+            log_summary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_work_logs_user_date ON work_logs (user_id, log_date)",
+        """
+        CREATE INDEX IF NOT EXISTS idx_work_logs_user_created_at
+        ON work_logs (user_id, created_at DESC, id DESC)
+        """,
+        # Serves search; the user filter is applied to the matching rows
+        """
+        CREATE INDEX IF NOT EXISTS idx_work_logs_search
+        ON work_logs USING GIN (to_tsvector('simple', COALESCE(log_summary, '')))
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS work_log_entries (
+            user_id TEXT NOT NULL DEFAULT 'default',
+            log_date TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            meeting INTEGER NOT NULL DEFAULT 0,
+            meeting_info TEXT NOT NULL DEFAULT '',
+            tasks TEXT NOT NULL DEFAULT '',
+            general_info TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (user_id, log_date, slot)
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_work_log_entries_meetings
+        ON work_log_entries (user_id, log_date) WHERE meeting = 1
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS log_draft_entries (
+            user_id TEXT NOT NULL DEFAULT 'default',
+            log_date TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            meeting INTEGER NOT NULL DEFAULT 0,
+            meeting_info TEXT NOT NULL DEFAULT '',
+            tasks TEXT NOT NULL DEFAULT '',
+            general_info TEXT NOT NULL DEFAULT '',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, log_date, slot)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'queued',
+            subject TEXT NOT NULL DEFAULT '',
+            from_addr TEXT NOT NULL,
+            recipients TEXT NOT NULL,
+            message BYTEA NOT NULL,
+            transport TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            next_attempt_at DOUBLE PRECISION NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_pending
+        ON email_outbox (next_attempt_at) WHERE status IN ('queued', 'sending')
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rollup_daily (
+            user_id TEXT NOT NULL,
+            log_date TEXT NOT NULL,
+            logged_slots INTEGER NOT NULL DEFAULT 0,
+            meeting_slots INTEGER NOT NULL DEFAULT 0,
+            task_slots INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, log_date)
+        )
+        """,
+        *[f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            user_id TEXT NOT NULL,
+            period TEXT NOT NULL,
+            logged_days INTEGER NOT NULL DEFAULT 0,
+            logged_slots INTEGER NOT NULL DEFAULT 0,
+            meeting_slots INTEGER NOT NULL DEFAULT 0,
+            task_slots INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, period)
+        )
+        """ for table in ("rollup_weekly", "rollup_monthly")],
+        """
+        CREATE TABLE IF NOT EXISTS import_progress (
+            user_id TEXT NOT NULL DEFAULT 'default',
+            source TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            days INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, source)
+        )
+        """,
+    ]),
+    # Summaries stay plain text here; the table keeps the schema in step with SQLite
+    (11, "dictionary-compressed summaries", [
+        """
+        CREATE TABLE IF NOT EXISTS summary_dictionaries (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            codec TEXT NOT NULL,
+            dictionary BYTEA NOT NULL,
+            samples INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (12, "per-hour entries for days saved with only a summary", [
+        _backfill_summary_entries,
+    ]),
+]
+
+MIGRATIONS_BY_DIALECT = {"sqlite": MIGRATIONS, "postgresql": POSTGRES_MIGRATIONS}
+
+def get_schema_version(conn):
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+def run_migrations(target_engine=None):
+    """Apply the dialect's pending migrations in order, each in its own transaction.
+    Returns the schema version."""
+    target_engine = target_engine if target_engine is not None else engine
+    migrations = MIGRATIONS_BY_DIALECT[target_engine.dialect.name]
+    with target_engine.begin() as conn:
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """))
+        current = get_schema_version(conn)
+
+    for version, description, statements in migrations:
+        if version <= current:
+            continue
+        with target_engine.begin() as conn:
+            for statement in statements:
+                # Plain SQL, or a callable for data migrations that need Python
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_version (version, description) VALUES (:version, :description)"),
+                {"version": version, "description": description},
+            )
+        current = version
+    return current
+
+def init_db():
+    """Bring the schema up to date once per process and engine"""
+    with _schema_lock:
+        # Keyed by engine: a new in-memory engine for the same URL is a new, empty database
+        if engine not in _schema_ready:
+            run_migrations()
+            _schema_ready.add(engine)
+
+def _entry_rows(log_date, day_log, user_id, positions=None):
+    rows = []
+    for position, slot, meeting, meeting_info, tasks, general in day_log.iter_entries():
+        if positions is not None and position not in positions:
+            continue
+        rows.append({
+            "user_id": user_id,
+            "log_date": str(log_date),
+            "slot": slot,
+            "position": position,
+            "meeting": int(meeting),
+            "meeting_info": meeting_info if meeting else "",
+            "tasks": tasks,
+            "general_info": general,
+        })
+    return rows
+
+def _write_days(conn, days, user_id):
+    """Upsert a user's (log_date, log_summary, day_log) days inside an open transaction.
+
+    Each day's entries are replaced, its rollups updated and its drafts
+    discarded; a repeated date keeps its last occurrence. A day given
+    without a DayLog gets the entries parsed from its summary, so range
+    reads and rollups never miss a saved day.
+    """
+    by_date = {str(log_date): (log_summary, day_log) for log_date, log_summary, day_log in days}
+    if not by_date:
+        return 0
+    # Upsert behavior: replace existing log for the same date if any
+    conn.execute(text(backend.upsert(
+        "work_logs", ("user_id", "log_date", "log_summary"), ("user_id", "log_date"),
+        update=("log_summary",), touch=("created_at",),
+    )), [{"user_id": user_id, "log_date": log_date, "log_summary": _pack_summary(conn, summary)}
+           for log_date, (summary, _) in by_date.items()])
+
+    with_entries = [(log_date, day_log if day_log is not None else _summary_day_log(summary))
+                    for log_date, (summary, day_log) in by_date.items()]
+    dates = [{"user_id": user_id, "log_date": log_date} for log_date, _ in with_entries]
+    conn.execute(text("DELETE FROM work_log_entries WHERE user_id = :user_id AND log_date = :log_date"), dates)
+    _insert_entries(conn, with_entries, user_id)
+    # The days are saved now, so their autosaved drafts are no longer needed
+    conn.execute(text("DELETE FROM log_draft_entries WHERE user_id = :user_id AND log_date = :log_date"), dates)
+    return len(by_date)
+
+def save_log_to_db(log_date, log_summary, entries=None, user_id=DEFAULT_USER_ID):
+    """Upsert the day's summary and replace its per-hour entries.
+
+    `entries` is the session DayLog; all slots are written with a single
+    executemany. Without one, the entries are parsed from the summary.
+    """
+    with engine.begin() as conn:
+        _write_days(conn, [(log_date, log_summary, entries)], user_id)
+    _bump_data_version(user_id)
+
+def _reindex_fts_in_bulk(conn, dates, write, user_id):
+    """Run write() with the work_logs FTS triggers swapped for set-based updates.
+
+    The per-row triggers tokenize one summary per statement; deleting the
+    batch's old index entries up front and inserting the new ones with a
+    single INSERT ... SELECT is several times faster for large batches.
+    """
+    params = {"user_id": user_id, "dates": json.dumps(dates)}
+    in_batch = "user_id = :user_id AND log_date IN (SELECT value FROM json_each(:dates))"
+    conn.execute(text(f"""
+    INSERT INTO work_logs_fts(work_logs_fts, rowid, log_summary, user_id)
+    SELECT 'delete', id, worklogger_summary(log_summary), user_id FROM work_logs WHERE {in_batch}
+    """), params)
+    with _fts_triggers_suspended(conn):
+        result = write()
+    conn.execute(text(f"""
+    INSERT INTO work_logs_fts(rowid, log_summary, user_id)
+    SELECT id, worklogger_summary(log_summary), user_id FROM work_logs WHERE {in_batch}
+    """), params)
+    return result
+
+def save_logs_batch(days, checkpoint=None, user_id=DEFAULT_USER_ID):
+    """Save many of a user's (log_date, log_summary, day_log) days in one transaction.
+
+    Same upsert semantics as save_log_to_db. `checkpoint` is an optional
+    dict(source, fingerprint, position, days[, completed]) stored in the
+    same transaction, so an interrupted import resumes exactly after the
+    last committed batch.
+    """
+    days = list(days)
+    with engine.begin() as conn:
+        if backend.full_text == "fts5" and len(days) >= BULK_FTS_MIN_DAYS:
+            dates = list({str(log_date): None for log_date, _, _ in days})
+            saved = _reindex_fts_in_bulk(conn, dates, lambda: _write_days(conn, days, user_id), user_id)
+        else:
+            saved = _write_days(conn, days, user_id)
+        if checkpoint is not None:
+            conn.execute(text(backend.upsert(
+                "import_progress", ("user_id", "source", "fingerprint", "position", "days", "completed"),
+                ("user_id", "source"), update=("fingerprint", "position", "days", "completed"),
+                touch=("updated_at",),
+            )), {"completed": 0, **checkpoint, "user_id": user_id})
+    _bump_data_version(user_id)
+    return saved
+
+def get_import_checkpoint(source, user_id=DEFAULT_USER_ID):
+    """Stored progress for a user's import source, or None"""
+    with engine.connect() as conn:
+        row = conn.execute(text("""
+        SELECT * FROM import_progress WHERE user_id = :user_id AND source = :source
+        """), {"user_id": user_id, "source": source}).mappings().first()
+        return dict(row) if row else None
+
+def clear_import_checkpoint(source, user_id=DEFAULT_USER_ID):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM import_progress WHERE user_id = :user_id AND source = :source"),
+                     {"user_id": user_id, "source": source})
+
+def _load_entries(table, log_date, user_id):
+    with engine.connect() as conn:
+        result = conn.execute(text(f"""
+        SELECT slot, meeting, meeting_info, tasks, general_info
+        FROM {table}
+        WHERE user_id = :user_id AND log_date = :log_date
+        ORDER BY position
+        """), {"user_id": user_id, "log_date": str(log_date)})
+        return {
+            row.slot: {
+                "meeting": bool(row.meeting),
+                "meeting_info": row.meeting_info,
+                "tasks": row.tasks,
+                "general": row.general_info,
+            }
+            for row in result
+        }
+
+@_cached_query
+def load_log_entries(log_date, user_id=DEFAULT_USER_ID):
+    """Return the saved per-hour entries for a date as {slot: entry}"""
+    return _load_entries("work_log_entries", log_date, user_id)
+
+def save_draft_entries(log_date, day_log, positions, user_id=DEFAULT_USER_ID):
+    """Upsert only the given slot positions of an unsaved draft, in one transaction"""
+    rows = _entry_rows(log_date, day_log, user_id, positions)
+    if not rows:
+        return 0
+    with engine.begin() as conn:
+        conn.execute(text(backend.upsert(
+            "log_draft_entries", ENTRY_COLUMNS, ("user_id", "log_date", "slot"),
+            update=ENTRY_COLUMNS[3:], touch=("updated_at",),
+        )), rows)
+    return len(rows)
+
+def load_draft_entries(log_date, user_id=DEFAULT_USER_ID):
+    """Autosaved (not yet saved-to-database) slots for a date, as {slot: entry}"""
+    return _load_entries("log_draft_entries", log_date, user_id)
+
+def iter_log_entries(start_date, end_date, chunksize=5000, user_id=DEFAULT_USER_ID):
+    """Yield saved hour slots in [start_date, end_date] as DataFrame chunks.
+
+    Rows are streamed from the cursor, so memory stays bounded by `chunksize`
+    no matter how much history the range covers. Days saved before per-hour
+    entries existed are included once migration 12 has parsed their
+    summaries (init_db() runs it).
+    """
+    query = text("""
+    SELECT log_date, slot, meeting, meeting_info, tasks, general_info
+    FROM work_log_entries
+    WHERE user_id = :user_id AND log_date >= :start_date AND log_date <= :end_date
+    ORDER BY log_date, position
+    """)
+    params = {"user_id": user_id, "start_date": str(start_date), "end_date": str(end_date)}
+    import pandas as pd
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize):
+            yield chunk
+
+def get_meeting_entries(start_date=None, end_date=None, user_id=DEFAULT_USER_ID):
+    """All hour slots flagged as meetings, optionally within [start_date, end_date]"""
+    clauses = ["user_id = :user_id", "meeting = 1"]
+    params = {"user_id": user_id}
+    if start_date is not None:
+        clauses.append("log_date >= :start_date")
+        params["start_date"] = str(start_date)
+    if end_date is not None:
+        clauses.append("log_date <= :end_date")
+        params["end_date"] = str(end_date)
+
+    with engine.connect() as conn:
+        result = conn.execute(text(f"""
+        SELECT log_date, slot, meeting_info, tasks, general_info
+        FROM work_log_entries
+        WHERE {" AND ".join(clauses)}
+        ORDER BY log_date, position
+        """), params)
+        return _frame(result.fetchall(), result.keys())
+
+def clear_all_logs(user_id=DEFAULT_USER_ID):
+    """Delete every log the user saved along with its entries and rollups.
+
+    The freed pages are reused by later saves; the next `archive` run (see
+    reclaim_space) gives them back to the filesystem.
+    """
+    with engine.begin() as conn:
+        for table in ("work_logs", "work_log_entries", *ROLLUP_TABLES.values()):
+            conn.execute(text(f"DELETE FROM {table} WHERE user_id = :user_id"), {"user_id": user_id})
+    _bump_data_version(user_id)
+
+def reclaim_space():
+    """Shrink the database after large deletes (see StorageBackend.reclaim_space)"""
+    return backend.reclaim_space(engine)
+
+def months_before(cutoff, user_id=DEFAULT_USER_ID):
+    """YYYY-MM months with saved logs dated before `cutoff` (YYYY-MM-DD), oldest first"""
+    with engine.connect() as conn:
+        return list(conn.execute(text("""
+        SELECT DISTINCT substr(log_date, 1, 7) AS month FROM work_logs
+        WHERE user_id = :user_id AND log_date < :cutoff
+        ORDER BY month
+        """), {"user_id": user_id, "cutoff": str(cutoff)}).scalars())
+
+def _month_bounds(month):
+    """First day of a YYYY-MM month and of the month after it"""
+    year, number = map(int, month.split("-"))
+    return f"{month}-01", f"{year + number // 12:04d}-{number % 12 + 1:02d}-01"
+
+def archive_month(month, write, user_id=DEFAULT_USER_ID):
+    """Move one YYYY-MM month of a user's saved logs out of the database.
+
+    `write(logs, entries)` gets the month's logs (log_date, plain-text
+    log_summary, created_at) and entries as lists of dicts, and must have
+    stored them durably when it returns; the rows are deleted in the same
+    transaction. Rollups stay, so reports still count archived months.
+    Returns (days, entries) moved.
+    """
+    start, end = _month_bounds(month)
+    params = {"user_id": user_id, "start": start, "end": end}
+    in_month = "user_id = :user_id AND log_date >= :start AND log_date < :end"
+    with _write_transaction() as conn:
+        # SQLite holds the write lock from this first read; PostgreSQL locks the
+        # rows it reads. Either way a concurrent save of one of these days waits
+        # and then lands as a new hot row. Only the rows handed to `write` are
+        # deleted, so a day first saved meanwhile (not yet locked) stays put.
+        rows = conn.execute(text(f"""
+        SELECT id, log_date, log_summary, created_at FROM work_logs
+        WHERE {in_month} ORDER BY log_date {backend.row_lock}
+        """), params).all()
+        if not rows:
+            return 0, 0
+        logs = [{"log_date": row.log_date, "log_summary": _unpack_summary(conn, row.log_summary),
+                 "created_at": str(row.created_at)} for row in rows]
+        dates = [row.log_date for row in rows]
+        entries = [dict(row) for row in conn.execute(text("""
+        SELECT log_date, slot, position, meeting, meeting_info, tasks, general_info
+        FROM work_log_entries WHERE user_id = :user_id AND log_date IN :dates ORDER BY log_date, position
+        """).bindparams(bindparam("dates", expanding=True)), {"user_id": user_id, "dates": dates}).mappings()]
+        write(logs, entries)
+        conn.execute(text("""
+        DELETE FROM work_log_entries WHERE user_id = :user_id AND log_date IN :dates
+        """).bindparams(bindparam("dates", expanding=True)), {"user_id": user_id, "dates": dates})
+        conn.execute(text("DELETE FROM work_logs WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                     {"ids": [row.id for row in rows]})
+    _bump_data_version(user_id)
+    return len(logs), len(entries)
+
+def get_rollups(granularity="week", start=None, end=None, user_id=DEFAULT_USER_ID):
+    """Rollup rows for 'day', 'week' or 'month', oldest first.
+
+    `start`/`end` bound the period key (dates for 'day', '2024-W05' for
+    'week', '2024-05' for 'month').
+    """
+    table = ROLLUP_TABLES[granularity]
+    key = "log_date" if granularity == "day" else "period"
+    columns = [key, *ROLLUP_COUNTS] if granularity == "day" else [key, "logged_days", *ROLLUP_COUNTS]
+    clauses, params = ["user_id = :user_id"], {"user_id": user_id}
+    if start is not None:
+        clauses.append(f"{key} >= :start")
+        params["start"] = str(start)
+    if end is not None:
+        clauses.append(f"{key} <= :end")
+        params["end"] = str(end)
+    with engine.connect() as conn:
+        result = conn.execute(text(f"""
+        SELECT {", ".join(columns)} FROM {table}
+        WHERE {" AND ".join(clauses)}
+        ORDER BY {key}
+        """), params)
+        return _frame(result.fetchall(), result.keys())
+
+def _frame(rows, columns):
+    import pandas as pd
+    return pd.DataFrame(rows, columns=list(columns))
+
+@_cached_query
+def get_entries_in_range(start_date, end_date, user_id=DEFAULT_USER_ID):
+    """The user's saved hour slots in [start_date, end_date] as one DataFrame,
+    for week and month views.
+
+    One range scan of the (user_id, log_date, slot) primary key, instead of a
+    lookup per day. Columns: log_date, slot, position, meeting, meeting_info,
+    tasks, general_info.
+    """
+    with engine.connect() as conn:
+        result = conn.execute(text("""
+        SELECT log_date, slot, position, meeting, meeting_info, tasks, general_info
+        FROM work_log_entries
+        WHERE user_id = :user_id AND log_date >= :start_date AND log_date <= :end_date
+        ORDER BY log_date, position
+        """), {"user_id": user_id, "start_date": str(start_date), "end_date": str(end_date)})
+        return _frame(result.fetchall(), result.keys())
+
+@_cached_query
+def get_all_logs(user_id=DEFAULT_USER_ID):
+    with engine.connect() as conn:
+        result = conn.execute(text("""
+        SELECT id, log_date, log_summary, created_at FROM work_logs
+        WHERE user_id = :user_id
+        ORDER BY created_at DESC, id DESC
+        """), {"user_id": user_id})
+        rows = [(row.id, row.log_date, _unpack_summary(conn, row.log_summary), row.created_at) for row in result]
+        df = _frame(rows, result.keys())
+    return df
+
+@_cached_query
+def get_log_history_page(page_size=25, cursor=None, user_id=DEFAULT_USER_ID):
+    """Fetch one page of the user's history metadata (no summaries), newest first.
+
+    `cursor` is the (created_at, id) of the last row on the previous page.
+    Returns (DataFrame, next_cursor); next_cursor is None on the last page.
+    """
+    params = {"user_id": user_id, "limit": page_size + 1}
+    where = "WHERE user_id = :user_id"
+    if cursor is not None:
+        where += " AND (created_at, id) < (:cursor_created_at, :cursor_id)"
+        params["cursor_created_at"], params["cursor_id"] = cursor
+
+    with engine.connect() as conn:
+        result = conn.execute(text(f"""
+        SELECT id, log_date, created_at FROM work_logs
+        {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT :limit
+        """), params)
+        rows = result.fetchall()
+        df = _frame(rows[:page_size], result.keys())
+
+    next_cursor = None
+    if len(rows) > page_size:
+        last = rows[page_size - 1]
+        next_cursor = (last.created_at, last.id)
+    return df, next_cursor
+
+@_cached_query
+def get_log_summary(log_id, user_id=DEFAULT_USER_ID):
+    """Load a single saved summary on demand (None if it isn't the user's)"""
+    with engine.connect() as conn:
+        stored = conn.execute(
+            text("SELECT log_summary FROM work_logs WHERE id = :id AND user_id = :user_id"),
+            {"id": int(log_id), "user_id": user_id},
+        ).scalar()
+        return _unpack_summary(conn, stored)
+
+def _fts_quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+def _fts_query(query, user_id):
+    """Quote each term so user input can't trip FTS5 query syntax, and limit
+    the match to the user's rows and to the summary column"""
+    terms = " ".join(_fts_quote(term) for term in query.split())
+    if not terms:
+        return ""
+    return f"user_id:{_fts_quote(user_id)} AND log_summary:({terms})"
+
+# Ranked, user-scoped search per full-text implementation; both take
+# :match, :user_id, :limit and :offset
+_SEARCH_SQL = {
+    "fts5": """
+    SELECT w.id, w.log_date, w.created_at,
+           snippet(work_logs_fts, 0, '**', '**', ' … ', 12) AS snippet
+    FROM work_logs_fts
+    JOIN work_logs w ON w.id = work_logs_fts.rowid
+    WHERE work_logs_fts MATCH :match AND w.user_id = :user_id
+    ORDER BY bm25(work_logs_fts, 1.0, 0.0)
+    LIMIT :limit OFFSET :offset
+    """,
+    # plainto_tsquery ANDs the words and ignores operator syntax, like _fts_query
+    "tsvector": """
+    SELECT w.id, w.log_date, w.created_at,
+           ts_headline('simple', w.log_summary, q,
+                       'StartSel=**, StopSel=**, MaxWords=12, MinWords=4, MaxFragments=1, FragmentDelimiter=" … "')
+             AS snippet
+    FROM work_logs w, plainto_tsquery('simple', :match) q
+    WHERE w.user_id = :user_id AND to_tsvector('simple', COALESCE(w.log_summary, '')) @@ q
+    ORDER BY ts_rank(to_tsvector('simple', COALESCE(w.log_summary, '')), q) DESC, w.id DESC
+    LIMIT :limit OFFSET :offset
+    """,
+}
+
+def search_log_rows(query, page_size=10, offset=0, user_id=DEFAULT_USER_ID):
+    """Ranked full-text search over the user's saved summaries.
+
+    Returns (list of id/log_date/created_at/snippet dicts, has_more). Matched
+    terms in `snippet` are wrapped in ** for markdown highlighting.
+    """
+    match = _fts_query(query, user_id) if backend.full_text == "fts5" else " ".join(query.split())
+    if not match:
+        return [], False
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(_SEARCH_SQL[backend.full_text]), {
+            "match": match, "user_id": user_id, "limit": page_size + 1, "offset": offset,
+        }).mappings().all()
+    return [dict(row) for row in rows[:page_size]], len(rows) > page_size
+
+def search_logs(query, page_size=10, offset=0, user_id=DEFAULT_USER_ID):
+    """search_log_rows() as a DataFrame: (DataFrame, has_more)"""
+    rows, has_more = search_log_rows(query, page_size, offset, user_id)
+    return _frame(rows, ["id", "log_date", "created_at", "snippet"]), has_more
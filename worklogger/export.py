@@ -0,0 +1,209 @@
+"""
+Export engine for WorkLogger: CSV, DOCX and text renderings of a day, a
+content-hash LRU of rendered bytes, and streaming date-range exports.
+pandas and python-docx are imported on first use.
+"""
+
+import hashlib
+import json
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+# Maximum number of rendered exports kept in memory across all sessions
+EXPORT_CACHE_SIZE = 64
+
+# Same column layout as the single-day CSV, prefixed with the date for ranges
+LOG_COLUMNS = ["Time", "Meeting", "Meeting Information", "Tasks", "General Information"]
+RANGE_COLUMNS = ["Date"] + LOG_COLUMNS
+
+# Bulk exports spill from memory to disk past this size
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+def convert_df_to_csv(df):
+    return df.to_csv(index=False).encode("utf-8")
+
+_RUN_SPECIALS = re.compile(r"([\t\r\n])")
+
+def _run_content_xml(value):
+    """Run children for `value`, mirroring python-docx's Run.text setter"""
+    parts = []
+    for piece in _RUN_SPECIALS.split(value):
+        if piece == "\t":
+            parts.append("<w:tab/>")
+        elif piece in ("\r", "\n"):
+            parts.append("<w:br/>")
+        elif piece:
+            space = ' xml:space="preserve"' if len(piece.strip()) < len(piece) else ""
+            parts.append(f"<w:t{space}>{escape(piece)}</w:t>")
+    return "".join(parts)
+
+def convert_df_to_docx(df, log_date):
+    """Render the log table as DOCX.
+
+    Heading, date line and the "Table Grid" header row go through python-docx;
+    the body rows are emitted as one XML string and parsed in a single pass,
+    producing the same markup as per-cell `cell.text` assignment without
+    building a proxy object per cell.
+    """
+    from docx import Document
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls, qn
+
+    doc = Document()
+    doc.add_heading("Daily Work Log", level=1)
+    doc.add_paragraph(f"Date: {log_date.strftime('%A, %B %d, %Y')}")
+
+    table = doc.add_table(rows=1, cols=len(df.columns))
+    table.style = "Table Grid"
+    hdr_cells = table.rows[0].cells
+    for i, col in enumerate(df.columns):
+        hdr_cells[i].text = col
+
+    if len(df):
+        cell_opens = [
+            f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{cell._tc.tcPr.tcW.get(qn("w:w"))}"/></w:tcPr><w:p><w:r>'
+            for cell in hdr_cells
+        ]
+        cell_close = "</w:r></w:p></w:tc>"
+        rows_xml = "".join(
+            "<w:tr>"
+            + "".join(
+                cell_open + _run_content_xml(str(value)) + cell_close
+                for cell_open, value in zip(cell_opens, values)
+            )
+            + "</w:tr>"
+            for values in df.itertuples(index=False, name=None)
+        )
+        body = parse_xml(f"<w:tbl {nsdecls('w')}>{rows_xml}</w:tbl>")
+        table._tbl.extend(list(body))
+
+    doc_io = BytesIO()
+    doc.save(doc_io)
+    doc_io.seek(0)
+    return doc_io
+
+def records_hash(records, log_date):
+    """Stable content hash of a day's log records (or columns)"""
+    payload = json.dumps([str(log_date), records], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ExportCache:
+    """Thread-safe LRU cache of rendered export bytes keyed by (format, content hash)"""
+
+    def __init__(self, maxsize=EXPORT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, builder):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+
+        # Build outside the lock so one slow DOCX render doesn't block other sessions
+        data = builder()
+
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+export_cache = ExportCache()
+
+class LazyExports:
+    """Builds each export format on first use and memoizes it by content hash"""
+
+    def __init__(self, rendered, log_date, cache=None):
+        self.rendered = rendered
+        self.log_date = log_date
+        self.cache = cache if cache is not None else export_cache
+        self.digest = records_hash(rendered.columns, log_date)
+
+    def _dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.rendered.columns, columns=LOG_COLUMNS)
+
+    def csv(self):
+        return self.cache.get_or_build(
+            ("csv", self.digest), lambda: convert_df_to_csv(self._dataframe())
+        )
+
+    def docx(self):
+        return self.cache.get_or_build(
+            ("docx", self.digest),
+            lambda: convert_df_to_docx(self._dataframe(), self.log_date).getvalue(),
+        )
+
+    def text(self):
+        return self.rendered.list_text
+
+    def text_bytes(self):
+        return self.cache.get_or_build(
+            ("text", self.digest), lambda: self.rendered.list_text.encode("utf-8")
+        )
+
+def entries_to_records_frame(chunk):
+    """Map work_log_entries rows onto the export column layout"""
+    import pandas as pd
+    meeting = chunk["meeting"].astype(bool)
+    return pd.DataFrame({
+        "Date": chunk["log_date"],
+        "Time": chunk["slot"],
+        "Meeting": meeting.map({True: "Yes", False: "No"}),
+        "Meeting Information": chunk["meeting_info"].where(meeting, ""),
+        "Tasks": chunk["tasks"],
+        "General Information": chunk["general_info"],
+    }, columns=RANGE_COLUMNS)
+
+def stream_csv(chunks):
+    """Yield UTF-8 CSV bytes chunk by chunk, header first"""
+    yield (",".join(RANGE_COLUMNS) + "\n").encode("utf-8")
+    for chunk in chunks:
+        yield entries_to_records_frame(chunk).to_csv(index=False, header=False).encode("utf-8")
+
+def stream_ndjson(chunks):
+    """Yield newline-delimited JSON bytes, one object per hour slot"""
+    for chunk in chunks:
+        frame = entries_to_records_frame(chunk)
+        if not frame.empty:
+            yield (frame.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n").encode("utf-8")
+
+RANGE_EXPORT_FORMATS = {"csv": stream_csv, "ndjson": stream_ndjson}
+
+def write_range_export(chunks, fmt, fileobj):
+    """Stream a range export into a binary file object; returns bytes written"""
+    written = 0
+    for piece in RANGE_EXPORT_FORMATS[fmt](chunks):
+        fileobj.write(piece)
+        written += len(piece)
+    return written
+
+def range_export_bytes(chunks, fmt):
+    """A whole range export as bytes, for st.download_button's deferred `data`.
+
+    Chunks are written through a temp file that spills to disk past
+    SPOOL_MAX_BYTES and read back at the end: Streamlit takes bytes or a real
+    file, not the spooled one.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        write_range_export(chunks, fmt, spool)
+        spool.seek(0)
+        return spool.read()
@@ -0,0 +1,285 @@
+"""
+Bulk import of historical logs: the range CSV / single-day CSV exports and
+the text-list format written by `DayLog.render()`.
+
+Files are parsed as a stream of days and written with save_logs_batch, many
+days per transaction. Progress is checkpointed in the same transaction, so
+re-running an interrupted import picks up after the last committed batch.
+"""
+
+import csv
+import io
+import os
+import re
+import time
+from datetime import date, datetime
+
+from worklogger import db
+from worklogger.logs import DayLog, empty_entry
+
+IMPORT_BATCH_DAYS = 2000
+
+# Keep the first few problems verbatim; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+# Day exports are named like Monday_May_06_2024_daily_work_log.txt
+_EXPORT_NAME = re.compile(r"([A-Za-z]+_[A-Za-z]+_\d{2}_\d{4})_daily_work_log")
+
+TEXT_FIELDS = {
+    "Meeting Info": "meeting_info",
+    "Tasks": "tasks",
+    "General Info": "general",
+}
+
+class ImportStats:
+    """Running totals for one import, passed to the progress callback"""
+
+    def __init__(self, source, total_bytes=None):
+        self.source = source
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.days = 0
+        self.slots = 0
+        self.error_count = 0
+        self.errors = []
+        self.resumed_from = 0
+        self.started = time.monotonic()
+
+    def error(self, where, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{where}: {message}")
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def fraction(self):
+        if not self.total_bytes:
+            return None
+        return min(self.bytes_read / self.total_bytes, 1.0)
+
+def parse_log_date(value):
+    """ISO dates, or the 'Monday, May 06, 2024' form used in exported headers"""
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in ("%A, %B %d, %Y", "%A_%B_%d_%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"invalid date {value!r}")
+
+def date_from_filename(path):
+    """The log date encoded in a single-day export's file name, if any"""
+    match = _EXPORT_NAME.search(os.path.basename(path))
+    if match:
+        try:
+            return parse_log_date(match.group(1))
+        except ValueError:
+            return None
+    return None
+
+def _parse_meeting(value):
+    value = value.strip().lower()
+    if value in ("yes", "true", "1"):
+        return True
+    if value in ("no", "false", "0", ""):
+        return False
+    raise ValueError(f"invalid Meeting value {value!r}")
+
+def parse_csv(f, stats, default_date=None, skip=0):
+    """Yield (log_date, slots, entries, position) per day from a CSV export.
+
+    A Date column is used when present (range exports); otherwise every
+    row belongs to `default_date`. `position` counts data rows consumed and
+    `skip` resumes after that many. Rows for a day are expected to be
+    contiguous, as the exports write them.
+    """
+    reader = csv.reader(f)
+    header = next(reader, None) or []
+    if "Time" not in header:
+        raise ValueError("CSV needs at least a Time column")
+    index = {name: header.index(name) for name in header}
+    date_col = index.get("Date")
+    if date_col is None and default_date is None:
+        raise ValueError("CSV has no Date column; pass a date for single-day files")
+    # Missing optional columns read the "" appended to every row
+    time_col, meeting_col, info_col, tasks_col, general_col = (
+        index.get(name, -1) for name in ("Time", "Meeting", "Meeting Information", "Tasks", "General Information")
+    )
+    width = len(header)
+
+    current, current_raw, slots, entries = None, None, [], {}
+    consumed = skip
+    for position, row in enumerate(reader):
+        if position < skip:
+            continue
+        consumed = position + 1
+        if len(row) < width:
+            row += [""] * (width - len(row))
+        row.append("")
+        try:
+            if date_col is None:
+                log_date = default_date
+            elif row[date_col] == current_raw:
+                # Consecutive rows share a date, so parse it once per day
+                log_date = current
+            else:
+                log_date = parse_log_date(row[date_col])
+            slot = row[time_col].strip()
+            if not slot:
+                raise ValueError("missing Time")
+            meeting = _parse_meeting(row[meeting_col])
+        except ValueError as e:
+            stats.error(f"row {position + 2}", e)
+            continue
+
+        if log_date != current:
+            if current is not None:
+                yield current, slots, entries, position
+            current, slots, entries = log_date, [], {}
+        if date_col is not None:
+            current_raw = row[date_col]
+        if slot not in entries:
+            slots.append(slot)
+        entries[slot] = {
+            "meeting": meeting,
+            "meeting_info": row[info_col],
+            "tasks": row[tasks_col],
+            "general": row[general_col],
+        }
+    if current is not None:
+        yield current, slots, entries, consumed
+
+def parse_text(f, stats, default_date=None, skip=0):
+    """Yield (log_date, slots, entries, position) per day from text-list logs.
+
+    Days are separated by 'Date: ...' lines (ISO or 'Monday, May 06, 2024');
+    text before the first one belongs to `default_date`. Lines that don't
+    start a field continue the previous one, since tasks may span lines.
+    `position` counts lines consumed and `skip` resumes after that many.
+    """
+    current, slots, entries = default_date, [], {}
+    slot, field = None, None
+    consumed = skip
+    for line_no, line in enumerate(f):
+        if line_no < skip:
+            continue
+        consumed = line_no + 1
+        line = line.rstrip("\r\n")
+        stripped = line.strip()
+        if not stripped:
+            field = None
+            continue
+
+        key, sep, value = stripped.partition(": ")
+        if not sep and stripped.endswith(":"):
+            key, sep, value = stripped[:-1], ":", ""
+        if sep and key == "Date" and not line.startswith(" "):
+            if slots:
+                if current is None:
+                    stats.error(f"line {line_no + 1}", "entries before the first Date line")
+                else:
+                    yield current, slots, entries, line_no
+            slots, entries, slot, field = [], {}, None, None
+            try:
+                current = parse_log_date(value)
+            except ValueError as e:
+                stats.error(f"line {line_no + 1}", e)
+                current = None
+            continue
+
+        if sep and key == "Time" and not line.startswith(" "):
+            slot, field = value.strip(), None
+            if slot not in entries:
+                slots.append(slot)
+            entries[slot] = empty_entry()
+        elif slot is None:
+            stats.error(f"line {line_no + 1}", "text outside a Time block")
+        elif sep and key == "Meeting":
+            try:
+                entries[slot]["meeting"] = _parse_meeting(value)
+            except ValueError as e:
+                stats.error(f"line {line_no + 1}", e)
+            field = None
+        elif sep and key in TEXT_FIELDS:
+            field = TEXT_FIELDS[key]
+            entries[slot][field] = value
+        elif field is not None:
+            entries[slot][field] += "\n" + line
+        else:
+            stats.error(f"line {line_no + 1}", f"unrecognised line {stripped[:40]!r}")
+
+    if slots:
+        if current is None:
+            stats.error("end of file", "entries without a valid Date line")
+        else:
+            yield current, slots, entries, consumed
+
+PARSERS = {"csv": parse_csv, "text": parse_text}
+
+def detect_format(path):
+    return "csv" if path.lower().endswith(".csv") else "text"
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def import_logs(path, fmt=None, default_date=None, batch_days=IMPORT_BATCH_DAYS,
+                progress=None, restart=False, user_id=db.DEFAULT_USER_ID):
+    """Import a CSV or text-list file into the log database.
+
+    Each day is upserted exactly like save_log_to_db (summary, entries,
+    rollups, draft cleanup), `batch_days` per transaction. `progress` is
+    called with the ImportStats after every batch. Unless `restart`, an
+    import of the same unchanged file resumes from its last checkpoint and
+    a finished one is not repeated. Days and checkpoints belong to `user_id`.
+    Returns the ImportStats.
+    """
+    fmt = fmt or detect_format(path)
+    parser = PARSERS[fmt]
+    if default_date is None:
+        default_date = date_from_filename(path)
+
+    source = os.path.abspath(path)
+    fingerprint = _fingerprint(path)
+    stats = ImportStats(source, os.path.getsize(path))
+    checkpoint = None if restart else db.get_import_checkpoint(source, user_id)
+    if checkpoint is not None and checkpoint["fingerprint"] != fingerprint:
+        # The file changed since the last attempt, so its offsets mean nothing now
+        checkpoint = None
+    if checkpoint is not None:
+        stats.resumed_from = checkpoint["position"]
+        stats.days = checkpoint["days"]
+        if checkpoint["completed"]:
+            stats.bytes_read = stats.total_bytes
+            return stats
+
+    state = {"source": source, "fingerprint": fingerprint, "position": stats.resumed_from, "days": stats.days}
+    batch = []
+
+    def flush(completed=False):
+        db.save_logs_batch(batch, {**state, "completed": int(completed)}, user_id)
+        batch.clear()
+        if progress is not None:
+            progress(stats)
+
+    with open(path, "rb") as raw:
+        f = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+        for log_date, slots, entries, position in parser(f, stats, default_date, stats.resumed_from):
+            day_log = DayLog(slots, entries)
+            batch.append((log_date, day_log.summary(), day_log))
+            stats.days += 1
+            stats.slots += len(slots)
+            state.update(position=position, days=stats.days)
+            if len(batch) >= batch_days:
+                stats.bytes_read = raw.tell()
+                flush()
+        stats.bytes_read = stats.total_bytes
+        flush(completed=True)
+    return stats
@@ -0,0 +1,199 @@
+"""
+Day log model for WorkLogger: a columnar DayLog per date and the one-pass
+renderer behind the preview, exports and saved summary.
+"""
+
+import re
+import sys
+import time
+
+ENTRY_FIELDS = ("meeting", "meeting_info", "tasks", "general")
+
+def hour_label(h):
+    suffix = "AM" if h < 12 else "PM"
+    hour12 = h if 1 <= h <= 12 else (h - 12 if h > 12 else 12)
+    return f"{hour12}:00 {suffix}"
+
+def slot_sort_key(slot):
+    """Chronological sort key for labels like '9:00 AM'"""
+    clock, _, suffix = slot.partition(" ")
+    hour, _, minute = clock.partition(":")
+    try:
+        hour = int(hour) % 12 + (12 if suffix.upper() == "PM" else 0)
+        return (hour, int(minute or 0), slot)
+    except ValueError:
+        return (24, 0, slot)
+
+def empty_entry():
+    return {"meeting": False, "meeting_info": "", "tasks": "", "general": ""}
+
+def _append_summary(lines, slot, meeting_label, info, tasks, general):
+    """Saved-summary lines for one slot that has something logged"""
+    lines.append(f"{slot}: Meeting: {meeting_label}")
+    if info.strip():
+        lines.append(f"  Info: {info}")
+    if tasks.strip():
+        lines.append(f"  Tasks: {tasks}")
+    if general.strip():
+        lines.append(f"  General: {general}")
+    lines.append("")
+
+# A slot's first summary line, and the field lines under it
+_SUMMARY_SLOT = re.compile(r"^(\S.*): Meeting: (Yes|No)$")
+_SUMMARY_FIELDS = {"  Info: ": "meeting_info", "  Tasks: ": "tasks", "  General: ": "general"}
+
+def parse_summary(summary):
+    """Per-slot entries from a saved summary, the inverse of DayLog.summary().
+
+    Only slots that had something logged appear, in summary order. Lines
+    that start neither a slot nor a field continue the previous field,
+    since the text boxes allow several lines.
+    """
+    entries, entry, field, blank_lines = {}, None, None, 0
+    for line in (summary or "").splitlines():
+        match = _SUMMARY_SLOT.match(line)
+        if match:
+            entry = entries[match.group(1)] = empty_entry()
+            entry["meeting"] = match.group(2) == "Yes"
+            field, blank_lines = None, 0
+            continue
+        prefix = next((prefix for prefix in _SUMMARY_FIELDS if line.startswith(prefix)), None)
+        if entry is not None and prefix is not None:
+            field, blank_lines = _SUMMARY_FIELDS[prefix], 0
+            entry[field] = line[len(prefix):]
+        elif not line:
+            # Either the gap after a slot or a blank line inside the text
+            blank_lines += 1
+        elif field is not None:
+            entry[field] += "\n" * (blank_lines + 1) + line
+            blank_lines = 0
+    return entries
+
+class RenderedLog:
+    """Everything the page derives from a DayLog, produced in one pass"""
+
+    __slots__ = ("columns", "list_text", "summary")
+
+    def __init__(self, columns, list_text, summary):
+        self.columns = columns
+        self.list_text = list_text
+        self.summary = summary
+
+class DayLog:
+    """Columnar per-slot log for one day: one list per field, indexed by slot position"""
+
+    __slots__ = ("slots", "meeting", "meeting_info", "tasks", "general", "_positions", "dirty", "last_edit")
+
+    def __init__(self, slots, saved_entries=None):
+        self.slots = list(slots)
+        count = len(self.slots)
+        self.meeting = [False] * count
+        self.meeting_info = [""] * count
+        self.tasks = [""] * count
+        self.general = [""] * count
+        self._positions = {slot: i for i, slot in enumerate(self.slots)}
+        for slot, entry in (saved_entries or {}).items():
+            i = self._positions.get(slot)
+            if i is not None:
+                self.set_entry(i, entry)
+        # Positions edited since the last autosave flush, and when the latest edit happened
+        self.dirty = set()
+        self.last_edit = 0.0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, slot):
+        return slot in self._positions
+
+    def is_blank(self):
+        return not any(self.meeting) and not any(
+            value.strip() for column in (self.meeting_info, self.tasks, self.general) for value in column
+        )
+
+    def approx_bytes(self):
+        """Rough in-memory footprint of the slot data"""
+        total = sys.getsizeof(self.meeting)
+        for column in (self.slots, self.meeting_info, self.tasks, self.general):
+            total += sys.getsizeof(column) + sum(sys.getsizeof(value) for value in column)
+        return total
+
+    def position(self, slot):
+        return self._positions[slot]
+
+    def set_entry(self, i, entry):
+        self.meeting[i] = bool(entry.get("meeting", False))
+        self.meeting_info[i] = entry.get("meeting_info", "")
+        self.tasks[i] = entry.get("tasks", "")
+        self.general[i] = entry.get("general", "")
+
+    def update(self, i, field, value):
+        """Set one field of slot `i`, marking the slot dirty if the value changed"""
+        column = getattr(self, field)
+        if column[i] != value:
+            column[i] = value
+            self.dirty.add(i)
+            self.last_edit = time.monotonic()
+
+    def take_dirty(self):
+        """Return and clear the set of dirty positions"""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def entry(self, i):
+        return {
+            "meeting": self.meeting[i],
+            "meeting_info": self.meeting_info[i],
+            "tasks": self.tasks[i],
+            "general": self.general[i],
+        }
+
+    def iter_entries(self):
+        """(position, slot, meeting, meeting_info, tasks, general) per slot"""
+        return zip(range(len(self.slots)), self.slots, self.meeting, self.meeting_info, self.tasks, self.general)
+
+    def summary(self):
+        """Just the saved summary, for callers that don't need the preview or exports"""
+        lines = []
+        for _, slot, meeting, meeting_info, tasks, general in self.iter_entries():
+            if meeting or tasks.strip() or general.strip():
+                _append_summary(lines, slot, "Yes" if meeting else "No",
+                                meeting_info if meeting else "", tasks, general)
+        return "\n".join(lines) if lines else "No details logged."
+
+    def render(self):
+        """Build table columns, list text and saved summary in a single walk"""
+        col_meeting, col_info = [], []
+        list_lines, summary_lines = [], []
+        for _, slot, meeting, meeting_info, tasks, general in self.iter_entries():
+            meeting_label = "Yes" if meeting else "No"
+            info = meeting_info if meeting else ""
+            has_info = bool(info.strip())
+            has_tasks = bool(tasks.strip())
+            has_general = bool(general.strip())
+
+            col_meeting.append(meeting_label)
+            col_info.append(info)
+
+            list_lines.append(f"Time: {slot}")
+            list_lines.append(f"  Meeting: {meeting_label}")
+            if has_info:
+                list_lines.append(f"  Meeting Info: {info}")
+            if has_tasks:
+                list_lines.append(f"  Tasks: {tasks}")
+            if has_general:
+                list_lines.append(f"  General Info: {general}")
+            list_lines.append("")
+
+            if meeting or has_tasks or has_general:
+                _append_summary(summary_lines, slot, meeting_label, info, tasks, general)
+
+        columns = {
+            "Time": self.slots,
+            "Meeting": col_meeting,
+            "Meeting Information": col_info,
+            "Tasks": self.tasks,
+            "General Information": self.general,
+        }
+        summary = "\n".join(summary_lines) if summary_lines else "No details logged."
+        return RenderedLog(columns, "\n".join(list_lines), summary)
@@ -0,0 +1,234 @@
+"""
+SMTP delivery for WorkLogger: message building, pooled authenticated
+sessions and one-shot send helpers. No Streamlit dependency.
+"""
+
+import hashlib
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+SMTP_TIMEOUT = 30  # seconds
+SMTP_IDLE_TIMEOUT = 60  # drop pooled sessions idle longer than this (servers close them anyway)
+SMTP_MAX_IDLE_PER_KEY = 2
+
+def parse_cc(cc):
+    return [e.strip() for e in cc.replace(";", ",").split(",") if e.strip()]
+
+def build_message(from_name, from_addr, to, cc, subject, body, attachments):
+    """Build the EmailMessage and its full recipient list (To + CC)"""
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = f"{from_name} <{from_addr}>"
+    msg["To"] = to
+
+    cc_clean = parse_cc(cc)
+    if cc_clean:
+        msg["Cc"] = ", ".join(cc_clean)
+
+    msg.set_content(body)
+
+    for attachment in attachments:
+        file_bytes, maintype, subtype, filename = attachment
+        msg.add_attachment(file_bytes, maintype=maintype, subtype=subtype, filename=filename)
+
+    return msg, [to] + cc_clean
+
+def open_smtp(transport, password):
+    """Open an authenticated SMTP session.
+
+    `transport` is {"server", "port", "user", "security"} where security is
+    "ssl" (implicit TLS), "starttls", or "none" (plain, e.g. a local test server).
+    """
+    security = transport.get("security", "ssl")
+    if security == "ssl":
+        context = ssl.create_default_context()
+        server = smtplib.SMTP_SSL(transport["server"], transport["port"], context=context, timeout=SMTP_TIMEOUT)
+    else:
+        server = smtplib.SMTP(transport["server"], transport["port"], timeout=SMTP_TIMEOUT)
+        if security == "starttls":
+            server.starttls(context=ssl.create_default_context())
+    if password:
+        server.login(transport["user"], password)
+    return server
+
+class SMTPConnectionPool:
+    """Reusable authenticated SMTP sessions keyed by server, port, user and TLS mode.
+
+    The key also carries a digest of the password, so a session opened with
+    one password is never handed to a caller presenting another. Idle
+    sessions are checked with NOOP before reuse and dropped after
+    `idle_timeout` seconds.
+    """
+
+    def __init__(self, idle_timeout=SMTP_IDLE_TIMEOUT, max_idle_per_key=SMTP_MAX_IDLE_PER_KEY, connect=None):
+        self.idle_timeout = idle_timeout
+        self.max_idle_per_key = max_idle_per_key
+        self._connect = connect or open_smtp
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.connects = 0
+
+    @staticmethod
+    def key(transport, password):
+        digest = hashlib.sha256((password or "").encode("utf-8")).hexdigest()
+        return (transport["server"], int(transport["port"]), transport.get("user", ""),
+                transport.get("security", "ssl"), digest)
+
+    def _checkout(self, key, transport, password):
+        while True:
+            with self._lock:
+                sessions = self._idle.get(key)
+                if not sessions:
+                    break
+                server, last_used = sessions.pop()
+            if time.monotonic() - last_used > self.idle_timeout:
+                _close_quietly(server)
+                continue
+            try:
+                if server.noop()[0] == 250:
+                    return server, True
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            _close_quietly(server)
+        with self._lock:
+            self.connects += 1
+        return self._connect(transport, password), False
+
+    def _checkin(self, key, server):
+        with self._lock:
+            sessions = self._idle.setdefault(key, [])
+            if len(sessions) < self.max_idle_per_key:
+                sessions.append((server, time.monotonic()))
+                return
+        _close_quietly(server)
+
+    @contextmanager
+    def session(self, transport, password):
+        """Borrow a live session; it goes back to the pool unless the block raised"""
+        key = self.key(transport, password)
+        server, _ = self._checkout(key, transport, password)
+        try:
+            yield server
+        except BaseException:
+            _close_quietly(server)
+            raise
+        self._checkin(key, server)
+
+    def send_many(self, transport, password, from_addr, batch, on_sent=None):
+        """Send [(recipients, message), ...] over one authenticated session.
+
+        A pooled session that turns out to be dead mid-batch is replaced once
+        and the remaining messages continue on the new session. `on_sent(i)`
+        is called as soon as batch[i] has been accepted, so a caller can tell
+        which messages went out if a later one fails.
+        """
+        key = self.key(transport, password)
+        pending = list(enumerate(batch))
+        reconnected = False
+        while pending:
+            server, reused = self._checkout(key, transport, password)
+            try:
+                while pending:
+                    i, (recipients, message) = pending[0]
+                    _send_on(server, from_addr, recipients, message)
+                    pending.pop(0)
+                    if on_sent is not None:
+                        on_sent(i)
+            except smtplib.SMTPServerDisconnected:
+                _close_quietly(server)
+                if reconnected or not reused:
+                    raise
+                reconnected = True
+                continue
+            except BaseException:
+                _close_quietly(server)
+                raise
+            self._checkin(key, server)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for sessions in idle.values():
+            for server, _ in sessions:
+                _close_quietly(server)
+
+def _send_on(server, from_addr, recipients, message):
+    if isinstance(message, EmailMessage):
+        server.send_message(message, from_addr=from_addr, to_addrs=recipients)
+    else:
+        server.sendmail(from_addr, recipients, message)
+
+def _close_quietly(server):
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+smtp_pool = SMTPConnectionPool()
+
+def deliver_message(transport, password, from_addr, recipients, message):
+    """Send one message (EmailMessage or raw bytes) over a pooled session"""
+    smtp_pool.send_many(transport, password, from_addr, [(recipients, message)])
+
+def deliver_batch(transport, password, from_addr, batch, on_sent=None):
+    """Send [(recipients, message), ...] over one pooled session (see SMTPConnectionPool.send_many)"""
+    smtp_pool.send_many(transport, password, from_addr, batch, on_sent)
+
+def admin_transport(smtp_server, smtp_port, smtp_user):
+    return {"server": smtp_server, "port": int(smtp_port), "user": smtp_user, "security": "ssl"}
+
+def user_transport(user_config):
+    return {
+        "server": user_config['server'],
+        "port": int(user_config['port']),
+        "user": user_config['user'],
+        "security": "starttls" if user_config.get('use_tls', True) else "ssl",
+    }
+
+def send_email_with_attachments(smtp_server, smtp_port, smtp_user, smtp_password,
+                                from_name, to, cc, subject, body, attachments):
+    if smtp_password == "CHANGE_ME":
+        return False, "SMTP password not configured. Set credentials in st.secrets."
+    if not to.strip():
+        return False, "Please provide at least one recipient email address."
+
+    try:
+        msg, all_recipients = build_message(from_name, smtp_user, to, cc, subject, body, attachments)
+        deliver_message(admin_transport(smtp_server, smtp_port, smtp_user), smtp_password,
+                        smtp_user, all_recipients, msg)
+        return True, "Email sent successfully! ✅"
+    except Exception as e:
+        return False, f"Failed to send email: {e}"
+
+def test_email_connection(smtp_server, smtp_port, smtp_user, smtp_password, use_tls=True):
+    """Test email connection without sending an email"""
+    try:
+        transport = user_transport({
+            'server': smtp_server, 'port': smtp_port, 'user': smtp_user, 'use_tls': use_tls
+        })
+        # The verified session stays pooled for the send that usually follows
+        with smtp_pool.session(transport, smtp_password):
+            pass
+        return True, "Connection successful!"
+    except Exception as e:
+        return False, f"Connection failed: {str(e)}"
+
+def send_email_with_user_credentials(user_config, to, cc, subject, body, attachments):
+    """Send email using user-provided credentials"""
+    try:
+        msg, all_recipients = build_message(user_config['sender_name'], user_config['user'],
+                                            to, cc, subject, body, attachments)
+        deliver_message(user_transport(user_config), user_config['password'],
+                        user_config['user'], all_recipients, msg)
+        return True, "Email sent successfully! ✅"
+    except Exception as e:
+        return False, f"Failed to send email: {e}"
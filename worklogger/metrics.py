@@ -0,0 +1,168 @@
+"""
+Rerun timing for WorkLogger: named phase spans, per-query timing through
+SQLAlchemy cursor events, and an optional rotating JSON-lines metrics log.
+
+Nothing is measured unless a RerunTimer is active in the current context;
+when timing is off the app gets NULL_TIMER, whose methods do nothing.
+"""
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+METRICS_MAX_BYTES = 5 * 1024 * 1024
+METRICS_BACKUPS = 3
+# Queries listed individually in a record; the rest only count towards totals
+SLOWEST_QUERIES = 5
+QUERY_TEXT_CHARS = 120
+
+_active_timer = ContextVar("worklogger_rerun_timer", default=None)
+
+class RerunTimer:
+    """Phase and query timings for one script run, in milliseconds"""
+
+    def __init__(self, label="rerun"):
+        self.label = label
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.spans = []
+        self.queries = []
+        self.total_ms = None
+        self._phase = None
+        self._phase_started = None
+        self._token = None
+
+    def __bool__(self):
+        return True
+
+    def phase(self, name):
+        """End the current phase (if any) and start timing `name`"""
+        now = time.perf_counter()
+        self._close_phase(now)
+        self._phase, self._phase_started = name, now
+
+    def _close_phase(self, now):
+        if self._phase is not None:
+            self.spans.append((self._phase, (now - self._phase_started) * 1000))
+            self._phase = None
+
+    @contextmanager
+    def span(self, name):
+        """Time a block inside the current phase, e.g. one expensive call"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, (time.perf_counter() - started) * 1000))
+
+    def record_query(self, statement, ms):
+        self.queries.append((self._phase, " ".join(statement.split())[:QUERY_TEXT_CHARS], ms))
+
+    def finish(self):
+        now = time.perf_counter()
+        self._close_phase(now)
+        self.total_ms = (now - self.started) * 1000
+        if self._token is not None:
+            _active_timer.reset(self._token)
+            self._token = None
+        return self
+
+    def as_record(self):
+        slowest = sorted(self.queries, key=lambda q: q[2], reverse=True)[:SLOWEST_QUERIES]
+        return {
+            "ts": round(self.timestamp, 3),
+            "label": self.label,
+            "total_ms": round(self.total_ms or 0, 2),
+            "spans": {name: round(ms, 2) for name, ms in self.spans},
+            "queries": len(self.queries),
+            "query_ms": round(sum(q[2] for q in self.queries), 2),
+            "slowest_queries": [
+                {"phase": phase, "sql": sql, "ms": round(ms, 2)} for phase, sql, ms in slowest
+            ],
+        }
+
+class _NullTimer:
+    """Stand-in when timing is off: every call is a no-op"""
+
+    _span = nullcontext()
+
+    def __bool__(self):
+        return False
+
+    def phase(self, name):
+        pass
+
+    def span(self, name):
+        return self._span
+
+    def finish(self):
+        return self
+
+NULL_TIMER = _NullTimer()
+
+def start_rerun_timer(enabled, label="rerun"):
+    """A RerunTimer bound to this context when `enabled`, else NULL_TIMER"""
+    if not enabled:
+        return NULL_TIMER
+    timer = RerunTimer(label)
+    timer._token = _active_timer.set(timer)
+    return timer
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_timer.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timer = _active_timer.get()
+    started = conn.info.get("query_started")
+    if timer is None or not started:
+        return
+    timer.record_query(statement, (time.perf_counter() - started.pop()) * 1000)
+
+def instrument_engine(engine):
+    """Time every query on `engine` while a RerunTimer is active (idempotent)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+class MetricsLog:
+    """Append-only JSON-lines file that rotates at `max_bytes`"""
+
+    def __init__(self, path, max_bytes=METRICS_MAX_BYTES, backups=METRICS_BACKUPS):
+        self.path = path
+        self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                            encoding="utf-8", delay=True)
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def write(self, record):
+        # handle() takes the handler's lock, so concurrent sessions don't interleave lines
+        self._handler.handle(logging.makeLogRecord({"msg": json.dumps(record), "levelno": logging.INFO}))
+
+    def close(self):
+        self._handler.close()
+
+def metrics_log_from_env():
+    """MetricsLog at $WORKLOGGER_METRICS_FILE, or None when it isn't set"""
+    path = os.environ.get("WORKLOGGER_METRICS_FILE")
+    return MetricsLog(path) if path else None
+
+def timed(label, fn, metrics_log=None):
+    """Wrap a deferred callable (e.g. a download builder) to log its own timing record"""
+    if metrics_log is None:
+        return fn
+
+    def wrapper():
+        timer = start_rerun_timer(True, label)
+        try:
+            return fn()
+        finally:
+            metrics_log.write(timer.finish().as_record())
+
+    return wrapper
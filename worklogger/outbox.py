@@ -0,0 +1,253 @@
+"""
+Persistent email outbox for WorkLogger
+Queues messages in the database and delivers them from a background thread
+pool with exponential-backoff retries, so SMTP never blocks a page rerun.
+Messages that are ready together for the same account go out over one
+SMTP session.
+"""
+
+import json
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from worklogger.mail import deliver_batch
+
+OUTBOX_WORKERS = 2
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 2.0    # seconds; doubles after every failed attempt
+RETRY_MAX_DELAY = 300.0
+# Ready messages for the same account and sender that one worker sends per session
+OUTBOX_BATCH_SIZE = 20
+
+PENDING_STATUSES = ("queued", "sending")
+
+def is_permanent_failure(exc):
+    """Errors that retrying won't fix: bad credentials, rejected addresses, 5xx replies"""
+    if isinstance(exc, (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused)):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code >= 500
+    return isinstance(exc, (ValueError, KeyError))
+
+def retry_delay(attempts, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    return min(cap, base * (2 ** max(0, attempts - 1)))
+
+class EmailOutbox:
+    """Database-backed outbox drained by a small worker pool.
+
+    Passwords are never written to the database. They are held in memory for
+    the job's lifetime; jobs recovered after a restart ask
+    `credential_provider(transport)` and fail if it has nothing to offer.
+    """
+
+    def __init__(self, engine, workers=OUTBOX_WORKERS, max_attempts=MAX_ATTEMPTS,
+                 retry_base=RETRY_BASE_DELAY, credential_provider=None, send=deliver_batch,
+                 batch_size=OUTBOX_BATCH_SIZE):
+        self.engine = engine
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.retry_base = retry_base
+        self.credential_provider = credential_provider
+        self._send = send
+        self._passwords = {}
+        self._lock = threading.Lock()
+        self._timers = set()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email-outbox")
+        self._recover()
+
+    def enqueue(self, transport, password, from_addr, recipients, message):
+        """Persist a message and hand it to the pool. Returns the outbox job id."""
+        payload = message.as_bytes() if hasattr(message, "as_bytes") else bytes(message)
+        subject = message.get("Subject", "") if hasattr(message, "get") else ""
+        with self.engine.begin() as conn:
+            job_id = conn.execute(text("""
+            INSERT INTO email_outbox
+              (status, subject, from_addr, recipients, message, transport, max_attempts, next_attempt_at)
+            VALUES
+              ('queued', :subject, :from_addr, :recipients, :message, :transport, :max_attempts, :now)
+            RETURNING id
+            """), {
+                "subject": subject,
+                "from_addr": from_addr,
+                "recipients": json.dumps(list(recipients)),
+                "message": payload,
+                "transport": json.dumps(transport, sort_keys=True),
+                "max_attempts": self.max_attempts,
+                "now": time.time(),
+            }).scalar_one()
+        with self._lock:
+            self._passwords[job_id] = password
+        self._submit(job_id)
+        return job_id
+
+    def status(self, job_id):
+        """Current status row for a job as a dict, or None"""
+        with self.engine.connect() as conn:
+            row = conn.execute(text("""
+            SELECT id, status, subject, attempts, max_attempts, next_attempt_at, last_error, updated_at
+            FROM email_outbox WHERE id = :id
+            """), {"id": job_id}).mappings().first()
+        return dict(row) if row else None
+
+    def statuses(self, job_ids):
+        if not job_ids:
+            return []
+        params = {f"id{i}": job_id for i, job_id in enumerate(job_ids)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(f"""
+            SELECT id, status, subject, attempts, max_attempts, next_attempt_at, last_error, updated_at
+            FROM email_outbox WHERE id IN ({placeholders}) ORDER BY id DESC
+            """), params).mappings().all()
+        return [dict(row) for row in rows]
+
+    def shutdown(self, wait=True):
+        self._closed = True
+        with self._lock:
+            for timer in self._timers:
+                timer.cancel()
+            self._timers.clear()
+        self._executor.shutdown(wait=wait)
+
+    def _recover(self):
+        """Requeue jobs left pending by a previous process"""
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+            UPDATE email_outbox SET status = 'queued', updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'sending'
+            """))
+            rows = conn.execute(text("""
+            SELECT id, next_attempt_at FROM email_outbox WHERE status = 'queued'
+            """)).fetchall()
+        now = time.time()
+        for row in rows:
+            self._schedule(row.id, max(0.0, row.next_attempt_at - now))
+
+    def _schedule(self, job_id, delay):
+        if delay <= 0:
+            self._submit(job_id)
+            return
+        timer = threading.Timer(delay, self._fire_timer, args=(job_id,))
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+
+    def _fire_timer(self, job_id):
+        with self._lock:
+            self._timers.discard(threading.current_thread())
+        self._submit(job_id)
+
+    def _submit(self, job_id):
+        if not self._closed:
+            self._executor.submit(self._process, job_id)
+
+    def _claim(self, job_id):
+        with self.engine.begin() as conn:
+            claimed = conn.execute(text("""
+            UPDATE email_outbox
+            SET status = 'sending', attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = :id AND status = 'queued'
+            """), {"id": job_id}).rowcount
+            if not claimed:
+                return None
+            return conn.execute(text("""
+            SELECT id, from_addr, recipients, message, transport, attempts, max_attempts
+            FROM email_outbox WHERE id = :id
+            """), {"id": job_id}).first()
+
+    def _password_for(self, job_id, transport):
+        with self._lock:
+            if job_id in self._passwords:
+                return self._passwords[job_id]
+        if self.credential_provider is not None:
+            return self.credential_provider(transport)
+        raise KeyError("SMTP credentials are no longer available for this message")
+
+    def _finish(self, job_id, status, error=None, next_attempt_at=None):
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+            UPDATE email_outbox
+            SET status = :status, last_error = :error,
+                next_attempt_at = COALESCE(:next_attempt_at, next_attempt_at),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = :id
+            """), {"id": job_id, "status": status, "error": error, "next_attempt_at": next_attempt_at})
+        if status != "queued":
+            with self._lock:
+                self._passwords.pop(job_id, None)
+
+    def _claim_batch(self, job, password):
+        """Claim other ready jobs for the same account, sender and password, up to batch_size in all"""
+        with self.engine.connect() as conn:
+            ids = conn.execute(text("""
+            SELECT id FROM email_outbox
+            WHERE status = 'queued' AND next_attempt_at <= :now AND id != :id
+              AND transport = :transport AND from_addr = :from_addr
+            ORDER BY id LIMIT :limit
+            """), {"now": time.time(), "id": job.id, "transport": job.transport, "from_addr": job.from_addr,
+                   "limit": self.batch_size - 1}).scalars().all()
+        transport = json.loads(job.transport)
+        batch = []
+        for other_id in ids:
+            try:
+                if self._password_for(other_id, transport) != password:
+                    continue
+            except KeyError:
+                continue
+            # Another worker may have claimed it meanwhile
+            other = self._claim(other_id)
+            if other is not None:
+                batch.append(other)
+        return batch
+
+    def _release(self, jobs):
+        """Put claimed jobs that were never attempted back in the queue, attempt uncounted"""
+        for job in jobs:
+            with self.engine.begin() as conn:
+                conn.execute(text("""
+                UPDATE email_outbox
+                SET status = 'queued', attempts = attempts - 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = :id AND status = 'sending'
+                """), {"id": job.id})
+            self._submit(job.id)
+
+    def _failed(self, job, exc):
+        error = f"{type(exc).__name__}: {exc}"
+        if is_permanent_failure(exc) or job.attempts >= job.max_attempts:
+            self._finish(job.id, "failed", error)
+        else:
+            delay = retry_delay(job.attempts, self.retry_base)
+            self._finish(job.id, "queued", error, time.time() + delay)
+            self._schedule(job.id, delay)
+
+    def _process(self, job_id):
+        job = self._claim(job_id)
+        if job is None:
+            return
+        transport = json.loads(job.transport)
+        try:
+            password = self._password_for(job_id, transport)
+        except Exception as exc:
+            self._failed(job, exc)
+            return
+        jobs = [job, *self._claim_batch(job, password)] if self.batch_size > 1 else [job]
+        sent = []
+
+        def on_sent(i):
+            self._finish(jobs[i].id, "sent")
+            sent.append(i)
+
+        try:
+            self._send(transport, password, job.from_addr,
+                       [(json.loads(j.recipients), bytes(j.message)) for j in jobs], on_sent)
+        except Exception as exc:
+            # Messages go out in order: the first unsent one failed, the rest never got a turn
+            if len(sent) < len(jobs):
+                self._failed(jobs[len(sent)], exc)
+                self._release(jobs[len(sent) + 1:])
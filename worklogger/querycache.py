@@ -0,0 +1,143 @@
+"""
+Process-wide cache of read query results, shared by every session.
+
+Entries are keyed by the query, its arguments and the user's data version.
+Writes bump the version (worklogger.db does this after each commit), so
+results cached before a write are never served after it; they are also
+purged eagerly to free their memory. A reader that started before a write
+can still store its result, but only under the old version, which no
+lookup asks for again.
+
+Memory is bounded by an entry count and an approximate byte budget. Entries
+also expire after a while, which is how writes made by another process
+(e.g. a CLI import) eventually show up. prefetch() fills entries from a
+small background pool ahead of the request that will want them.
+"""
+
+import copy
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUERY_CACHE_SIZE = 512
+QUERY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+QUERY_CACHE_MAX_AGE_SECONDS = 60.0
+# Background threads that warm the cache for results the user is likely to ask for next
+PREFETCH_WORKERS = 2
+
+def approx_bytes(value):
+    """Rough in-memory size of a query result"""
+    if hasattr(value, "memory_usage"):  # DataFrame
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_bytes(k) + approx_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approx_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+def _private_copy(value):
+    """A copy the caller may modify without touching the cached result"""
+    if hasattr(value, "memory_usage"):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_private_copy(item) for item in value)
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+class QueryCache:
+    """Thread-safe, size-bounded LRU of query results with hit/miss counters"""
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE, max_bytes=QUERY_CACHE_MAX_BYTES,
+                 max_age=QUERY_CACHE_MAX_AGE_SECONDS):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # key -> (value, size, stored_at)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _pop(self, key):
+        _, size, _ = self._items.pop(key)
+        self.bytes -= size
+
+    def get_or_build(self, key, builder):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and time.monotonic() - item[2] < self.max_age:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return _private_copy(item[0])
+            if item is not None:
+                self._pop(key)
+            self.misses += 1
+
+        # Query outside the lock so one slow read doesn't block other sessions
+        value = builder()
+        size = approx_bytes(value)
+
+        with self._lock:
+            if key in self._items:
+                self._pop(key)
+            # A result bigger than the whole budget would only evict everything else
+            if size <= self.max_bytes:
+                self._items[key] = (value, size, time.monotonic())
+                self.bytes += size
+                while len(self._items) > self.maxsize or self.bytes > self.max_bytes:
+                    self._pop(next(iter(self._items)))
+        return _private_copy(value)
+
+    def discard(self, predicate):
+        """Drop every entry whose key matches `predicate`"""
+        with self._lock:
+            for key in [key for key in self._items if predicate(key)]:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._items)
+
+query_cache = QueryCache()
+
+_prefetch_executor = None
+_prefetch_lock = threading.Lock()
+_prefetching = set()
+
+def prefetch(fn, *args, **kwargs):
+    """Call a cached query in the background so the next request for it is a hit.
+
+    Identical calls already in flight are skipped. Failures are dropped: the
+    foreground request simply runs the query itself.
+    """
+    global _prefetch_executor
+    key = (fn, args, tuple(sorted(kwargs.items())))
+    with _prefetch_lock:
+        if key in _prefetching:
+            return
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="query-prefetch")
+        _prefetching.add(key)
+
+    def run():
+        try:
+            fn(*args, **kwargs)
+        finally:
+            with _prefetch_lock:
+                _prefetching.discard(key)
+
+    _prefetch_executor.submit(run)
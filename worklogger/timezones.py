@@ -0,0 +1,33 @@
+"""
+Timezone helpers for WorkLogger
+Zones are resolved through zoneinfo and cached per name. Database
+timestamps (SQLite CURRENT_TIMESTAMP) are UTC; convert them for display
+with `utc_to_local`.
+"""
+
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+DEFAULT_TIMEZONE = "America/New_York"
+
+@lru_cache(maxsize=64)
+def resolve_timezone(timezone_name):
+    """ZoneInfo for `timezone_name`, falling back to UTC if it's unknown"""
+    try:
+        return ZoneInfo(timezone_name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return ZoneInfo("UTC")
+
+@lru_cache(maxsize=1)
+def list_timezones():
+    return sorted(available_timezones())
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+def utc_to_local(values, user_tz, fmt="%Y-%m-%d %H:%M %Z"):
+    """Convert naive-UTC DB timestamps (a Series or column) to formatted local strings in one vectorized pass"""
+    import pandas as pd
+    stamps = pd.to_datetime(pd.Series(values), utc=True, errors="coerce")
+    return stamps.dt.tz_convert(user_tz).dt.strftime(fmt).fillna("")